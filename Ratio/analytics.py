@@ -0,0 +1,468 @@
+import datetime
+import json
+import os
+import threading
+import numpy as np
+
+# Account types in code order. Types outside this list get codes after it.
+ACCOUNT_TYPES = ['Asset', 'Liability', 'Equity', 'Revenue', 'Expense']
+DEBIT_NORMAL = ('Asset', 'Expense')
+
+_EPOCH = datetime.date(1970, 1, 1)
+
+def to_day(iso_date):
+    """'YYYY-MM-DD' -> days since 1970-01-01 (the day column's unit)."""
+    return (datetime.date.fromisoformat(iso_date) - _EPOCH).days
+
+def from_day(day):
+    return (_EPOCH + datetime.timedelta(days=int(day))).isoformat()
+
+# --- COLUMN CACHE FILE ---
+# Layout: magic, 8-byte header length, JSON header (stamp + column layout), then each
+# column's raw bytes at a 64-byte aligned offset, so np.memmap views need no copying.
+
+SIDECAR_FORMAT = 1
+_MAGIC = b"RATIOCOLS\n"
+_ALIGN = 64
+
+def sidecar_path(db_name):
+    """The column cache file kept next to a database: ratio.db -> ratio.db.columns"""
+    return f"{db_name}.columns"
+
+def _aligned(n):
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+def write_sidecar(path, stamp, arrays):
+    """Writes arrays (name -> 1-d ndarray) under stamp. Atomic: temp file + rename."""
+    arrays = {name: np.ascontiguousarray(arr) for name, arr in arrays.items()}
+    layout, offset = [], 0
+    for name, arr in arrays.items():
+        layout.append({'name': name, 'dtype': arr.dtype.str, 'length': len(arr), 'offset': offset})
+        offset = _aligned(offset + arr.nbytes)
+    header = json.dumps(dict(stamp, format=SIDECAR_FORMAT, columns=layout)).encode()
+    data_start = _aligned(len(_MAGIC) + 8 + len(header))
+
+    tmp = f"{path}.tmp{os.getpid()}"
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(_MAGIC)
+            f.write(len(header).to_bytes(8, 'little'))
+            f.write(header)
+            for col in layout:
+                f.seek(data_start + col['offset'])
+                arrays[col['name']].tofile(f)
+        # Fails on Windows while another process has the old file mapped; the stale
+        # stamp then just makes the next start rebuild in the background
+        os.replace(tmp, path)
+    except OSError:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def read_sidecar_header(path):
+    """(header dict, data offset), or None if the file is missing or not ours."""
+    try:
+        with open(path, 'rb') as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                return None
+            size = int.from_bytes(f.read(8), 'little')
+            header = json.loads(f.read(size))
+    except (OSError, ValueError):
+        return None
+    if header.get('format') != SIDECAR_FORMAT:
+        return None
+    return header, _aligned(len(_MAGIC) + 8 + size)
+
+def read_sidecar(path):
+    """(header, arrays) with every array a zero-copy view of one read-only memory map."""
+    found = read_sidecar_header(path)
+    if found is None:
+        return None
+    header, data_start = found
+    buf = None
+    arrays = {}
+    for col in header['columns']:
+        dtype = np.dtype(col['dtype'])
+        if col['length'] == 0:
+            arrays[col['name']] = np.empty(0, dtype=dtype)
+            continue
+        if buf is None:
+            buf = np.memmap(path, dtype=np.uint8, mode='r')
+        start = data_start + col['offset']
+        raw = buf[start:start + col['length'] * dtype.itemsize]
+        if len(raw) != col['length'] * dtype.itemsize:
+            return None # Truncated file
+        arrays[col['name']] = raw.view(dtype)
+    return header, arrays
+
+# One background build per cache file, however many stores want it
+_builds = {}
+_builds_lock = threading.Lock()
+
+class JournalColumns:
+    """
+    The journal as columnar NumPy arrays, one element per split, sorted by date:
+        day      int32  days since 1970-01-01
+        account  int32  accounts.id
+        type     int8   index into self.type_names
+        debit    int64  cents
+        credit   int64  cents
+        signed   int64  cents, positive on the account's normal side
+        entry    int64  journal_entries.id
+    Date ranges become slices via searchsorted, per-account sums come from np.bincount
+    and time buckets from np.add.reduceat.
+
+    refresh() keeps the arrays in step with the database incrementally: splits with an
+    id above the highest one loaded are merged in, ids listed in deleted_entries are
+    dropped. Only a wiped journal (journal_epoch changes) forces a full reload.
+
+    With a sidecar path the arrays are also persisted there, stamped with the book id
+    and change counter from the meta table. A matching stamp maps the file instead of
+    querying; otherwise a background thread catches the file up (or rebuilds it) and the
+    query methods answer through the equivalent DatabaseHandler SQL until it is done.
+    """
+
+    COLUMNS = (('day', np.int32), ('account', np.int32), ('type', np.int8),
+               ('debit', np.int64), ('credit', np.int64), ('signed', np.int64), ('entry', np.int64))
+
+    def __init__(self, db, sidecar=None):
+        self.db = db
+        self.sidecar = sidecar
+        self._version = None
+        self.book_id = None
+        self.epoch = None
+        self.change_counter = None
+        self.max_entry = 0
+        self.deleted_seq = 0
+        self.full_loads = 0
+        self.incremental_loads = 0
+        self._set_columns(self._empty())
+        self._set_accounts([])
+
+        self._lock = threading.Lock()
+        self._pending = None # Result of a background build, installed by the owning thread
+        self._saved_counter = None
+        self.ready = sidecar is None
+        if sidecar and not self.load_sidecar():
+            self._start_build()
+
+    # --- LOADING ---
+
+    def _empty(self):
+        return {name: np.empty(0, dtype=dtype) for name, dtype in self.COLUMNS}
+
+    def _set_columns(self, cols):
+        for name, _ in self.COLUMNS:
+            setattr(self, name, cols[name])
+
+    def _set_accounts(self, rows):
+        """rows: (id, name, type) from the accounts table, which is small: always reloaded."""
+        size = max((r[0] for r in rows), default=0) + 1
+        self.account_names = [None] * size
+        self.type_names = list(ACCOUNT_TYPES)
+        codes = np.zeros(size, dtype=np.int8)
+        for acc_id, name, acc_type in rows:
+            if acc_type not in self.type_names:
+                self.type_names.append(acc_type)
+            self.account_names[acc_id] = name
+            codes[acc_id] = self.type_names.index(acc_type)
+        self.account_type = codes
+        self.debit_normal = np.array([t in DEBIT_NORMAL for t in self.type_names])
+
+    def _signed(self, type_codes, debit, credit):
+        return np.where(self.debit_normal[type_codes], debit - credit, credit - debit)
+
+    def _read_meta(self, cursor):
+        cursor.execute("SELECT key, value FROM meta")
+        return dict(cursor.fetchall())
+
+    def _fetch_splits(self, cursor, after_id):
+        # Unparseable dates land on day 0 rather than disappearing from the totals
+        cursor.execute("""
+            SELECT COALESCE(CAST(julianday(t.date) - 2440587.5 AS INTEGER), 0),
+                   j.account_id, j.debit, j.credit, j.id
+            FROM journal_entries j
+            JOIN transactions t ON j.transaction_id = t.id
+            WHERE j.id > ?
+        """, (after_id,))
+        raw = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 5)
+
+        order = np.argsort(raw[:, 0], kind='stable')
+        raw = raw[order]
+        account = raw[:, 1].astype(np.int32)
+        type_codes = self.account_type[account]
+        return {
+            'day': raw[:, 0].astype(np.int32),
+            'account': account,
+            'type': type_codes,
+            'debit': raw[:, 2],
+            'credit': raw[:, 3],
+            'signed': self._signed(type_codes, raw[:, 2], raw[:, 3]),
+            'entry': raw[:, 4],
+        }
+
+    def refresh(self):
+        """Brings the columns up to date. Returns True if anything changed."""
+        version = self.db._data_version()
+        if version == self._version:
+            return False
+
+        # One read transaction, so accounts, tombstones and splits come from the same snapshot
+        conn = self.db.conn
+        cursor = conn.cursor()
+        cursor.execute("BEGIN")
+        try:
+            meta = self._read_meta(cursor)
+            cursor.execute("SELECT id, name, type FROM accounts")
+            old_names, old_types = self.type_names, self.account_type
+            self._set_accounts(cursor.fetchall())
+
+            if (meta['book_id'], meta['journal_epoch']) != (self.book_id, self.epoch):
+                self._full_load(cursor)
+                self.book_id, self.epoch = meta['book_id'], meta['journal_epoch']
+            else:
+                self._incremental_load(cursor, old_names, old_types)
+            self.change_counter = meta['change_counter']
+        finally:
+            conn.commit()
+        self._version = version
+        self.ready = True # A synchronous refresh is as good as a finished build
+        return True
+
+    def _full_load(self, cursor):
+        cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM deleted_entries")
+        self.deleted_seq = cursor.fetchone()[0]
+        cols = self._fetch_splits(cursor, 0)
+        self._set_columns(cols)
+        self.max_entry = int(cols['entry'].max()) if len(cols['entry']) else 0
+        self.full_loads += 1
+
+    def _incremental_load(self, cursor, old_names, old_types):
+        # 1. Drop deleted splits
+        cursor.execute("SELECT seq, entry_id FROM deleted_entries WHERE seq > ?", (self.deleted_seq,))
+        tombstones = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 2)
+        if len(tombstones):
+            self.deleted_seq = int(tombstones[:, 0].max())
+            keep = ~np.isin(self.entry, tombstones[:, 1])
+            if not keep.all():
+                self._set_columns({name: getattr(self, name)[keep] for name, _ in self.COLUMNS})
+
+        # 2. An account whose type changed flips the sign of its existing splits
+        n = min(len(old_types), len(self.account_type))
+        if len(self.account) and (old_names != self.type_names
+                                  or not np.array_equal(old_types[:n], self.account_type[:n])):
+            self.type = self.account_type[self.account]
+            self.signed = self._signed(self.type, self.debit, self.credit)
+
+        # 3. Merge new splits into date order
+        new = self._fetch_splits(cursor, self.max_entry)
+        if len(new['entry']):
+            at = np.searchsorted(self.day, new['day'], side='right')
+            self._set_columns({name: np.insert(getattr(self, name), at, new[name]) for name, _ in self.COLUMNS})
+            self.max_entry = int(new['entry'].max())
+        self.incremental_loads += 1
+
+    # --- CACHE FILE ---
+
+    def _stamp(self):
+        return {'book_id': self.book_id, 'epoch': self.epoch, 'change_counter': self.change_counter,
+                'max_entry': self.max_entry, 'deleted_seq': self.deleted_seq, 'type_names': self.type_names}
+
+    def _arrays(self):
+        arrays = {name: getattr(self, name) for name, _ in self.COLUMNS}
+        arrays['account_type'] = self.account_type
+        return arrays
+
+    def _install(self, stamp, arrays):
+        self._set_columns(arrays)
+        self.account_type = arrays['account_type']
+        self.type_names = list(stamp['type_names'])
+        self.debit_normal = np.array([t in DEBIT_NORMAL for t in self.type_names])
+        for key in ('book_id', 'epoch', 'change_counter', 'max_entry', 'deleted_seq'):
+            setattr(self, key, stamp[key])
+        self._version = None # Next refresh() reloads accounts and picks up anything newer
+
+    def load_sidecar(self):
+        """Maps the cache file if its stamp matches the database. Returns True on success."""
+        loaded = read_sidecar(self.sidecar)
+        if loaded is None:
+            return False
+        stamp, arrays = loaded
+        meta = self._read_meta(self.db.conn.cursor())
+        if (stamp['book_id'], stamp['epoch'], stamp['change_counter']) != \
+                (meta['book_id'], meta['journal_epoch'], meta['change_counter']):
+            return False
+        self._install(stamp, arrays)
+        self._saved_counter = stamp['change_counter']
+        self.ready = True
+        return True
+
+    def save_sidecar(self, path=None):
+        try:
+            write_sidecar(path or self.sidecar, self._stamp(), self._arrays())
+        except OSError as e:
+            print(f"Column Cache Error: {e}")
+            return False
+        self._saved_counter = self.change_counter
+        return True
+
+    def _start_build(self):
+        with _builds_lock:
+            running = _builds.get(self.sidecar)
+            if running is not None and running.is_alive():
+                return
+            thread = threading.Thread(target=self._build, name="ratio-columns", daemon=True)
+            _builds[self.sidecar] = thread
+        thread.start()
+
+    def _build(self):
+        # Worker thread: its own connection, and never touches this store's arrays
+        from database import DatabaseHandler
+        reader = DatabaseHandler(self.db.db_name, read_only=True)
+        try:
+            cols = JournalColumns(reader)
+            stale = read_sidecar(self.sidecar)
+            if stale is not None:
+                cols._install(*stale) # Same book and epoch: refresh() only reads what changed since
+            cols.refresh()
+            cols.save_sidecar(self.sidecar)
+            with self._lock:
+                self._pending = (cols._stamp(), cols._arrays())
+        except Exception as e:
+            print(f"Column Cache Error: {e}")
+        finally:
+            reader.close()
+
+    def wait_ready(self, timeout=None):
+        """Blocks until a background build has finished. Returns self.ready."""
+        with _builds_lock:
+            thread = _builds.get(self.sidecar)
+        if thread is not None:
+            thread.join(timeout)
+        self._ensure_ready()
+        return self.ready
+
+    def _building(self):
+        with _builds_lock:
+            thread = _builds.get(self.sidecar)
+        return thread is not None and thread.is_alive()
+
+    def _ensure_ready(self):
+        if not self.ready:
+            with self._lock:
+                pending, self._pending = self._pending, None
+            if pending is not None:
+                self._install(*pending)
+                self._saved_counter = pending[0]['change_counter']
+                self.ready = True
+            elif self._building():
+                return False # Still not ready: the file is only worth reading again once the build is over
+            elif not self.load_sidecar():
+                self._start_build()
+                return False
+        self.refresh()
+        return True
+
+    def close(self):
+        """Brings the cache file up to date with what this store has seen, if it is behind."""
+        if not self.sidecar or not self.ready:
+            return
+        self.refresh()
+        if self.change_counter == self._saved_counter:
+            return
+        found = read_sidecar_header(self.sidecar)
+        if found is not None:
+            on_disk = found[0]
+            if ((on_disk['book_id'], on_disk['epoch']) == (self.book_id, self.epoch)
+                    and on_disk['change_counter'] >= self.change_counter):
+                return
+        self.save_sidecar()
+
+    # --- QUERIES ---
+    # Dates are inclusive 'YYYY-MM-DD' strings, None = unbounded (same as DatabaseHandler).
+    # Until the columns are ready each query falls back to the DatabaseHandler equivalent.
+
+    def _range(self, start_date=None, end_date=None):
+        lo = np.searchsorted(self.day, to_day(start_date), side='left') if start_date else 0
+        hi = np.searchsorted(self.day, to_day(end_date), side='right') if end_date else len(self.day)
+        return slice(lo, max(lo, hi))
+
+    def _bincount(self, account, weights):
+        # float64 weights are exact for integer cents below 2**53
+        sums = np.bincount(account, weights=weights, minlength=len(self.account_names))
+        return np.rint(sums).astype(np.int64)
+
+    def balances(self, start_date=None, end_date=None):
+        """Same shape as DatabaseHandler.get_balances_period / get_balances_snapshot."""
+        if not self._ensure_ready():
+            return self.db.get_balances_period(start_date, end_date)
+        r = self._range(start_date, end_date)
+        account = self.account[r]
+        counts = np.bincount(account, minlength=len(self.account_names))
+        debits = self._bincount(account, self.debit[r])
+        credits = self._bincount(account, self.credit[r])
+
+        accounts = {}
+        for acc_id in np.flatnonzero(counts):
+            acc_type = self.type_names[self.account_type[acc_id]]
+            dr, cr = int(debits[acc_id]), int(credits[acc_id])
+            net = dr - cr if acc_type in DEBIT_NORMAL else cr - dr
+            accounts[self.account_names[acc_id]] = {"type": acc_type, "debit_total": dr,
+                                                    "credit_total": cr, "net_balance": net}
+        return accounts
+
+    def type_totals(self, start_date=None, end_date=None):
+        """Signed total per account type name."""
+        if not self._ensure_ready():
+            totals = dict.fromkeys(ACCOUNT_TYPES, 0)
+            for info in self.db.get_balances_period(start_date, end_date).values():
+                totals[info['type']] = totals.get(info['type'], 0) + info['net_balance']
+            return totals
+        r = self._range(start_date, end_date)
+        sums = np.bincount(self.type[r], weights=self.signed[r], minlength=len(self.type_names))
+        return {name: int(np.rint(v)) for name, v in zip(self.type_names, sums)}
+
+    def net_income(self, start_date=None, end_date=None):
+        totals = self.type_totals(start_date, end_date)
+        return totals['Revenue'] - totals['Expense']
+
+    def date_range(self):
+        """Same result as DatabaseHandler.get_date_range (dates that have splits)."""
+        if not self._ensure_ready():
+            return self.db.get_date_range()
+        if not len(self.day):
+            return (None, None)
+        return from_day(self.day[0]), from_day(self.day[-1])
+
+    def _bucket_days(self, day, granularity):
+        if granularity == 'daily':
+            return day
+        if granularity == 'weekly':
+            return day - (day + 3) % 7 # 1970-01-01 was a Thursday; weeks start on Monday
+        if granularity == 'monthly':
+            months = day.astype('datetime64[D]').astype('datetime64[M]')
+            return months.astype('datetime64[D]').astype(np.int64)
+        raise ValueError(f"Unknown granularity {granularity!r} (use daily, weekly or monthly)")
+
+    def revenue_expense_series(self, start_date=None, end_date=None, granularity="daily"):
+        """Same result as DatabaseHandler.get_revenue_expense_series."""
+        if not self._ensure_ready():
+            return self.db.get_revenue_expense_series(start_date, end_date, granularity)
+        r = self._range(start_date, end_date)
+        rev_code = self.type_names.index('Revenue')
+        exp_code = self.type_names.index('Expense')
+        type_codes = self.type[r]
+        mask = (type_codes == rev_code) | (type_codes == exp_code)
+        if not mask.any():
+            self._bucket_days(self.day[:0], granularity.lower()) # Still reject a bad granularity
+            return []
+
+        type_codes = type_codes[mask]
+        signed = self.signed[r][mask]
+        buckets = self._bucket_days(self.day[r][mask].astype(np.int64), granularity.lower())
+
+        # Rows are in date order, so each bucket is one contiguous run
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+        revenue = np.add.reduceat(np.where(type_codes == rev_code, signed, 0), starts)
+        expense = np.add.reduceat(np.where(type_codes == exp_code, signed, 0), starts)
+        return [(from_day(b), int(rv), int(ex)) for b, rv, ex in zip(buckets[starts], revenue, expense)]
@@ -0,0 +1,218 @@
+"""
+Performance benchmarks over synthetic books (see utils/synthetic_book.py).
+
+    python benchmark.py --splits 10000 100000 1000000 -o results.json
+    python benchmark.py --compare old.json new.json
+
+Each book is generated into a temporary database, then the database reads, the PDF
+export and the dashboard loaders are timed. Results go to a JSON file so runs can be
+compared over time; --compare prints the change per benchmark between two such files.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from database import DatabaseHandler
+from utils.synthetic_book import build_book, splits_per_day_for
+
+RESULTS_FORMAT = 1
+
+def summarize(runs):
+    ms = [r * 1000 for r in runs]
+    return {'runs': len(ms), 'first_ms': ms[0], 'min_ms': min(ms), 'median_ms': statistics.median(ms),
+            'mean_ms': statistics.fmean(ms), 'max_ms': max(ms)}
+
+def timed(fn, repeat, setup=None):
+    """Times fn() repeat times; setup() runs untimed before each call."""
+    runs = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+    return summarize(runs)
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+# --- BENCHMARKS ---
+
+def bench_book(args, target_splits, workdir):
+    db_name = os.path.join(workdir, f"bench_{target_splits}.db")
+    db = DatabaseHandler(db_name)
+    book = {'target_splits': target_splits, 'years': args.years, 'accounts': args.accounts,
+            'splits_per_day': splits_per_day_for(target_splits, args.years), 'results': {}}
+    results = book['results']
+
+    def run(name, fn, repeat=None, setup=None):
+        if name in args.skip:
+            return
+        results[name] = timed(fn, repeat or args.repeat, setup)
+        print(f"  {name:<36}{results[name]['median_ms']:10.2f} ms")
+
+    load = build_book(db, args.seed, args.accounts, args.years, book['splits_per_day'])
+    book.update(transactions=load['transactions'], splits=load['splits'])
+    results['load_bulk'] = {'runs': 1, 'seconds': load['seconds'], 'splits_per_sec': load['splits_per_sec']}
+    print(f"book: {load['splits']:,} splits, {load['transactions']:,} transactions "
+          f"(loaded in {load['seconds']:.1f} s)")
+
+    first, last = db.get_date_range()
+    year_start = f"{last[:4]}-01-01"
+    mid = db.conn.execute("SELECT date FROM transactions ORDER BY date LIMIT 1 OFFSET ?",
+                          (load['transactions'] // 2,)).fetchone()[0]
+    busiest = db.conn.execute("""
+        SELECT a.name FROM account_balances b JOIN accounts a ON a.id = b.account_id
+        ORDER BY b.entry_count DESC LIMIT 1
+    """).fetchone()[0]
+    book.update(first_date=first, last_date=last, busiest_account=busiest)
+    uncached = db.clear_cache # Time the queries, not the report cache
+
+    # Database reads
+    run("get_ledger_account", lambda: db.get_ledger(busiest), setup=uncached)
+    run("get_ledger_all", lambda: db.get_ledger("All"), setup=uncached)
+    run("get_ledger_page", lambda: db.get_ledger_page(busiest, None, 200, "desc"), setup=uncached)
+    run("get_balances_snapshot", lambda: db.get_balances_snapshot(), setup=uncached)
+    run("get_balances_snapshot_mid", lambda: db.get_balances_snapshot(mid), setup=uncached)
+    run("get_balances_period_year", lambda: db.get_balances_period(year_start, last), setup=uncached)
+    run("get_net_income", lambda: db.get_net_income(), setup=uncached)
+    run("get_net_income_year", lambda: db.get_net_income(year_start, last), setup=uncached)
+
+    # Period closes: snapshots then read a close plus the splits after it
+    if "close_periods" not in args.skip:
+        t0 = time.perf_counter()
+        db.close_periods(last, "monthly")
+        results['close_periods'] = summarize([time.perf_counter() - t0])
+        run("get_balances_snapshot_mid_closed", lambda: db.get_balances_snapshot(mid), setup=uncached)
+
+    # PDF export
+    if "pdf_full_report" not in args.skip:
+        from utils.pdf_export import PDFExporter
+        exporter = PDFExporter(db)
+        pdf = os.path.join(workdir, "report.pdf")
+        run("pdf_full_report", lambda: exporter.generate_full_report(year_start, last, pdf),
+            repeat=max(1, args.repeat // 2), setup=uncached)
+
+    # Streaming exports of the whole journal
+    from utils import ledger_export
+    for fmt in ledger_export.WRITERS:
+        path = os.path.join(workdir, f"journal.{fmt}")
+        run(f"export_journal_{fmt}", lambda: ledger_export.export_journal(db, path, fmt),
+            repeat=max(1, args.repeat // 2))
+
+    # Dashboard loaders, through a real (hidden) window
+    if not args.no_ui:
+        bench_loaders(db, run, results)
+
+    # Writes last, so the reads above see the generated book only
+    if "add_transaction" not in args.skip:
+        lines = [{'account_name': busiest, 'account_type': 'Asset', 'debit': 1234, 'credit': 0},
+                 {'account_name': 'Sales', 'account_type': 'Revenue', 'debit': 0, 'credit': 1234}]
+        run("add_transaction", lambda: db.add_transaction(last, "Benchmark post", lines),
+            repeat=args.writes)
+
+    db.close()
+    return book
+
+def bench_loaders(db, run, results):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtWidgets import QApplication
+    from ui.dashboard import DashboardWindow
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    window = DashboardWindow(db)
+    window.executor.pool.waitForDone() # The first page's own load must not overlap the timings
+    app.processEvents()
+
+    # The loaders read the NumPy column store: time getting it ready once, then the loaders
+    t0 = time.perf_counter()
+    cols = db.columns()
+    cols.balances()
+    cols.wait_ready()
+    results['columns_ready'] = summarize([time.perf_counter() - t0])
+
+    stats = window.stats_page
+    run("loader_trial_balance", lambda: window.get_tb_data(db))
+    run("loader_income_statement", lambda: window.get_is_data(db))
+    run("loader_balance_sheet", lambda: window.get_bs_data(db))
+    run("loader_stats_all_time", lambda: stats.fetch_data(db, None, None, "Daily"), setup=db.clear_cache)
+    window.close()
+    app.processEvents()
+
+# --- COMPARE ---
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    old_books = {b['target_splits']: b for b in old['books']}
+    for book in new['books']:
+        base = old_books.get(book['target_splits'])
+        if base is None:
+            continue
+        print(f"{book['target_splits']:,} splits  ({old['meta'].get('commit')} -> {new['meta'].get('commit')})")
+        for name, res in book['results'].items():
+            was = base['results'].get(name)
+            if not was or 'median_ms' not in res or 'median_ms' not in was:
+                continue
+            ratio = res['median_ms'] / was['median_ms'] if was['median_ms'] else float('inf')
+            print(f"  {name:<36}{was['median_ms']:10.2f} -> {res['median_ms']:10.2f} ms  x{ratio:.2f}")
+
+# --- MAIN ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ratio performance benchmarks")
+    parser.add_argument("--splits", type=int, nargs="+", default=[10000],
+                        help="book sizes to generate, in splits (10k to 5M)")
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--accounts", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per read benchmark")
+    parser.add_argument("--writes", type=int, default=100, help="add_transaction calls to time")
+    parser.add_argument("--skip", nargs="*", default=[], help="benchmark names to leave out")
+    parser.add_argument("--no-ui", action="store_true", help="skip the dashboard loaders (no Qt)")
+    parser.add_argument("-o", "--output", help="results file (default: bench-<timestamp>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two results files")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    started = datetime.now()
+    results = {
+        'format': RESULTS_FORMAT,
+        'meta': {'started': started.isoformat(timespec='seconds'), 'commit': git_commit(),
+                 'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version,
+                 'platform': platform.platform(), 'args': vars(args)},
+        'books': [],
+    }
+    output = args.output or f"bench-{started:%Y%m%d-%H%M%S}.json"
+    workdir = tempfile.mkdtemp(prefix="ratio-bench-")
+    try:
+        for target in args.splits:
+            results['books'].append(bench_book(args, target, workdir))
+            # Written after every book so a long run still leaves results behind
+            with open(output, "w") as f:
+                json.dump(results, f, indent=2)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+"""
+ratio: the headless command line. Never imports Qt or matplotlib, so it starts fast and
+runs on machines without a display (nightly reports, scripted imports).
+
+    python cli.py --db ratio.db import journal.csv
+    python cli.py trial-balance --format csv -o tb.csv
+    python cli.py statement income --start 2024-01-01 --end 2024-12-31 --format json
+    python cli.py statement balance --as-of 2024-12-31
+    python cli.py pdf --start 2024-01-01 --end 2024-12-31 -o report.pdf
+    python cli.py export journal -o journal.rcol
+    python cli.py export ledger --account Cash --start 2024-01-01 -o cash.csv
+    python cli.py bank-import statement.ofx --account Checking --post
+    python cli.py reconcile 3 --days 5
+    python cli.py rules add substring "starbucks" --account Meals --type Expense
+    python cli.py categorize 3
+"""
+import argparse
+import csv
+import datetime
+import io
+import json
+import os
+import sqlite3
+import sys
+from itertools import groupby
+
+import statements
+from database import DatabaseHandler
+from utils.money import fmt_money, to_cents
+
+IMPORT_COLUMNS = ("date", "description", "account", "type", "debit", "credit")
+
+class CLIError(Exception):
+    """A problem with the user's input: printed without a traceback."""
+
+def open_db(args, write=False):
+    if write:
+        return DatabaseHandler(args.db)
+    if not os.path.exists(args.db):
+        raise CLIError(f"No database at {args.db}")
+    db = DatabaseHandler(args.db, read_only=True)
+    if db.schema_version() < DatabaseHandler.SCHEMA_VERSION:
+        # A book from an older version: read-only handlers skip the upgrade, so run it once
+        db.close()
+        try:
+            DatabaseHandler(args.db).close()
+        except sqlite3.Error as e:
+            raise CLIError(f"{args.db} is from an older version and could not be upgraded ({e}): "
+                           f"run the app (or a write command) once to upgrade this database")
+        db = DatabaseHandler(args.db, read_only=True)
+    return db
+
+# --- IMPORT ---
+
+def read_journal_csv(f):
+    """
+    Yields (date, description, lines) from a CSV with the IMPORT_COLUMNS header (plus an
+    optional "ref"). Consecutive rows with the same ref, or the same date and description
+    when there is no ref, form one transaction. Amounts are in currency units.
+    """
+    reader = csv.DictReader(f)
+    header = [h.strip().lower() for h in reader.fieldnames or []]
+    missing = [c for c in IMPORT_COLUMNS if c not in header]
+    if missing:
+        raise CLIError(f"Missing CSV columns: {', '.join(missing)}")
+    reader.fieldnames = header
+
+    def key(numbered):
+        _, row = numbered
+        return row.get('ref') or (row['date'], row['description'])
+
+    for _, group in groupby(enumerate(reader, start=2), key=key):
+        group = list(group)
+        first = group[0][1]
+        try:
+            date = datetime.date.fromisoformat(first['date'].strip()).isoformat()
+        except ValueError:
+            raise CLIError(f"Line {group[0][0]}: date {first['date']!r} is not YYYY-MM-DD")
+        lines = []
+        for line_no, row in group:
+            acc_type = row['type'].strip().title()
+            if acc_type not in statements.ACCOUNT_TYPES:
+                raise CLIError(f"Line {line_no}: unknown account type {row['type']!r}")
+            try:
+                debit = to_cents(row['debit'] or 0)
+                credit = to_cents(row['credit'] or 0)
+            except ValueError as e:
+                raise CLIError(f"Line {line_no}: {e}")
+            lines.append({'account_name': row['account'], 'account_type': acc_type,
+                          'debit': debit, 'credit': credit})
+        if sum(l['debit'] for l in lines) != sum(l['credit'] for l in lines):
+            raise CLIError(f"Line {group[0][0]}: transaction {first['date']} {first['description']!r} does not balance")
+        yield date, first['description'].strip(), lines
+
+def cmd_import(args):
+    with open(args.file, newline="", encoding="utf-8-sig") as f:
+        transactions = list(read_journal_csv(f))
+    if args.dry_run:
+        print(f"{len(transactions):,} transactions OK (dry run, nothing saved)")
+        return
+    db = open_db(args, write=True)
+    try:
+        stats = db.add_transactions_bulk(transactions)
+    finally:
+        db.close()
+    print(f"Imported {stats['transactions']:,} transactions ({stats['splits']:,} splits) "
+          f"in {stats['seconds']:.2f} s")
+
+def cmd_bank_import(args):
+    from utils import bank_import
+    if not os.path.exists(args.file):
+        raise CLIError(f"No statement file at {args.file}")
+    db = open_db(args, write=True)
+    try:
+        stats = bank_import.import_statement(db, args.file, args.account, args.format, args.date_format,
+                                             post=args.post, categorize=not args.no_categorize,
+                                             decimal=args.decimal)
+    finally:
+        db.close()
+    warn_skipped(stats['skipped_rules'])
+    resumed = f" (resumed after line {stats['resumed_after']:,})" if stats['resumed_after'] and stats['staged'] else ""
+    print(f"Batch {stats['batch']}: {stats['lines']:,} lines{resumed}, {stats['duplicates']:,} already in the book, "
+          f"{stats['categorized']:,} categorized, {stats['posted']:,} posted in {stats['seconds']:.2f} s")
+
+def cmd_reconcile(args):
+    from utils.reconcile import reconcile_statement
+    db = open_db(args, write=not args.dry_run)
+    try:
+        stats = reconcile_statement(db, args.batch, args.account, args.days, args.max_group, apply=not args.dry_run)
+        open_lines = {row[0]: row for row in db.get_open_lines(args.batch)}
+        summary = db.get_reconciliation_summary(stats['account'])
+    finally:
+        db.close()
+    print(f"Batch {args.batch} against {stats['account']}: {stats['matched']:,} of {stats['lines']:,} open lines matched "
+          f"({stats['exact']:,} exact, {stats['group']:,} grouped, {stats['own']:,} posted by the import)"
+          f"{' (dry run, nothing saved)' if args.dry_run else ''}")
+    for line_id in stats['unmatched']:
+        _, date, amount, description, _ = open_lines[line_id]
+        print(f"  unmatched  {date}  {fmt_money(amount, parens=True):>14}  {description}")
+    print(f"{stats['account']}: {summary['reconciled']:,} splits reconciled, {summary['open']:,} open "
+          f"({fmt_money(summary['open_balance'], parens=True)})")
+
+# --- CATEGORIZATION ---
+
+def cmd_rules(args):
+    db = open_db(args, write=True) # Opened for writing even to list: that creates the rules table in older books
+    try:
+        if args.action == "list":
+            for rule_id, _, kind, pattern, account, acc_type, low, high in db.get_rules():
+                bounds = "" if low is None and high is None else \
+                    f"  [{'' if low is None else fmt_money(low)} .. {'' if high is None else fmt_money(high)}]"
+                print(f"{rule_id:>4}  {kind:<9}  {pattern or '':<30}  -> {account} ({acc_type}){bounds}")
+        elif args.action == "add":
+            rule_id = db.add_rule(args.kind, args.pattern, *rule_target(args))
+            print(f"Rule {rule_id} added")
+        elif not db.delete_rule(args.rule):
+            raise CLIError(f"No rule {args.rule}")
+        else:
+            print(f"Rule {args.rule} removed")
+    finally:
+        db.close()
+
+def rule_target(args):
+    """(account, type, min_amount, max_amount) of `rules add`, checked before anything is saved."""
+    from utils.categorize import check_rule
+    acc_type = args.type.strip().title()
+    if acc_type not in statements.ACCOUNT_TYPES:
+        raise CLIError(f"Unknown account type {args.type!r}")
+    try:
+        low = to_cents(args.min) if args.min is not None else None
+        high = to_cents(args.max) if args.max is not None else None
+    except ValueError as e:
+        raise CLIError(str(e))
+    if args.kind == "amount" and low is None and high is None:
+        raise CLIError("An amount rule needs --min or --max")
+    check_rule(args.kind, args.pattern)
+    return args.account, acc_type, low, high
+
+def warn_skipped(rules):
+    for rule_id, reason in rules:
+        print(f"ratio: rule {rule_id} skipped: {reason} (fix it with rules remove / add)", file=sys.stderr)
+
+def cmd_categorize(args):
+    from utils.categorize import categorize_batch
+    db = open_db(args, write=True)
+    try:
+        stats = categorize_batch(db, args.batch, overwrite=args.overwrite)
+    finally:
+        db.close()
+    warn_skipped(stats['skipped_rules'])
+    print(f"Batch {args.batch}: {stats['lines']:,} lines, {stats['by_rule']:,} by rule, {stats['learned']:,} learned, "
+          f"{stats['uncategorized']:,} left uncategorized in {stats['seconds']:.2f} s")
+
+# --- REPORTS ---
+
+def write_rows(args, rows, columns):
+    if args.format == "json":
+        text = json.dumps(statements.to_records(rows, columns), indent=2) + "\n"
+    elif args.format == "csv":
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=columns, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(statements.to_records(rows, columns))
+        text = buf.getvalue()
+    else:
+        width = max([len(str(row[0])) for row in rows] + [len(columns[0])]) + 2
+        lines = [columns[0].title().ljust(width) + "".join(c.title().rjust(16) for c in columns[1:])]
+        for row in rows:
+            cells = [fmt_money(v, parens=True) if isinstance(v, int) else str(v) for v in row[1:]]
+            lines.append(str(row[0]).ljust(width) + "".join(c.rjust(16) for c in cells))
+        text = "\n".join(lines) + "\n"
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+
+def cmd_trial_balance(args):
+    db = open_db(args)
+    try:
+        rows = statements.trial_balance(db.get_balances_snapshot(args.as_of))
+    finally:
+        db.close()
+    write_rows(args, rows, ["account", "debit", "credit"])
+
+def cmd_statement(args):
+    db = open_db(args)
+    try:
+        if args.kind == "income":
+            rows = statements.income_statement(db.get_balances_period(args.start, args.end))
+        else:
+            rows = statements.balance_sheet(db.get_balances_snapshot(args.as_of))
+    finally:
+        db.close()
+    write_rows(args, rows, ["line", "amount"])
+
+def cmd_pdf(args):
+    from utils.pdf_export import PDFExporter # reportlab: only this command pays for it
+    db = open_db(args)
+    try:
+        filename = PDFExporter(db).generate_full_report(args.start, args.end, args.output)
+    finally:
+        db.close()
+    print(f"Report written to {filename}")
+
+# --- EXPORT ---
+
+def cmd_export(args):
+    from utils import ledger_export
+    fmt = args.format or ledger_export.format_for(args.output)
+    db = open_db(args)
+    try:
+        options = dict(fmt=fmt, chunk_size=args.chunk_size, trace_memory=args.memory)
+        if args.kind == "journal":
+            stats = ledger_export.export_journal(db, args.output, start_date=args.start, end_date=args.end, **options)
+        elif args.kind == "ledger":
+            if not args.account:
+                raise CLIError("export ledger needs --account")
+            stats = ledger_export.export_ledger(db, args.account, args.output, start_date=args.start,
+                                                end_date=args.end, **options)
+        else:
+            stats = ledger_export.export_trial_balance(db, args.output, as_of=args.as_of, **options)
+    finally:
+        db.close()
+    line = (f"Exported {stats['rows']:,} rows to {args.output} ({stats['bytes'] / 1e6:.1f} MB, {fmt}) "
+            f"in {stats['seconds']:.2f} s: {stats['rows_per_sec']:,.0f} rows/s, {stats['mb_per_sec']:.1f} MB/s")
+    if 'peak_kb' in stats:
+        line += f", peak {stats['peak_kb']:,.0f} KB"
+    print(line)
+
+# --- MAIN ---
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="ratio", description="Ratio accounting, without the GUI")
+    parser.add_argument("--db", default="ratio.db", help="database file (default: ratio.db)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("import", help="load journal lines from a CSV file")
+    p.add_argument("file", help=f"CSV with columns {', '.join(IMPORT_COLUMNS)} (and optionally ref)")
+    p.add_argument("--dry-run", action="store_true", help="validate only")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("bank-import", help="stage a bank statement (CSV, OFX, QIF), flag duplicates, optionally post")
+    p.add_argument("file", help=".csv, .ofx/.qfx or .qif; re-running an interrupted import resumes it")
+    p.add_argument("--account", required=True, help="the bank account the statement is for")
+    p.add_argument("--format", choices=("csv", "ofx", "qif"), help="override the format the file name implies")
+    p.add_argument("--date-format", help="strptime format of the dates, e.g. %%d/%%m/%%Y (default: detected)")
+    p.add_argument("--decimal", choices=(".", ","), help="decimal separator of the amounts (default: . ; OFX: either)")
+    p.add_argument("--post", action="store_true", help="post every line not flagged as a duplicate")
+    p.add_argument("--no-categorize", action="store_true", help="leave the lines' accounts unassigned")
+    p.set_defaults(func=cmd_bank_import)
+
+    p = sub.add_parser("reconcile", help="match an imported statement's lines to the account's open splits")
+    p.add_argument("batch", type=int, help="the batch number bank-import printed")
+    p.add_argument("--account", help="account to reconcile (default: the statement's)")
+    p.add_argument("--days", type=int, default=3, help="date tolerance either side (default: 3)")
+    p.add_argument("--max-group", type=int, default=4, help="most splits one line may clear (default: 4, 1 = one-to-one)")
+    p.add_argument("--dry-run", action="store_true", help="show the matches without saving them")
+    p.set_defaults(func=cmd_reconcile)
+
+    p = sub.add_parser("rules", help="list, add or remove the rules that categorize imported lines")
+    rules = p.add_subparsers(dest="action", required=True)
+    rules.add_parser("list", help="the rules in the order they are tried")
+    r = rules.add_parser("add", help="a rule tried after the existing ones")
+    r.add_argument("kind", choices=DatabaseHandler.RULE_KINDS)
+    r.add_argument("pattern", nargs="?",
+                   help="substring: words of the normalized description (no digits or punctuation); "
+                        "regex: searched in the description as imported, ignoring case")
+    r.add_argument("--account", required=True, help="the account matching lines go to")
+    r.add_argument("--type", required=True, help="that account's type")
+    r.add_argument("--min", help="only amounts of at least this (signed, currency units; money out is negative)")
+    r.add_argument("--max", help="only amounts of at most this")
+    r = rules.add_parser("remove", help="delete a rule")
+    r.add_argument("rule", type=int, help="the id rules list prints")
+    p.set_defaults(func=cmd_rules)
+
+    p = sub.add_parser("categorize", help="assign accounts to an imported statement's lines by rule or history")
+    p.add_argument("batch", type=int, help="the batch number bank-import printed")
+    p.add_argument("--overwrite", action="store_true", help="also redo lines that already have an account")
+    p.set_defaults(func=cmd_categorize)
+
+    def report_options(p):
+        p.add_argument("--format", choices=("table", "json", "csv"), default="table")
+        p.add_argument("-o", "--output", help="write to a file instead of stdout")
+
+    p = sub.add_parser("trial-balance", help="debit and credit totals per account")
+    p.add_argument("--as-of", help="YYYY-MM-DD (default: all postings)")
+    report_options(p)
+    p.set_defaults(func=cmd_trial_balance)
+
+    p = sub.add_parser("statement", help="income statement or balance sheet")
+    p.add_argument("kind", choices=("income", "balance"))
+    p.add_argument("--start", help="income: first day, YYYY-MM-DD (default: all time)")
+    p.add_argument("--end", help="income: last day, YYYY-MM-DD")
+    p.add_argument("--as-of", help="balance: YYYY-MM-DD (default: all postings)")
+    report_options(p)
+    p.set_defaults(func=cmd_statement)
+
+    p = sub.add_parser("pdf", help="income statement and balance sheet as a PDF")
+    p.add_argument("--start", required=True, help="YYYY-MM-DD")
+    p.add_argument("--end", required=True, help="YYYY-MM-DD")
+    p.add_argument("-o", "--output", default="Ratio_Report.pdf")
+    p.set_defaults(func=cmd_pdf)
+
+    p = sub.add_parser("export", help="stream the journal, a ledger or the trial balance to CSV, JSON Lines or RCOL")
+    p.add_argument("kind", choices=("journal", "ledger", "trial-balance"))
+    p.add_argument("-o", "--output", required=True, help="file; .csv, .jsonl or .rcol picks the format")
+    p.add_argument("--format", choices=("csv", "jsonl", "rcol"), help="override the format the file name implies")
+    p.add_argument("--account", help="ledger: the account")
+    p.add_argument("--start", help="journal/ledger: first day, YYYY-MM-DD")
+    p.add_argument("--end", help="journal/ledger: last day, YYYY-MM-DD")
+    p.add_argument("--as-of", help="trial-balance: YYYY-MM-DD (default: all postings)")
+    p.add_argument("--chunk-size", type=int, default=5000, help="rows fetched and written at a time")
+    p.add_argument("--memory", action="store_true", help="also report peak memory (slower)")
+    p.set_defaults(func=cmd_export)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        args.func(args)
+    except (CLIError, ValueError) as e: # ValueError: e.g. the database rejected a transaction
+        print(f"ratio: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,42 +1,328 @@
 import sqlite3
+import calendar
+import datetime
+import re
+import time
 import uuid
+from collections import OrderedDict
+from pathlib import Path
 
 class DatabaseHandler:
-    def __init__(self, db_name="ratio.db"):
-        self.conn = sqlite3.connect(db_name, check_same_thread=False)
-        self.create_tables()
+    def __init__(self, db_name="ratio.db", read_only=False, cache_size=128):
+        self.db_name = db_name
+        self.read_only = read_only
+        
+        # Report query cache (see _cached). _generation is bumped by every write method.
+        self._generation = 0
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._cache_version = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._accounts = {} # name -> (id, type), for the write path
+        self._columns = None # analytics.JournalColumns, see columns()
+        self._subscribers = [] # Change listeners, see subscribe()
+        self.tracer = None # query_trace.QueryTracer while tracing, see enable_tracing()
+        self.closed = False
+        
+        if read_only:
+            uri = Path(db_name).resolve().as_uri() + "?mode=ro"
+            self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        else:
+            self.conn = sqlite3.connect(db_name, check_same_thread=False)
+            # WAL lets reader connections (see open_reader) query while we write
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.create_tables()
+
+    def open_reader(self):
+        """A second, read-only handler on the same file, for use from a worker thread."""
+        if self.db_name == ":memory:":
+            return self
+        reader = DatabaseHandler(self.db_name, read_only=True)
+        if self.tracer is not None:
+            reader.enable_tracing(self.tracer)
+        return reader
+
+    def open_writer(self):
+        """
+        A second, writable handler on the same file, for long writes on a worker thread
+        (see ui.write_worker). It shares this handler's change listeners, so subscribers
+        hear about its writes too (on the worker thread, as subscribe() warns).
+        """
+        if self.db_name == ":memory:":
+            return self
+        writer = DatabaseHandler(self.db_name)
+        writer._subscribers = self._subscribers # The same list: later subscribe() calls reach both
+        if self.tracer is not None:
+            writer.enable_tracing(self.tracer)
+        return writer
+
+    # --- TRACING ---
+
+    def enable_tracing(self, tracer=None):
+        """
+        Records every statement on this connection (text, time, rows, calling page) into a
+        query_trace.QueryTracer, shared with readers opened afterwards. Returns the tracer.
+        """
+        from query_trace import QueryTracer, TracedConnection
+        self.disable_tracing()
+        self.tracer = tracer or QueryTracer()
+        self.conn = TracedConnection(self.conn, self.tracer)
+        return self.tracer
+
+    def disable_tracing(self):
+        if self.tracer is not None:
+            self.conn = self.conn.detach()
+            self.tracer = None
+
+    def close(self):
+        """Safe to call more than once (the dashboard closes the handler it was given)."""
+        if self.closed:
+            return
+        self.closed = True
+        if self._columns is not None:
+            self._columns.close() # Persists the column cache file if it is newer than the one on disk
+        if not self.read_only:
+            self.conn.execute("PRAGMA optimize") # Keeps planner statistics current
+        self.conn.close()
+
+    # Bump when the schema changes; create_tables upgrades older files
+    SCHEMA_VERSION = 2
+
+    def schema_version(self):
+        """The file's PRAGMA user_version: behind SCHEMA_VERSION until a writable handler has upgraded it."""
+        return self.conn.execute("PRAGMA user_version").fetchone()[0]
 
     def create_tables(self):
         cursor = self.conn.cursor()
+        cursor.execute("PRAGMA user_version")
+        version = cursor.fetchone()[0]
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name IN ('journal_entries', 'account_balances', 'journal_fts')")
+        existing = {row[0] for row in cursor.fetchall()}
+        # Older files get their journal table rebuilt:
+        # v0 keeps account_name/account_type on every split, v0 and v1 store REAL amounts
+        legacy = version < self.SCHEMA_VERSION and 'journal_entries' in existing
         
-        # 1. Transactions Header
+        try:
+            cursor.execute("BEGIN")
+            if legacy:
+                cursor.execute("DROP INDEX IF EXISTS idx_acc_name")
+                cursor.execute("DROP INDEX IF EXISTS idx_account")
+                cursor.execute("DROP INDEX IF EXISTS idx_trans_id")
+                cursor.execute("DROP INDEX IF EXISTS idx_amount")
+                cursor.execute("DROP TABLE IF EXISTS account_balances")
+                cursor.execute("DROP TABLE IF EXISTS journal_fts")
+                cursor.execute("ALTER TABLE journal_entries RENAME TO journal_entries_old")
+            
+            # 1. Transactions Header
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS transactions (
+                    id TEXT PRIMARY KEY,
+                    date TEXT,
+                    description TEXT,
+                    posted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # 2. Chart of Accounts (the type of an account lives here, once)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS accounts (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL UNIQUE,
+                    type TEXT NOT NULL
+                )
+            """)
+            
+            # 3. Journal Entries (Splits). Amounts are integer cents.
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS journal_entries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    transaction_id TEXT,
+                    account_id INTEGER,
+                    debit INTEGER NOT NULL DEFAULT 0,
+                    credit INTEGER NOT NULL DEFAULT 0,
+                    FOREIGN KEY(transaction_id) REFERENCES transactions(id) ON DELETE CASCADE,
+                    FOREIGN KEY(account_id) REFERENCES accounts(id)
+                )
+            """)
+            
+            # 4. Running Totals (one row per account, maintained by the write methods)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS account_balances (
+                    account_id INTEGER PRIMARY KEY REFERENCES accounts(id),
+                    debit_total INTEGER NOT NULL DEFAULT 0,
+                    credit_total INTEGER NOT NULL DEFAULT 0,
+                    entry_count INTEGER DEFAULT 0
+                )
+            """)
+            
+            # 5. Period Close Snapshots: cumulative per-account totals as of each closed period end
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS period_closes (
+                    period_end TEXT PRIMARY KEY,
+                    closed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS period_balances (
+                    period_end TEXT NOT NULL,
+                    account_id INTEGER NOT NULL REFERENCES accounts(id),
+                    debit_total INTEGER NOT NULL DEFAULT 0,
+                    credit_total INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (period_end, account_id)
+                )
+            """)
+            
+            # 6. Change tracking for incremental readers and the column cache file (see analytics.py):
+            # ids of deleted splits in delete order; meta holds a random id for this book, a
+            # counter bumped by every journal write and an epoch bumped when the journal is wiped
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS deleted_entries (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    entry_id INTEGER NOT NULL
+                )
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            cursor.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('book_id', ?)", (uuid.uuid4().int >> 66,))
+            cursor.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('change_counter', 0)")
+            cursor.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('journal_epoch', 0)")
+            
+            # 7. Full-text index: one row per split (rowid = journal_entries.id) holding the
+            # transaction description and the account name, maintained by the write methods
+            cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS journal_fts USING fts5(
+                    description, account,
+                    tokenize = 'unicode61 remove_diacritics 2',
+                    prefix = '2 3'
+                )
+            """)
+            
+            # 8. Bank statement imports (see utils.bank_import): one batch per statement file and
+            # account, its lines staged for duplicate checks and review before they are posted
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS import_batches (
+                    id INTEGER PRIMARY KEY,
+                    account TEXT NOT NULL,
+                    source TEXT,
+                    file_hash TEXT NOT NULL,
+                    format TEXT,
+                    status TEXT NOT NULL DEFAULT 'staging',
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE (account, file_hash)
+                )
+            """)
+            # amount: signed cents as the bank sees it (+ money in, - money out). match_key: hash of
+            # (date, amount, normalized description). account/account_type: the other side of the
+            # posting, None until assigned (posted as uncategorized)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS staged_lines (
+                    id INTEGER PRIMARY KEY,
+                    batch_id INTEGER NOT NULL REFERENCES import_batches(id) ON DELETE CASCADE,
+                    line_no INTEGER NOT NULL,
+                    date TEXT NOT NULL,
+                    amount INTEGER NOT NULL,
+                    description TEXT,
+                    ref TEXT,
+                    match_key INTEGER NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    duplicate_of TEXT,
+                    account TEXT,
+                    account_type TEXT,
+                    transaction_id TEXT,
+                    UNIQUE (batch_id, line_no)
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_staged_ref ON staged_lines(ref) WHERE ref IS NOT NULL")
+            
+            # 9. Bank reconciliation (see utils.reconcile): each reconciled split and the statement
+            # line it cleared as. Several splits can clear one line (a deposit of three cheques).
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS reconciled_splits (
+                    entry_id INTEGER PRIMARY KEY,
+                    line_id INTEGER NOT NULL REFERENCES staged_lines(id) ON DELETE CASCADE,
+                    reconciled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_reconciled_line ON reconciled_splits(line_id)")
+            
+            # 10. Categorization rules for imported lines (see utils.categorize), tried in position
+            # order. kind: 'substring' (on the normalized description), 'regex' (on the description
+            # as imported, case-insensitive) or 'amount' (no pattern). min/max_amount: optional
+            # inclusive bounds on the signed bank amount, cents.
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS categorization_rules (
+                    id INTEGER PRIMARY KEY,
+                    position INTEGER NOT NULL DEFAULT 0,
+                    kind TEXT NOT NULL,
+                    pattern TEXT,
+                    account TEXT NOT NULL,
+                    account_type TEXT NOT NULL,
+                    min_amount INTEGER,
+                    max_amount INTEGER
+                )
+            """)
+            
+            if legacy and version < 1:
+                self._migrate_v0_journal(cursor)
+            elif legacy:
+                self._migrate_v1_journal(cursor)
+            
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_date ON transactions(date)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_account ON journal_entries(account_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_trans_id ON journal_entries(transaction_id)")
+            # A split is either a debit or a credit, so this is its amount (search by amount range)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_amount ON journal_entries(debit + credit)")
+            cursor.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+            
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            raise e
+        
+        # Files from before the totals table / search index (or just migrated): derive them once
+        if legacy or 'account_balances' not in existing:
+            self.rebuild_account_balances()
+        if legacy or 'journal_fts' not in existing:
+            self.rebuild_search_index()
+
+    # REAL currency units -> integer cents
+    _TO_CENTS = "CAST(ROUND(COALESCE({}, 0) * 100) AS INTEGER)"
+
+    def _migrate_v0_journal(self, cursor):
+        """v0 -> v2: one accounts row per distinct name, splits re-pointed at it by id, amounts in cents."""
+        # The most recent split decides the type, same rule as new postings
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS transactions (
-                id TEXT PRIMARY KEY,
-                date TEXT,
-                description TEXT,
-                posted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
+            INSERT INTO accounts (name, type)
+            SELECT j.account_name,
+                   (SELECT j2.account_type FROM journal_entries_old j2
+                    WHERE j2.account_name = j.account_name ORDER BY j2.id DESC LIMIT 1)
+            FROM journal_entries_old j
+            WHERE j.account_name IS NOT NULL
+            GROUP BY j.account_name
+        """)
+        cursor.execute(f"""
+            INSERT INTO journal_entries (id, transaction_id, account_id, debit, credit)
+            SELECT o.id, o.transaction_id, a.id,
+                   {self._TO_CENTS.format('o.debit')}, {self._TO_CENTS.format('o.credit')}
+            FROM journal_entries_old o
+            JOIN accounts a ON a.name = o.account_name
         """)
+        cursor.execute("DROP TABLE journal_entries_old")
 
-        # 2. Journal Entries (Splits)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS journal_entries (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                transaction_id TEXT,
-                account_name TEXT,
-                account_type TEXT,
-                debit REAL DEFAULT 0.0,
-                credit REAL DEFAULT 0.0,
-                FOREIGN KEY(transaction_id) REFERENCES transactions(id) ON DELETE CASCADE
-            )
+    def _migrate_v1_journal(self, cursor):
+        """v1 -> v2: REAL amounts become integer cents."""
+        cursor.execute(f"""
+            INSERT INTO journal_entries (id, transaction_id, account_id, debit, credit)
+            SELECT id, transaction_id, account_id,
+                   {self._TO_CENTS.format('debit')}, {self._TO_CENTS.format('credit')}
+            FROM journal_entries_old
         """)
-        
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_date ON transactions(date)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_acc_name ON journal_entries(account_name)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_trans_id ON journal_entries(transaction_id)")
-        
-        self.conn.commit()
+        cursor.execute("DROP TABLE journal_entries_old")
 
     # --- WRITING DATA ---
 
@@ -48,47 +334,162 @@ class DatabaseHandler:
             cursor.execute("INSERT INTO transactions (id, date, description) VALUES (?, ?, ?)", 
                            (trans_id, date, description))
             
-            for l in lines:
-                clean_name = l['account_name'].strip().title()
-                cursor.execute("""
-                    INSERT INTO journal_entries (transaction_id, account_name, account_type, debit, credit)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (trans_id, clean_name, l['account_type'], l['debit'], l['credit']))
+            rows = self._insert_lines(cursor, trans_id, lines)
+            self._add_to_balances(cursor, rows)
+            self._index_splits(cursor, "j.transaction_id = ?", (trans_id,))
+            self._invalidate_closes(cursor, date)
+            self._count_change(cursor)
+            added = self._transaction_splits(cursor, trans_id)
             
             self.conn.commit()
+            self._bump_generation()
+            self._emit('added', [trans_id], added=added)
             return True
         except Exception as e:
-            self.conn.rollback()
+            self._rollback()
+            raise e
+
+    def add_transactions_bulk(self, transactions, chunk_size=5000, before_commit=None):
+        """
+        Fast path for loading many transactions at once.
+        transactions: iterable (can be a generator) of (date, description, lines) using the
+        same line dicts as add_transaction, optionally followed by the transaction id to use.
+        Everything is written in ONE SQLite transaction with executemany, chunk_size
+        transactions at a time; an unbalanced transaction raises ValueError and nothing is saved.
+        before_commit: optional callable(cursor), run inside that SQLite transaction after the
+        last chunk (e.g. to mark the rows the transactions came from as posted).
+        Returns throughput stats, overall and per chunk.
+        """
+        cursor = self.conn.cursor()
+        stats = {'transactions': 0, 'splits': 0, 'seconds': 0.0, 'chunks': []}
+        started = time.perf_counter()
+        
+        # One random UUID per batch; the last group becomes a counter. Same shape as
+        # add_transaction's ids without paying for a uuid4() call per transaction.
+        id_prefix = str(uuid.uuid4())[:24]
+        
+        def write_chunk(headers, rows):
+            t0 = time.perf_counter()
+            cursor.executemany("INSERT INTO transactions (id, date, description) VALUES (?, ?, ?)", headers)
+            cursor.executemany("""
+                INSERT INTO journal_entries (transaction_id, account_id, debit, credit)
+                VALUES (?, ?, ?, ?)
+            """, rows)
+            self._add_to_balances(cursor, rows)
+            elapsed = time.perf_counter() - t0
+            stats['chunks'].append({
+                'chunk': len(stats['chunks']) + 1,
+                'transactions': len(headers),
+                'splits': len(rows),
+                'seconds': elapsed,
+                'splits_per_sec': len(rows) / elapsed if elapsed > 0 else float('inf'),
+            })
+            stats['transactions'] += len(headers)
+            stats['splits'] += len(rows)
+        
+        try:
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM journal_entries")
+            last_id = cursor.fetchone()[0] # Everything above this is ours: index it in one pass
+            headers, rows = [], []
+            earliest = latest = None
+            accounts = set()
+            for n, item in enumerate(transactions, 1):
+                date, description, lines = item[:3]
+                split_rows = []
+                dr_total = cr_total = 0
+                for l in lines:
+                    dr, cr = self._cents(l['debit']), self._cents(l['credit'])
+                    dr_total += dr
+                    cr_total += cr
+                    split_rows.append((l['account_name'].strip().title(), l['account_type'], dr, cr))
+                if not lines or dr_total != cr_total:
+                    raise ValueError(f"Transaction #{n} ({date} {description!r}) does not balance: "
+                                     f"debits {dr_total} vs credits {cr_total} (cents)")
+                
+                trans_id = item[3] if len(item) > 3 else f"{id_prefix}{n:012x}"
+                headers.append((trans_id, date, description))
+                if earliest is None or date < earliest:
+                    earliest = date
+                if latest is None or date > latest:
+                    latest = date
+                for name, acc_type, dr, cr in split_rows:
+                    accounts.add(name)
+                    rows.append((trans_id, self._account_id(cursor, name, acc_type), dr, cr))
+                
+                if len(headers) >= chunk_size:
+                    write_chunk(headers, rows)
+                    headers, rows = [], []
+            
+            if headers:
+                write_chunk(headers, rows)
+            self._index_splits(cursor, "j.id > ?", (last_id,))
+            if before_commit is not None:
+                before_commit(cursor)
+            if earliest is not None:
+                self._invalidate_closes(cursor, earliest)
+            self._count_change(cursor)
+            self.conn.commit()
+            self._bump_generation()
+        except Exception as e:
+            self._rollback()
             raise e
+        
+        if stats['transactions']:
+            self._emit('bulk', None, dates=[earliest, latest], accounts=sorted(accounts),
+                       count=stats['transactions'])
+        stats['seconds'] = time.perf_counter() - started
+        stats['splits_per_sec'] = stats['splits'] / stats['seconds'] if stats['seconds'] > 0 else float('inf')
+        
+        # A big load changes the table statistics the query planner relies on (searches)
+        if stats['splits'] >= 10000:
+            self.conn.execute("ANALYZE")
+        return stats
 
     def update_transaction(self, trans_id, new_date, new_desc, new_lines):
         cursor = self.conn.cursor()
         try:
+            removed = self._transaction_splits(cursor, trans_id)
+            # Both the old and the new date may sit inside a closed period
+            self._invalidate_closes(cursor, self._transaction_date(cursor, trans_id))
+            self._invalidate_closes(cursor, new_date)
+            self._unindex_splits(cursor, trans_id) # Keyed by the old date
             cursor.execute("UPDATE transactions SET date = ?, description = ? WHERE id = ?", 
                            (new_date, new_desc, trans_id))
+            self._subtract_from_balances(cursor, trans_id)
+            self._record_deleted_splits(cursor, trans_id)
             cursor.execute("DELETE FROM journal_entries WHERE transaction_id = ?", (trans_id,))
             
-            for l in new_lines:
-                clean_name = l['account_name'].strip().title()
-                cursor.execute("""
-                    INSERT INTO journal_entries (transaction_id, account_name, account_type, debit, credit)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (trans_id, clean_name, l['account_type'], l['debit'], l['credit']))
+            rows = self._insert_lines(cursor, trans_id, new_lines)
+            self._add_to_balances(cursor, rows)
+            self._index_splits(cursor, "j.transaction_id = ?", (trans_id,))
+            self._count_change(cursor)
+            added = self._transaction_splits(cursor, trans_id)
             
             self.conn.commit()
+            self._bump_generation()
+            self._emit('updated', [trans_id], added=added, removed=removed)
             return True
         except Exception as e:
-            self.conn.rollback()
+            self._rollback()
             raise e
 
     def delete_transaction(self, trans_id):
         cursor = self.conn.cursor()
         try:
+            removed = self._transaction_splits(cursor, trans_id)
+            self._invalidate_closes(cursor, self._transaction_date(cursor, trans_id))
+            self._subtract_from_balances(cursor, trans_id)
+            self._record_deleted_splits(cursor, trans_id)
+            self._unindex_splits(cursor, trans_id)
             cursor.execute("DELETE FROM journal_entries WHERE transaction_id = ?", (trans_id,))
             cursor.execute("DELETE FROM transactions WHERE id = ?", (trans_id,))
+            self._count_change(cursor)
             self.conn.commit()
+            self._bump_generation()
+            if removed:
+                self._emit('deleted', [trans_id], removed=removed)
         except Exception as e:
-            self.conn.rollback()
+            self._rollback()
             raise e
 
     # --- NEW: RESET FUNCTION ---
@@ -97,20 +498,422 @@ class DatabaseHandler:
         cursor = self.conn.cursor()
         try:
             cursor.execute("DELETE FROM journal_entries")
+            cursor.execute("DELETE FROM journal_fts")
             cursor.execute("DELETE FROM transactions")
+            cursor.execute("DELETE FROM account_balances")
+            cursor.execute("DELETE FROM period_balances")
+            cursor.execute("DELETE FROM period_closes")
+            cursor.execute("DELETE FROM reconciled_splits")
+            cursor.execute("DELETE FROM staged_lines")
+            cursor.execute("DELETE FROM import_batches")
+            cursor.execute("DELETE FROM accounts")
             # Reset auto-increment counters
             cursor.execute("DELETE FROM sqlite_sequence WHERE name='journal_entries'")
+            # Split ids start over, so incremental readers must reload from scratch
+            cursor.execute("DELETE FROM deleted_entries")
+            cursor.execute("UPDATE meta SET value = value + 1 WHERE key = 'journal_epoch'")
+            self._count_change(cursor)
             self.conn.commit()
+            self._accounts.clear()
+            self._bump_generation()
+            self._emit('cleared', None)
             return True
         except Exception as e:
-            self.conn.rollback()
+            self._rollback()
             raise e
 
+    def _rollback(self):
+        self.conn.rollback()
+        self._accounts.clear() # May hold ids of accounts created by the rolled back work
+
+    @staticmethod
+    def _cents(value):
+        """Line amounts are integer cents: convert currency units with utils.money.to_cents first."""
+        if value is None:
+            return 0
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+        # A float is refused even when whole: 12.0 is more likely $12 than 12 cents
+        raise ValueError(f"Amounts must be integer cents (see utils.money.to_cents), got {value!r}")
+
+    def _account_id(self, cursor, name, acc_type):
+        """Id of the named account, creating it if needed. The latest posting decides its type."""
+        known = self._accounts.get(name)
+        if known and known[1] == acc_type:
+            return known[0]
+        cursor.execute("""
+            INSERT INTO accounts (name, type) VALUES (?, ?)
+            ON CONFLICT(name) DO UPDATE SET type = excluded.type
+        """, (name, acc_type))
+        cursor.execute("SELECT id FROM accounts WHERE name = ?", (name,))
+        acc_id = cursor.fetchone()[0]
+        self._accounts[name] = (acc_id, acc_type)
+        return acc_id
+
+    def _insert_lines(self, cursor, trans_id, lines):
+        rows = []
+        for l in lines:
+            acc_id = self._account_id(cursor, l['account_name'].strip().title(), l['account_type'])
+            rows.append((trans_id, acc_id, self._cents(l['debit']), self._cents(l['credit'])))
+        cursor.executemany("""
+            INSERT INTO journal_entries (transaction_id, account_id, debit, credit)
+            VALUES (?, ?, ?, ?)
+        """, rows)
+        return rows
+
+    # --- ACCOUNT BALANCES TABLE ---
+
+    def _add_to_balances(self, cursor, rows):
+        """rows: (trans_id, account_id, debit, credit) as written to journal_entries."""
+        totals = {}
+        for _, acc_id, dr, cr in rows:
+            t = totals.setdefault(acc_id, [0, 0, 0])
+            t[0] += dr
+            t[1] += cr
+            t[2] += 1
+        cursor.executemany("""
+            INSERT INTO account_balances (account_id, debit_total, credit_total, entry_count)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(account_id) DO UPDATE SET
+                debit_total = debit_total + excluded.debit_total,
+                credit_total = credit_total + excluded.credit_total,
+                entry_count = entry_count + excluded.entry_count
+        """, [(acc_id, t[0], t[1], t[2]) for acc_id, t in totals.items()])
+
+    def _subtract_from_balances(self, cursor, trans_id):
+        """Backs the existing splits of a transaction out of the totals (call before deleting them)."""
+        cursor.execute("""
+            SELECT account_id, SUM(debit), SUM(credit), COUNT(*)
+            FROM journal_entries WHERE transaction_id = ?
+            GROUP BY account_id
+        """, (trans_id,))
+        cursor.executemany("""
+            UPDATE account_balances
+            SET debit_total = debit_total - ?, credit_total = credit_total - ?, entry_count = entry_count - ?
+            WHERE account_id = ?
+        """, [(dr or 0, cr or 0, n, acc_id) for acc_id, dr, cr, n in cursor.fetchall()])
+        cursor.execute("DELETE FROM account_balances WHERE entry_count <= 0")
+
+    def _count_change(self, cursor):
+        cursor.execute("UPDATE meta SET value = value + 1 WHERE key = 'change_counter'")
+
+    def _transaction_splits(self, cursor, trans_id):
+        """(date, account, type, debit, credit) per split of a transaction, for change events."""
+        cursor.execute("""
+            SELECT t.date, a.name, a.type, j.debit, j.credit
+            FROM journal_entries j
+            JOIN transactions t ON j.transaction_id = t.id
+            JOIN accounts a ON a.id = j.account_id
+            WHERE j.transaction_id = ? ORDER BY j.id
+        """, (trans_id,))
+        return cursor.fetchall()
+
+    def _record_deleted_splits(self, cursor, trans_id):
+        """Tombstones for splits about to be deleted (call before deleting them). They stop being reconciled."""
+        cursor.execute("""
+            INSERT INTO deleted_entries (entry_id)
+            SELECT id FROM journal_entries WHERE transaction_id = ?
+        """, (trans_id,))
+        cursor.execute("""
+            DELETE FROM reconciled_splits
+            WHERE entry_id IN (SELECT id FROM journal_entries WHERE transaction_id = ?)
+        """, (trans_id,))
+
+    _DERIVED_BALANCES_SQL = """
+        SELECT account_id, SUM(debit), SUM(credit), COUNT(*)
+        FROM journal_entries
+        GROUP BY account_id
+    """
+
+    def rebuild_account_balances(self):
+        """Re-derives the account_balances table from the journal."""
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("DELETE FROM account_balances")
+            cursor.execute(f"""
+                INSERT INTO account_balances (account_id, debit_total, credit_total, entry_count)
+                {self._DERIVED_BALANCES_SQL}
+            """)
+            self.conn.commit()
+            self._bump_generation()
+            return True
+        except Exception as e:
+            self._rollback()
+            raise e
+
+    def verify_account_balances(self):
+        """Compares account_balances against the journal. Returns a list of mismatches (empty = OK)."""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT id, name FROM accounts")
+        names = dict(cursor.fetchall())
+        cursor.execute(self._DERIVED_BALANCES_SQL)
+        derived = {r[0]: r[1:] for r in cursor.fetchall()}
+        cursor.execute("SELECT account_id, debit_total, credit_total, entry_count FROM account_balances")
+        stored = {r[0]: r[1:] for r in cursor.fetchall()}
+        
+        problems = []
+        for acc_id in sorted(set(derived) | set(stored)):
+            d = derived.get(acc_id)
+            s = stored.get(acc_id)
+            if d is None or s is None or tuple(d) != tuple(s):
+                problems.append({'account': names.get(acc_id, acc_id), 'stored': s, 'derived': d})
+        return problems
+
+    # --- SEARCH INDEX ---
+
+    # journal_fts rowid = (day number << 40) | split id: unique, and in date order, so a
+    # search can walk the index newest (or oldest) first and stop after one page
+    _FTS_ID_MASK = (1 << 40) - 1
+
+    @staticmethod
+    def _fts_key(date_sql, id_sql):
+        return f"((COALESCE(CAST(julianday({date_sql}) - 2440587.5 AS INTEGER), 0) << 40) | {id_sql})"
+
+    def _index_splits(self, cursor, where, params):
+        cursor.execute(f"""
+            INSERT INTO journal_fts (rowid, description, account)
+            SELECT {self._fts_key('t.date', 'j.id')}, t.description, a.name
+            FROM journal_entries j
+            JOIN transactions t ON j.transaction_id = t.id
+            JOIN accounts a ON a.id = j.account_id
+            WHERE {where}
+        """, params)
+
+    def _unindex_splits(self, cursor, trans_id):
+        """Call before deleting the splits of a transaction or changing its date."""
+        cursor.execute(f"""
+            DELETE FROM journal_fts
+            WHERE rowid IN (
+                SELECT {self._fts_key('t.date', 'j.id')}
+                FROM journal_entries j JOIN transactions t ON j.transaction_id = t.id
+                WHERE j.transaction_id = ?
+            )
+        """, (trans_id,))
+
+    def rebuild_search_index(self):
+        """Re-derives the full-text index from the journal."""
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("DELETE FROM journal_fts")
+            self._index_splits(cursor, "1", ())
+            cursor.execute("INSERT INTO journal_fts (journal_fts) VALUES ('optimize')")
+            self.conn.commit()
+            self._bump_generation()
+            return True
+        except Exception as e:
+            self._rollback()
+            raise e
+
+    # --- PERIOD CLOSE ---
+
+    # Cumulative totals per account as of a date: the snapshot at `base` (if any)
+    # plus only the splits dated after it. Params: (base, base or '', as_of)
+    _SNAPSHOT_PLUS_DELTA_SQL = """
+        SELECT account_id, SUM(dr) AS dr, SUM(cr) AS cr FROM (
+            SELECT account_id, debit_total AS dr, credit_total AS cr
+            FROM period_balances WHERE period_end = ?
+            UNION ALL
+            SELECT j.account_id, j.debit, j.credit
+            FROM transactions t
+            JOIN journal_entries j ON j.transaction_id = t.id
+            WHERE t.date > ? AND t.date <= ?
+        )
+        GROUP BY account_id
+    """
+
+    def _nearest_close(self, cursor, as_of_date):
+        cursor.execute("SELECT MAX(period_end) FROM period_closes WHERE period_end <= ?", (as_of_date,))
+        return cursor.fetchone()[0]
+
+    def _transaction_date(self, cursor, trans_id):
+        cursor.execute("SELECT date FROM transactions WHERE id = ?", (trans_id,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def _invalidate_closes(self, cursor, date):
+        """A posting dated `date` changes every closing balance from that date on."""
+        if not date:
+            return
+        cursor.execute("DELETE FROM period_balances WHERE period_end >= ?", (date,))
+        cursor.execute("DELETE FROM period_closes WHERE period_end >= ?", (date,))
+
+    def _write_close(self, cursor, period_end):
+        cursor.execute("SELECT MAX(period_end) FROM period_closes WHERE period_end < ?", (period_end,))
+        base = cursor.fetchone()[0]
+        cursor.execute("DELETE FROM period_balances WHERE period_end = ?", (period_end,))
+        cursor.execute(f"""
+            INSERT INTO period_balances (period_end, account_id, debit_total, credit_total)
+            SELECT ?, account_id, dr, cr FROM ({self._SNAPSHOT_PLUS_DELTA_SQL})
+        """, (period_end, base, base or '', period_end))
+        cursor.execute("INSERT OR REPLACE INTO period_closes (period_end) VALUES (?)", (period_end,))
+
+    def close_period(self, period_end):
+        """Stores closing balances for every account as of period_end (inclusive)."""
+        return self.close_periods(period_end, granularity=None)
+
+    @staticmethod
+    def _period_ends(first_date, through_date, granularity):
+        """Month or year end dates from the period containing first_date up to through_date."""
+        start = datetime.date.fromisoformat(first_date)
+        through = datetime.date.fromisoformat(through_date)
+        ends = []
+        year, month = start.year, start.month
+        while True:
+            if granularity == "yearly":
+                end = datetime.date(year, 12, 31)
+                year += 1
+            else:
+                end = datetime.date(year, month, calendar.monthrange(year, month)[1])
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+            if end > through:
+                return ends
+            ends.append(end.isoformat())
+
+    def close_periods(self, through_date, granularity="monthly"):
+        """
+        Closes every month ("monthly") or year ("yearly") that ends on or before through_date
+        and is not closed yet; granularity=None closes exactly through_date.
+        Each close is built from the previous one, so only the new period's rows are read.
+        Returns the list of period end dates written.
+        """
+        if granularity not in (None, "monthly", "yearly"):
+            raise ValueError(f"Unknown granularity: {granularity}")
+        cursor = self.conn.cursor()
+        if granularity is None:
+            ends = [through_date]
+        else:
+            first = self.get_date_range()[0]
+            ends = self._period_ends(first, through_date, granularity) if first else []
+            cursor.execute("SELECT period_end FROM period_closes")
+            closed = {row[0] for row in cursor.fetchall()}
+            ends = [e for e in ends if e not in closed]
+        
+        try:
+            for period_end in ends:
+                self._write_close(cursor, period_end)
+            self.conn.commit()
+            self._bump_generation()
+            return ends
+        except Exception as e:
+            self._rollback()
+            raise e
+
+    def reopen_period(self, period_end):
+        """Drops the close at period_end and every later one."""
+        cursor = self.conn.cursor()
+        try:
+            self._invalidate_closes(cursor, period_end)
+            self.conn.commit()
+            self._bump_generation()
+        except Exception as e:
+            self._rollback()
+            raise e
+
+    def get_closed_periods(self):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT period_end, closed_at FROM period_closes ORDER BY period_end")
+        return cursor.fetchall()
+
+    def columns(self):
+        """
+        The NumPy column store over this connection's journal (created on first use).
+        File databases keep a memory-mapped copy next to the .db (see analytics.sidecar_path).
+        """
+        if self._columns is None:
+            from analytics import JournalColumns, sidecar_path
+            sidecar = None if self.db_name == ":memory:" else sidecar_path(self.db_name)
+            self._columns = JournalColumns(self, sidecar)
+        return self._columns
+
+    # --- CHANGE EVENTS ---
+
+    def subscribe(self, callback):
+        """
+        Calls callback(event) after every committed change to the journal made through
+        this handler (not other connections). event is a dict:
+            kind      'added', 'updated', 'deleted', 'bulk' or 'cleared'
+            ids       transaction ids (None for 'bulk' and 'cleared')
+            dates     sorted dates touched ('bulk': [earliest, latest]; None for 'cleared')
+            accounts  sorted account names touched (None for 'cleared')
+            added     splits written, as (date, account, type, debit, credit)
+            removed   splits removed, same shape (the pre-update state for 'updated')
+            count     number of transactions ('bulk' only)
+        added/removed are None when the change is too big to describe ('bulk', 'cleared');
+        listeners should then reload. Runs on the writing thread.
+        """
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def _emit(self, kind, ids, added=None, removed=None, dates=None, accounts=None, count=None):
+        if not self._subscribers:
+            return
+        if kind in ('added', 'updated', 'deleted'):
+            splits = (added or []) + (removed or [])
+            dates = sorted({s[0] for s in splits})
+            accounts = sorted({s[1] for s in splits})
+        event = {'kind': kind, 'ids': ids, 'dates': dates, 'accounts': accounts,
+                 'added': added, 'removed': removed}
+        if count is not None:
+            event['count'] = count
+        for callback in list(self._subscribers):
+            try:
+                callback(event)
+            except Exception as e:
+                # The change is committed already; one broken listener must not hide it from the rest
+                print(f"Change Listener Error: {e}")
+
+    # --- QUERY CACHE ---
+
+    def _bump_generation(self):
+        self._generation += 1
+        self._cache.clear()
+
+    def _data_version(self):
+        # Our own writes bump _generation; commits made through any other connection
+        # (e.g. the UI's writer while this is the worker's reader) change data_version.
+        cursor = self.conn.cursor()
+        cursor.execute("PRAGMA data_version")
+        return (self._generation, cursor.fetchone()[0])
+
+    def _cached(self, name, args, compute):
+        """
+        Memoizes a report query on (name, args, data version) with LRU eviction.
+        Cached results are shared between callers: treat them as read-only.
+        """
+        version = self._data_version()
+        if version != self._cache_version:
+            self._cache.clear()
+            self._cache_version = version
+        
+        key = (name, args, version)
+        if key in self._cache:
+            self.cache_hits += 1
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        
+        self.cache_misses += 1
+        result = compute()
+        self._cache[key] = result
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+    def clear_cache(self):
+        """Drops memoized report results (benchmarks use this to time the queries themselves)."""
+        self._cache.clear()
+
+    def cache_stats(self):
+        return {'hits': self.cache_hits, 'misses': self.cache_misses,
+                'size': len(self._cache), 'generation': self._generation}
+
     # --- READING DATA ---
 
     def get_unique_accounts(self):
         cursor = self.conn.cursor()
-        cursor.execute("SELECT DISTINCT account_name FROM journal_entries ORDER BY account_name ASC")
+        cursor.execute("SELECT name FROM accounts ORDER BY name ASC")
         return [row[0] for row in cursor.fetchall()]
 
     def get_full_transaction(self, trans_id):
@@ -120,7 +923,11 @@ class DatabaseHandler:
         if not res: return None, []
         header = {'date': res[0], 'description': res[1]}
         
-        cursor.execute("SELECT account_name, account_type, debit, credit FROM journal_entries WHERE transaction_id=?", (trans_id,))
+        cursor.execute("""
+            SELECT a.name, a.type, j.debit, j.credit
+            FROM journal_entries j JOIN accounts a ON a.id = j.account_id
+            WHERE j.transaction_id = ? ORDER BY j.id
+        """, (trans_id,))
         lines = []
         for row in cursor.fetchall():
             lines.append({'name': row[0], 'type': row[1], 'debit': row[2], 'credit': row[3]})
@@ -128,86 +935,385 @@ class DatabaseHandler:
 
     def get_transaction_details(self, trans_id):
         cursor = self.conn.cursor()
-        cursor.execute("SELECT account_name, account_type, debit, credit FROM journal_entries WHERE transaction_id = ?", (trans_id,))
+        cursor.execute("""
+            SELECT a.name, a.type, j.debit, j.credit
+            FROM journal_entries j JOIN accounts a ON a.id = j.account_id
+            WHERE j.transaction_id = ? ORDER BY j.id
+        """, (trans_id,))
         return cursor.fetchall()
 
+    # Signed effect of a split on its own account (debit-normal vs credit-normal)
+    _SIGNED_AMOUNT = "(CASE WHEN a.type IN ('Asset', 'Expense') THEN j.debit - j.credit ELSE j.credit - j.debit END)"
+
+    @staticmethod
+    def signed_amount(acc_type, debit, credit):
+        """Python twin of _SIGNED_AMOUNT."""
+        return debit - credit if acc_type in ('Asset', 'Expense') else credit - debit
+
     def get_ledger(self, account_name=None):
+        """
+        Rows: (tid, date, account, type, description, debit, credit, running_balance).
+        The running balance is per account and computed by SQLite. A single account comes
+        back oldest first, "All" newest first.
+        """
         cursor = self.conn.cursor()
-        sql = """
-            SELECT t.id, t.date, j.account_name, j.account_type, t.description, j.debit, j.credit
+        sql = f"""
+            SELECT t.id, t.date, a.name, a.type, t.description, j.debit, j.credit,
+                   SUM({self._SIGNED_AMOUNT}) OVER (
+                       PARTITION BY j.account_id ORDER BY t.date, t.posted_at, j.id
+                       ROWS UNBOUNDED PRECEDING)
             FROM journal_entries j
             JOIN transactions t ON j.transaction_id = t.id
+            JOIN accounts a ON a.id = j.account_id
         """
         params = ()
         if account_name and account_name != "All":
-            sql += " WHERE j.account_name = ?"
+            sql += " WHERE j.account_id = (SELECT id FROM accounts WHERE name = ?)"
             params = (account_name,)
-        
-        sql += " ORDER BY t.date ASC, t.posted_at ASC"
+            sql += " ORDER BY t.date ASC, t.posted_at ASC, j.id ASC"
+        else:
+            sql += " ORDER BY t.date DESC, t.posted_at DESC, j.id DESC"
         
         cursor.execute(sql, params)
-        rows = cursor.fetchall()
+        return cursor.fetchall()
+
+    def get_ledger_page(self, account_name=None, after_key=None, limit=200, direction="asc", search=None,
+                        with_balance=True):
+        """
+        Keyset-paginated ledger. Returns (rows, next_key).
+        rows: get_ledger's 8 fields followed by posted_at and entry_id, which together
+        with the date form the page key.
+        after_key: the next_key of the previous page (None for the first page).
+        direction: "asc" (oldest first) or "desc" (newest first).
+        search: optional filter, either text or a criteria dict (see search_entries and
+        utils.search.parse_search); running balances still include the rows it hides.
+        Pass the same plan_search() result for every page of one search.
+        Text searches order rows within a day by entry_id alone (the search index's order).
+        with_balance: False skips the running balance (returned as None), which is the
+        expensive part of a sparse search.
+        next_key is None once the last page has been returned.
+        """
+        if direction not in ("asc", "desc"):
+            raise ValueError(f"direction must be 'asc' or 'desc', not {direction!r}")
+        order = "ASC" if direction == "asc" else "DESC"
+        criteria = self.plan_search({'text': search} if isinstance(search, str) else search)
+        fts = self._fts_query(criteria.get('text'))
         
-        results = []
-        running_bal = 0.0
+        conditions = []
+        params = []
+        if fts:
+            # Driven by the search index, whose rowids are already in date order
+            source = f"""
+                journal_fts f
+                JOIN journal_entries j ON j.id = (f.rowid & {self._FTS_ID_MASK})
+                JOIN transactions t ON j.transaction_id = t.id
+                JOIN accounts a ON a.id = j.account_id
+            """
+            conditions.append("journal_fts MATCH ?")
+            params.append(fts)
+            sort = f"f.rowid {order}"
+            page_order = f"p.sort_key {order}"
+        else:
+            source = f"""
+                journal_entries j {"INDEXED BY idx_amount" if criteria.get('amount_index') else ""}
+                JOIN transactions t ON j.transaction_id = t.id
+                JOIN accounts a ON a.id = j.account_id
+            """
+            sort = f"t.date {order}, t.posted_at {order}, j.id {order}"
+            page_order = f"p.date {order}, p.posted_at {order}, p.entry_id {order}"
         
-        for tid, date, name, acc_type, desc, dr, cr in rows:
-            if acc_type in ["Asset", "Expense"]:
-                running_bal += (dr - cr)
+        if account_name and account_name != "All":
+            conditions.append("j.account_id = (SELECT id FROM accounts WHERE name = ?)")
+            params.append(account_name)
+        self._search_conditions(criteria, conditions, params, by_fts_key=bool(fts))
+        if after_key:
+            op = '>' if direction == 'asc' else '<'
+            if fts:
+                conditions.append(f"f.rowid {op} {self._fts_key('?', '?')}")
+                params.extend((after_key[0], after_key[2]))
             else:
-                running_bal += (cr - dr)
-            results.append((tid, date, name, acc_type, desc, dr, cr, running_bal))
-            
-        if not account_name or account_name == "All":
-            return sorted(results, key=lambda x: x[1], reverse=True)
-        return results
-
-    # --- REPORTING ---
-
-    def get_account_balances(self):
-        return self.get_balances_snapshot()
+                conditions.append(f"(t.date, t.posted_at, j.id) {op} (?, ?, ?)")
+                params.extend(after_key)
+        where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+        params.append(limit)
+        
+        page_sql = f"""
+            SELECT t.id AS tid, t.date AS date, j.account_id AS acc_id, a.name AS name, a.type AS acc_type,
+                   t.description AS descr, j.debit AS dr, j.credit AS cr,
+                   t.posted_at AS posted_at, j.id AS entry_id, {'f.rowid' if fts else 'NULL'} AS sort_key
+            FROM {source}
+            {where}
+            ORDER BY {sort}
+            LIMIT ?
+        """
+        
+        if not with_balance:
+            sql = f"""
+                SELECT p.tid, p.date, p.name, p.acc_type, p.descr, p.dr, p.cr, NULL, p.posted_at, p.entry_id
+                FROM ({page_sql}) p
+                ORDER BY {page_order}
+            """
+            return self._page_result(sql, params, limit)
+        
+        # Only the page is pulled out of the journal. Balances come from one aggregate per
+        # account over its splits before the page, plus a window over the (unfiltered)
+        # splits of those accounts that fall between the first and last row of the page.
+        sql = f"""
+            WITH page AS ({page_sql}),
+            first_row AS (SELECT date, posted_at, entry_id FROM page ORDER BY date, posted_at, entry_id LIMIT 1),
+            last_row AS (SELECT date, posted_at, entry_id FROM page ORDER BY date DESC, posted_at DESC, entry_id DESC LIMIT 1),
+            opening AS (
+                SELECT j.account_id AS acc_id, SUM({self._SIGNED_AMOUNT}) AS bal
+                FROM journal_entries j
+                JOIN transactions t ON j.transaction_id = t.id
+                JOIN accounts a ON a.id = j.account_id
+                WHERE j.account_id IN (SELECT acc_id FROM page)
+                  AND (t.date, t.posted_at, j.id) < (SELECT * FROM first_row)
+                GROUP BY j.account_id
+            ),
+            span AS (
+                SELECT j.id AS entry_id,
+                       SUM({self._SIGNED_AMOUNT}) OVER (
+                           PARTITION BY j.account_id ORDER BY t.date, t.posted_at, j.id
+                           ROWS UNBOUNDED PRECEDING) AS run
+                FROM journal_entries j
+                JOIN transactions t ON j.transaction_id = t.id
+                JOIN accounts a ON a.id = j.account_id
+                WHERE j.account_id IN (SELECT acc_id FROM page)
+                  AND (t.date, t.posted_at, j.id) >= (SELECT * FROM first_row)
+                  AND (t.date, t.posted_at, j.id) <= (SELECT * FROM last_row)
+            )
+            SELECT p.tid, p.date, p.name, p.acc_type, p.descr, p.dr, p.cr,
+                   COALESCE(o.bal, 0) + s.run, p.posted_at, p.entry_id
+            FROM page p
+            JOIN span s ON s.entry_id = p.entry_id
+            LEFT JOIN opening o ON o.acc_id = p.acc_id
+            ORDER BY {page_order}
+        """
+        return self._page_result(sql, params, limit)
 
-    def get_balances_snapshot(self, as_of_date=None):
-        cursor = self.conn.cursor()
-        sql = """
-            SELECT j.account_name, j.account_type, SUM(j.debit), SUM(j.credit) 
+    def get_entry_rows(self, trans_ids, account_name=None):
+        """
+        The splits of the given transactions as get_ledger_page rows (balance None), oldest
+        first. Used to patch a loaded ledger page after a change event.
+        """
+        if not trans_ids:
+            return []
+        sql = f"""
+            SELECT t.id, t.date, a.name, a.type, t.description, j.debit, j.credit, NULL, t.posted_at, j.id
             FROM journal_entries j
             JOIN transactions t ON j.transaction_id = t.id
+            JOIN accounts a ON a.id = j.account_id
+            WHERE j.transaction_id IN ({",".join("?" * len(trans_ids))})
         """
-        params = []
-        if as_of_date:
-            sql += " WHERE t.date <= ?"
-            params.append(as_of_date)
-        sql += " GROUP BY j.account_name"
+        params = list(trans_ids)
+        if account_name and account_name != "All":
+            sql += " AND a.name = ?"
+            params.append(account_name)
+        sql += " ORDER BY t.date, t.posted_at, j.id"
+        cursor = self.conn.cursor()
         cursor.execute(sql, params)
-        return self._process_balances(cursor.fetchall())
+        return cursor.fetchall()
 
-    def get_balances_period(self, start_date=None, end_date=None):
-        cursor = self.conn.cursor()
-        sql = """
-            SELECT j.account_name, j.account_type, SUM(j.debit), SUM(j.credit) 
-            FROM journal_entries j
-            JOIN transactions t ON j.transaction_id = t.id
+    def iter_journal(self, account_name=None, start_date=None, end_date=None, chunk_size=5000):
+        """
+        Streams the journal oldest first as lists of at most chunk_size rows, read with
+        fetchmany so only one chunk is ever held. For exports of any size (utils.ledger_export).
+        Rows: (tid, date, account, type, description, debit, credit, posted_at, entry_id).
         """
         conditions = []
         params = []
+        if account_name and account_name != "All":
+            conditions.append("j.account_id = (SELECT id FROM accounts WHERE name = ?)")
+            params.append(account_name)
         if start_date:
             conditions.append("t.date >= ?")
             params.append(start_date)
         if end_date:
             conditions.append("t.date <= ?")
             params.append(end_date)
-        if conditions:
-            sql += " WHERE " + " AND ".join(conditions)
-        sql += " GROUP BY j.account_name"
+        where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            SELECT t.id, t.date, a.name, a.type, t.description, j.debit, j.credit, t.posted_at, j.id
+            FROM journal_entries j
+            JOIN transactions t ON j.transaction_id = t.id
+            JOIN accounts a ON a.id = j.account_id
+            {where}
+            ORDER BY t.date, t.posted_at, j.id
+        """, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+
+    def _page_result(self, sql, params, limit):
+        cursor = self.conn.cursor()
         cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        
+        next_key = None
+        if len(rows) == limit:
+            last = rows[-1]
+            next_key = (last[1], last[8], last[9])
+        return rows, next_key
+
+    @staticmethod
+    def _fts_query(text):
+        # Every word must match as a prefix; quoting keeps FTS5 syntax characters literal
+        words = re.findall(r"\w+", text or "")
+        return " ".join(f'"{w}"*' for w in words) or None
+
+    # Below this many splits an amount range is worth idx_amount; a wider one is cheaper to
+    # check row by row while walking the date index, which can stop after one page
+    _AMOUNT_INDEX_ROWS = 10000
+
+    def plan_search(self, criteria):
+        """
+        A copy of criteria (keys as in search_entries) with the access path for its amount
+        range decided once, under 'amount_index': True reads the range through idx_amount,
+        False checks it row by row. get_ledger_page plans criteria that come unplanned, at
+        the cost of a count per page, so a paged search should plan once and reuse the result.
+        """
+        criteria = dict(criteria or {})
+        low, high = criteria.get('min_amount'), criteria.get('max_amount')
+        if 'amount_index' not in criteria and (low is not None or high is not None):
+            # A text search is driven by journal_fts, whose rowids lead to the splits one by one
+            criteria['amount_index'] = (not self._fts_query(criteria.get('text'))
+                                        and self._amount_range_is_narrow(low, high))
+        return criteria
+
+    def _amount_range_is_narrow(self, low, high):
+        conditions, params = [], []
+        if low is not None:
+            conditions.append("debit + credit >= ?")
+            params.append(low)
+        if high is not None:
+            conditions.append("debit + credit <= ?")
+            params.append(high)
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            SELECT COUNT(*) FROM (
+                SELECT 1 FROM journal_entries INDEXED BY idx_amount WHERE {" AND ".join(conditions)} LIMIT ?
+            )
+        """, params + [self._AMOUNT_INDEX_ROWS])
+        return cursor.fetchone()[0] < self._AMOUNT_INDEX_ROWS
+
+    def _search_conditions(self, criteria, conditions, params, by_fts_key=False):
+        """
+        Adds SQL for the non-text criteria (keys as in search_entries) to conditions/params.
+        by_fts_key: the query is driven by journal_fts (alias f), so dates become rowid bounds.
+        """
+        low, high = criteria.get('min_amount'), criteria.get('max_amount')
+        if low is not None or high is not None:
+            # With amount_index get_ledger_page names idx_amount (INDEXED BY). Otherwise the
+            # unary + keeps the planner from matching the expression to the index, so it
+            # walks the date order instead and stops after one page
+            indexed = criteria.get('amount_index') and not by_fts_key
+            amount = "(j.debit + j.credit)" if indexed else "+(j.debit + j.credit)"
+            if low is not None:
+                conditions.append(f"{amount} >= ?")
+                params.append(low)
+            if high is not None:
+                conditions.append(f"{amount} <= ?")
+                params.append(high)
+        if criteria.get('start_date'):
+            conditions.append(f"f.rowid >= {self._fts_key('?', 0)}" if by_fts_key else "t.date >= ?")
+            params.append(criteria['start_date'])
+        if criteria.get('end_date'):
+            conditions.append(f"f.rowid < {self._fts_key('?', 0)} + {1 << 40}" if by_fts_key else "t.date <= ?")
+            params.append(criteria['end_date'])
+        if criteria.get('account_type'):
+            conditions.append("j.account_id IN (SELECT id FROM accounts WHERE type = ?)")
+            params.append(criteria['account_type'])
+
+    def search_entries(self, text=None, min_amount=None, max_amount=None, start_date=None, end_date=None,
+                       account_type=None, account_name=None, after_key=None, limit=200, direction="desc"):
+        """
+        Finds splits by any combination of: words in the description or account name
+        (full-text, prefix match), amount range in cents, date range and account type.
+        Returns (rows, next_key) like get_ledger_page, without running balances. Each call
+        plans its amount range again; to page through one search, plan_search() once and
+        pass the result to get_ledger_page.
+        """
+        criteria = {'text': text, 'min_amount': min_amount, 'max_amount': max_amount,
+                    'start_date': start_date, 'end_date': end_date, 'account_type': account_type}
+        return self.get_ledger_page(account_name, after_key, limit, direction, criteria, with_balance=False)
+
+    def get_date_range(self):
+        """(first_date, last_date) of the book, or (None, None) when it is empty."""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT MIN(date), MAX(date) FROM transactions")
+        return cursor.fetchone()
+
+    # --- REPORTING ---
+
+    def get_account_balances(self):
+        return self.get_balances_snapshot()
+
+    def get_balances_snapshot(self, as_of_date=None):
+        return self._cached('balances_snapshot', (as_of_date,),
+                            lambda: self._get_balances_snapshot(as_of_date))
+
+    def _get_balances_snapshot(self, as_of_date):
+        cursor = self.conn.cursor()
+        if not as_of_date:
+            # All-time balances come straight from the running totals: O(accounts)
+            cursor.execute("""
+                SELECT a.name, a.type, b.debit_total, b.credit_total
+                FROM account_balances b JOIN accounts a ON a.id = b.account_id
+            """)
+            return self._process_balances(cursor.fetchall())
+        
+        # Nearest closed period + the rows after it (a full scan only if nothing is closed yet)
+        base = self._nearest_close(cursor, as_of_date)
+        cursor.execute(f"""
+            SELECT a.name, a.type, s.dr, s.cr
+            FROM ({self._SNAPSHOT_PLUS_DELTA_SQL}) s
+            JOIN accounts a ON a.id = s.account_id
+        """, (base, base or '', as_of_date))
         return self._process_balances(cursor.fetchall())
 
+    def get_balances_period(self, start_date=None, end_date=None):
+        if not start_date:
+            return self.get_balances_snapshot(end_date)
+        return self._cached('balances_period', (start_date, end_date),
+                            lambda: self._get_balances_period(start_date, end_date))
+
+    def _get_balances_period(self, start_date, end_date):
+        cursor = self.conn.cursor()
+        conditions = ["t.date >= ?"]
+        params = [start_date]
+        if end_date:
+            conditions.append("t.date <= ?")
+            params.append(end_date)
+        cursor.execute(self._grouped_balances_sql(" AND ".join(conditions)), params)
+        return self._process_balances(cursor.fetchall())
+
+    def _grouped_balances_sql(self, where):
+        # Aggregate on the integer account id, then attach name/type from the small accounts table
+        return f"""
+            SELECT a.name, a.type, s.dr, s.cr
+            FROM (
+                SELECT j.account_id, SUM(j.debit) AS dr, SUM(j.credit) AS cr
+                FROM journal_entries j
+                JOIN transactions t ON j.transaction_id = t.id
+                WHERE {where}
+                GROUP BY j.account_id
+            ) s
+            JOIN accounts a ON a.id = s.account_id
+        """
+
     def _process_balances(self, raw_data):
         accounts = {}
         for name, acc_type, deb_sum, cred_sum in raw_data:
-            deb_sum = deb_sum or 0.0
-            cred_sum = cred_sum or 0.0
+            deb_sum = deb_sum or 0
+            cred_sum = cred_sum or 0
             
             if acc_type in ["Asset", "Expense"]:
                 net = deb_sum - cred_sum
@@ -217,10 +1323,556 @@ class DatabaseHandler:
         return accounts
 
     def get_net_income(self, start_date=None, end_date=None):
-        if start_date or end_date:
+        return self._cached('net_income', (start_date, end_date),
+                            lambda: self._get_net_income(start_date, end_date))
+
+    def _get_net_income(self, start_date, end_date):
+        # Without a start date this is the same (cached) snapshot a balance sheet just read
+        if start_date:
             accounts = self.get_balances_period(start_date, end_date)
         else:
-            accounts = self.get_balances_snapshot()
+            accounts = self.get_balances_snapshot(end_date)
         rev = sum(a['net_balance'] for a in accounts.values() if a['type'] == 'Revenue')
         exp = sum(a['net_balance'] for a in accounts.values() if a['type'] == 'Expense')
-        return rev - exp
\ No newline at end of file
+        return rev - exp
+
+    # --- TRENDS ---
+
+    # Bucket start date for each granularity (weeks start on Monday)
+    _BUCKETS = {
+        'daily': "t.date",
+        'weekly': "date(t.date, 'weekday 0', '-6 days')",
+        'monthly': "strftime('%Y-%m-01', t.date)",
+    }
+
+    def get_revenue_expense_series(self, start_date=None, end_date=None, granularity="daily"):
+        """
+        Revenue and expense totals per time bucket, grouped by SQLite.
+        Returns [(bucket_start 'YYYY-MM-DD', revenue, expense), ...] in date order.
+        """
+        return self._cached('revenue_expense_series', (start_date, end_date, granularity.lower()),
+                            lambda: self._get_revenue_expense_series(start_date, end_date, granularity))
+
+    def _get_revenue_expense_series(self, start_date, end_date, granularity):
+        bucket = self._BUCKETS.get(granularity.lower())
+        if bucket is None:
+            raise ValueError(f"Unknown granularity {granularity!r} (use daily, weekly or monthly)")
+        
+        sql = f"""
+            SELECT {bucket} AS bucket,
+                   SUM(CASE WHEN a.type = 'Revenue' THEN j.credit - j.debit ELSE 0 END),
+                   SUM(CASE WHEN a.type = 'Expense' THEN j.debit - j.credit ELSE 0 END)
+            FROM journal_entries j
+            JOIN transactions t ON j.transaction_id = t.id
+            JOIN accounts a ON a.id = j.account_id
+            WHERE a.type IN ('Revenue', 'Expense')
+        """
+        params = []
+        if start_date:
+            sql += " AND t.date >= ?"
+            params.append(start_date)
+        if end_date:
+            sql += " AND t.date <= ?"
+            params.append(end_date)
+        sql += " GROUP BY bucket ORDER BY bucket"
+        
+        cursor = self.conn.cursor()
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+    # --- DASHBOARD ---
+
+    def get_dashboard_snapshot(self, start_date=None, end_date=None, granularity="Daily", recent_n=8):
+        """
+        Everything the stats page shows, in one call:
+        period / snapshot  balances for [start_date, end_date] and as of end_date
+        kpis, top_expenses, net_worth  derived from those (see dashboard_figures)
+        trend, bucket, span  revenue/expense per bucket; "Daily" becomes weekly over 60 days
+        recent  the newest recent_n splits, shaped like get_ledger_page rows
+        Balances and trend come from the column store, so the only SQL is the recent
+        rows' ORDER BY ... LIMIT on the journal key index. The result is the caller's own
+        (not shared with the report cache), so it may be patched in place.
+        """
+        cols = self.columns()
+        period = cols.balances(start_date, end_date)
+        # All Time: the snapshot is the same pass
+        snapshot = period if not start_date else cols.balances(None, end_date)
+        period = {name: dict(info) for name, info in period.items()}
+        snapshot = {name: dict(info) for name, info in snapshot.items()}
+        
+        bucket = "monthly" if granularity.lower() == "monthly" else "daily"
+        s_date = e_date = None
+        if granularity.lower() in ("daily", "weekly"):
+            if start_date and end_date:
+                s_date, e_date = start_date, end_date
+            else:
+                s_date, e_date = cols.date_range()
+            if s_date and e_date:
+                span = datetime.date.fromisoformat(e_date) - datetime.date.fromisoformat(s_date)
+                if granularity.lower() == "weekly" or span.days > 60: bucket = "weekly"
+        
+        recent, _ = self.get_ledger_page(None, None, recent_n, "desc", with_balance=False)
+        snap = {'start': start_date, 'end': end_date, 'period': period, 'snapshot': snapshot,
+                'trend': cols.revenue_expense_series(start_date, end_date, bucket), 'bucket': bucket,
+                'span': (s_date, e_date), 'recent': recent}
+        snap.update(self.dashboard_figures(period, snapshot))
+        return snap
+
+    @staticmethod
+    def dashboard_figures(period, snapshot, top_n=6):
+        """
+        KPIs, the top_n expense accounts and the net-worth components from period and
+        snapshot balances (get_balances_period shape). Amounts in integer cents.
+        """
+        rev = sum(d['net_balance'] for d in period.values() if d['type'] == 'Revenue')
+        exp = sum(d['net_balance'] for d in period.values() if d['type'] == 'Expense')
+        expenses = sorted(((name, d['net_balance']) for name, d in period.items()
+                           if d['type'] == 'Expense' and d['net_balance'] > 0), key=lambda x: -x[1])
+        assets = sum(d['net_balance'] for d in snapshot.values() if d['type'] == 'Asset')
+        liabs = sum(d['net_balance'] for d in snapshot.values() if d['type'] == 'Liability')
+        return {
+            'kpis': {'revenue': rev, 'expenses': exp, 'net_income': rev - exp,
+                     'margin': (rev - exp) / rev * 100 if rev > 0 else 0.0},
+            'top_expenses': expenses[:top_n],
+            'net_worth': {'assets': assets, 'liabilities': liabs, 'equity': assets - liabs},
+        }
+
+    # --- BANK IMPORT ---
+    # A statement file becomes a batch of staged lines (import_batches / staged_lines): staged
+    # in committed chunks as it is parsed, checked against the journal for lines already
+    # there, reviewed, then posted in one bulk write. utils.bank_import drives the steps.
+
+    # Other side of an imported line nobody categorized, by direction (money in?)
+    UNCATEGORIZED = {True: ('Uncategorized Income', 'Revenue'), False: ('Uncategorized Expense', 'Expense')}
+
+    def start_import(self, account_name, source, file_hash, fmt):
+        """
+        The batch for a statement file (by content hash) and bank account: a new one, or the
+        one an earlier run left behind. A batch still 'staging' was interrupted; staging
+        resumes after its last line. Returns get_import_batch().
+        """
+        name = account_name.strip().title()
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("""
+                INSERT OR IGNORE INTO import_batches (account, source, file_hash, format)
+                VALUES (?, ?, ?, ?)
+            """, (name, source, file_hash, fmt))
+            self.conn.commit()
+        except Exception as e:
+            self._rollback()
+            raise e
+        cursor.execute("SELECT id FROM import_batches WHERE account = ? AND file_hash = ?", (name, file_hash))
+        return self.get_import_batch(cursor.fetchone()[0])
+
+    def get_import_batch(self, batch_id):
+        """
+        {'id', 'account', 'source', 'format', 'status', 'created_at', 'lines', 'counts'}.
+        lines: the last line_no staged. counts: lines per status (pending, duplicate,
+        approved, rejected, posted).
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT id, account, source, format, status, created_at FROM import_batches WHERE id = ?",
+                       (batch_id,))
+        row = cursor.fetchone()
+        if row is None:
+            raise ValueError(f"No import batch {batch_id}")
+        batch = dict(zip(('id', 'account', 'source', 'format', 'status', 'created_at'), row))
+        cursor.execute("SELECT COALESCE(MAX(line_no), 0) FROM staged_lines WHERE batch_id = ?", (batch_id,))
+        batch['lines'] = cursor.fetchone()[0]
+        cursor.execute("SELECT status, COUNT(*) FROM staged_lines WHERE batch_id = ? GROUP BY status", (batch_id,))
+        batch['counts'] = dict(cursor.fetchall())
+        return batch
+
+    def get_import_batches(self):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT id FROM import_batches ORDER BY id DESC")
+        return [self.get_import_batch(row[0]) for row in cursor.fetchall()]
+
+    def stage_lines(self, batch_id, lines, chunk_size=5000):
+        """
+        Writes statement lines (line_no, date, amount, description, ref) into a batch with
+        executemany, committing every chunk_size lines, so an interrupted run keeps what it
+        staged. Lines already staged are ignored. Returns throughput stats.
+        """
+        from utils.bank_import import match_key
+        cursor = self.conn.cursor()
+        stats = {'lines': 0, 'chunks': 0, 'seconds': 0.0}
+        started = time.perf_counter()
+
+        def write_chunk(rows):
+            try:
+                cursor.executemany("""
+                    INSERT OR IGNORE INTO staged_lines (batch_id, line_no, date, amount, description, ref, match_key)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, rows)
+                self.conn.commit()
+            except Exception as e:
+                self._rollback()
+                raise e
+            stats['lines'] += len(rows)
+            stats['chunks'] += 1
+
+        rows = []
+        for line_no, date, amount, description, ref in lines:
+            rows.append((batch_id, line_no, date, amount, description, ref, match_key(date, amount, description)))
+            if len(rows) >= chunk_size:
+                write_chunk(rows)
+                rows = []
+        if rows:
+            write_chunk(rows)
+        stats['seconds'] = time.perf_counter() - started
+        stats['lines_per_sec'] = stats['lines'] / stats['seconds'] if stats['seconds'] > 0 else float('inf')
+        return stats
+
+    def flag_duplicates(self, batch_id, chunk_size=5000):
+        """
+        Marks the batch's pending lines that are already in the book as 'duplicate' (and
+        returns lines that no longer are to 'pending'). A line is a duplicate when a split of
+        the batch's account has the same (date, amount, normalized description) key, or when
+        an earlier batch for the account staged a line with the same bank reference (OFX FITID).
+        The account's splits in the batch's date range are hashed by key into a dict once,
+        so this is one pass over each side rather than a comparison of every pair. A split
+        vouches for one line only: two identical coffees on one day need two splits.
+        duplicate_of is the transaction id of the match (None if that line is not posted yet).
+        Marks the batch 'staged'. Returns the number of duplicates.
+        """
+        from utils.bank_import import match_key
+        batch = self.get_import_batch(batch_id)
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT MIN(date), MAX(date) FROM staged_lines WHERE batch_id = ?", (batch_id,))
+        first, last = cursor.fetchone()
+
+        # Hash index over the journal: key -> transaction ids. The amount is the bank's view
+        # of the split (debit = money in), whatever the account's type.
+        journal = {}
+        if first is not None:
+            cursor.execute("""
+                SELECT t.id, t.date, j.debit - j.credit, t.description
+                FROM journal_entries j
+                JOIN transactions t ON j.transaction_id = t.id
+                WHERE j.account_id = (SELECT id FROM accounts WHERE name = ?)
+                  AND t.date BETWEEN ? AND ?
+                  AND t.id NOT IN (SELECT transaction_id FROM staged_lines
+                                   WHERE batch_id = ? AND transaction_id IS NOT NULL)
+            """, (batch['account'], first, last, batch_id))
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for tid, date, amount, description in rows:
+                    journal.setdefault(match_key(date, amount, description), []).append(tid)
+
+        cursor.execute("""
+            SELECT s.id, o.transaction_id
+            FROM staged_lines s
+            JOIN staged_lines o ON o.ref = s.ref AND o.batch_id < s.batch_id AND o.status != 'rejected'
+            JOIN import_batches b ON b.id = o.batch_id AND b.account = ?
+            WHERE s.batch_id = ? AND s.ref IS NOT NULL AND s.status IN ('pending', 'duplicate')
+        """, (batch['account'], batch_id))
+        by_ref = dict(cursor.fetchall())
+
+        changes = []
+        duplicates = 0
+        cursor.execute("""
+            SELECT id, match_key, status, duplicate_of FROM staged_lines
+            WHERE batch_id = ? AND status IN ('pending', 'duplicate')
+            ORDER BY line_no
+        """, (batch_id,))
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for line_id, key, status, duplicate_of in rows:
+                if line_id in by_ref:
+                    match = ('duplicate', by_ref[line_id])
+                elif journal.get(key):
+                    match = ('duplicate', journal[key].pop())
+                else:
+                    match = ('pending', None)
+                duplicates += match[0] == 'duplicate'
+                if match != (status, duplicate_of):
+                    changes.append(match + (line_id,))
+        try:
+            cursor.executemany("UPDATE staged_lines SET status = ?, duplicate_of = ? WHERE id = ?", changes)
+            cursor.execute("UPDATE import_batches SET status = 'staged' WHERE id = ?", (batch_id,))
+            self.conn.commit()
+        except Exception as e:
+            self._rollback()
+            raise e
+        return duplicates
+
+    def get_staged_lines(self, batch_id, status=None, limit=None, offset=0):
+        """
+        Rows: (id, line_no, date, amount, description, ref, status, duplicate_of, account,
+        account_type, transaction_id), in file order.
+        """
+        sql = """
+            SELECT id, line_no, date, amount, description, ref, status, duplicate_of, account, account_type,
+                   transaction_id
+            FROM staged_lines WHERE batch_id = ?
+        """
+        params = [batch_id]
+        if status:
+            sql += " AND status = ?"
+            params.append(status)
+        sql += " ORDER BY line_no LIMIT ? OFFSET ?"
+        params.extend((limit if limit is not None else -1, offset))
+        cursor = self.conn.cursor()
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+    def set_staged_status(self, batch_id, status, line_ids=None, only=None):
+        """
+        Review: sets lines of a batch (all of them when line_ids is None) to 'pending',
+        'approved' or 'rejected'. only: just the lines currently in these statuses, e.g.
+        ('pending',) to approve everything not flagged. Posted lines never change.
+        Returns the number of lines changed.
+        """
+        if status not in ('pending', 'approved', 'rejected'):
+            raise ValueError(f"Cannot set a staged line to {status!r}")
+        sql = "UPDATE staged_lines SET status = ? WHERE batch_id = ? AND status != 'posted'"
+        params = [status, batch_id]
+        if only:
+            sql += f" AND status IN ({','.join('?' * len(only))})"
+            params.extend(only)
+        if line_ids is not None:
+            sql += f" AND id IN ({','.join('?' * len(line_ids))})"
+            params.extend(line_ids)
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(sql, params)
+            self.conn.commit()
+        except Exception as e:
+            self._rollback()
+            raise e
+        return cursor.rowcount
+
+    def post_staged_lines(self, batch_id, chunk_size=5000):
+        """
+        Posts the batch's approved lines with add_transactions_bulk. Each becomes a two-split
+        transaction between the batch's account and the line's account (UNCATEGORIZED when
+        none was assigned); the same SQLite transaction marks the lines 'posted' with their
+        transaction ids, so an interrupted post leaves nothing half done.
+        Returns add_transactions_bulk's stats.
+        """
+        batch = self.get_import_batch(batch_id)
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT type FROM accounts WHERE name = ?", (batch['account'],))
+        row = cursor.fetchone()
+        bank_type = row[0] if row else 'Asset'
+        # Same id shape as add_transactions_bulk's, with the staged line's id as the counter
+        prefix = str(uuid.uuid4())[:24]
+
+        reader = self.conn.cursor()
+        reader.execute("""
+            SELECT id, date, amount, description, account, account_type FROM staged_lines
+            WHERE batch_id = ? AND status = 'approved'
+            ORDER BY line_no
+        """, (batch_id,))
+
+        def transactions():
+            while True:
+                rows = reader.fetchmany(chunk_size)
+                if not rows:
+                    return
+                for line_id, date, amount, description, account, acc_type in rows:
+                    if not account:
+                        account, acc_type = self.UNCATEGORIZED[amount >= 0]
+                    money_in, money_out = max(amount, 0), max(-amount, 0)
+                    yield date, description, [
+                        {'account_name': batch['account'], 'account_type': bank_type,
+                         'debit': money_in, 'credit': money_out},
+                        {'account_name': account, 'account_type': acc_type,
+                         'debit': money_out, 'credit': money_in},
+                    ], f"{prefix}{line_id:012x}"
+
+        def mark_posted(cursor):
+            cursor.execute("""
+                UPDATE staged_lines SET status = 'posted', transaction_id = ? || printf('%012x', id)
+                WHERE batch_id = ? AND status = 'approved'
+            """, (prefix, batch_id))
+
+        return self.add_transactions_bulk(transactions(), chunk_size, before_commit=mark_posted)
+
+    # --- RECONCILIATION ---
+    # Statement lines (staged_lines) matched to the splits of a bank account they cleared as;
+    # utils.reconcile does the matching, these read the open remainder and record results.
+
+    def get_open_lines(self, batch_id):
+        """A batch's lines not reconciled yet (rejected ones left out): (id, date, amount, description, transaction_id)."""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT s.id, s.date, s.amount, s.description, s.transaction_id
+            FROM staged_lines s
+            WHERE s.batch_id = ? AND s.status != 'rejected'
+              AND NOT EXISTS (SELECT 1 FROM reconciled_splits r WHERE r.line_id = s.id)
+            ORDER BY s.line_no
+        """, (batch_id,))
+        return cursor.fetchall()
+
+    def get_open_splits(self, account_name, start_date=None, end_date=None):
+        """
+        The account's splits not reconciled yet, optionally within dates:
+        (entry_id, tid, date, amount, description), amount as the bank sees it (debit - credit).
+        """
+        sql = """
+            SELECT j.id, t.id, t.date, j.debit - j.credit, t.description
+            FROM journal_entries j
+            JOIN transactions t ON j.transaction_id = t.id
+            WHERE j.account_id = (SELECT id FROM accounts WHERE name = ?)
+              AND NOT EXISTS (SELECT 1 FROM reconciled_splits r WHERE r.entry_id = j.id)
+        """
+        params = [account_name]
+        if start_date:
+            sql += " AND t.date >= ?"
+            params.append(start_date)
+        if end_date:
+            sql += " AND t.date <= ?"
+            params.append(end_date)
+        cursor = self.conn.cursor()
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+    def mark_reconciled(self, matches):
+        """matches: (line_id, [entry_id, ...]) pairs. Returns the number of splits marked."""
+        rows = [(entry_id, line_id) for line_id, entry_ids in matches for entry_id in entry_ids]
+        cursor = self.conn.cursor()
+        try:
+            cursor.executemany("INSERT OR REPLACE INTO reconciled_splits (entry_id, line_id) VALUES (?, ?)", rows)
+            self.conn.commit()
+        except Exception as e:
+            self._rollback()
+            raise e
+        return len(rows)
+
+    def unreconcile(self, entry_ids=None, batch_id=None):
+        """Reopens splits: the given ones, or every split reconciled against a batch. Returns the count."""
+        if entry_ids is not None:
+            sql = f"DELETE FROM reconciled_splits WHERE entry_id IN ({','.join('?' * len(entry_ids))})"
+            params = list(entry_ids)
+        elif batch_id is not None:
+            sql = "DELETE FROM reconciled_splits WHERE line_id IN (SELECT id FROM staged_lines WHERE batch_id = ?)"
+            params = [batch_id]
+        else:
+            raise ValueError("unreconcile needs entry_ids or batch_id")
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(sql, params)
+            self.conn.commit()
+        except Exception as e:
+            self._rollback()
+            raise e
+        return cursor.rowcount
+
+    def get_reconciliation_summary(self, account_name):
+        """{'reconciled', 'open'} split counts and {'reconciled_balance', 'open_balance'} (bank view, cents)."""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT r.entry_id IS NOT NULL, COUNT(*), COALESCE(SUM(j.debit - j.credit), 0)
+            FROM journal_entries j
+            LEFT JOIN reconciled_splits r ON r.entry_id = j.id
+            WHERE j.account_id = (SELECT id FROM accounts WHERE name = ?)
+            GROUP BY 1
+        """, (account_name,))
+        summary = {'reconciled': 0, 'open': 0, 'reconciled_balance': 0, 'open_balance': 0}
+        for reconciled, count, balance in cursor.fetchall():
+            key = 'reconciled' if reconciled else 'open'
+            summary[key] = count
+            summary[key + '_balance'] = balance
+        return summary
+
+    # --- CATEGORIZATION ---
+
+    RULE_KINDS = ('substring', 'regex', 'amount')
+
+    def get_rules(self):
+        """Rows: (id, position, kind, pattern, account, account_type, min_amount, max_amount), in the order they are tried."""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT id, position, kind, pattern, account, account_type, min_amount, max_amount
+            FROM categorization_rules ORDER BY position, id
+        """)
+        return cursor.fetchall()
+
+    def add_rule(self, kind, pattern, account, account_type, min_amount=None, max_amount=None, position=None):
+        """
+        A rule tried after the existing ones (or at position). Returns its id. Substring
+        patterns match the normalized description (lowercase words, digits and punctuation
+        dropped: "starbucks"); regex patterns search the description as the bank wrote it,
+        ignoring case ("amzn mktp us", "store #0231").
+        """
+        from utils.categorize import check_rule
+        if kind not in self.RULE_KINDS:
+            raise ValueError(f"Rule kind must be one of {', '.join(self.RULE_KINDS)}, not {kind!r}")
+        if (kind == 'amount') != (not pattern):
+            raise ValueError("Amount rules take no pattern; substring and regex rules need one")
+        check_rule(kind, pattern) # A pattern that can never match is refused here, not at import time
+        cursor = self.conn.cursor()
+        try:
+            if position is None:
+                cursor.execute("SELECT COALESCE(MAX(position), 0) + 1 FROM categorization_rules")
+                position = cursor.fetchone()[0]
+            cursor.execute("""
+                INSERT INTO categorization_rules (position, kind, pattern, account, account_type, min_amount, max_amount)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (position, kind, pattern or None, account.strip().title(), account_type, min_amount, max_amount))
+            self.conn.commit()
+        except Exception as e:
+            self._rollback()
+            raise e
+        return cursor.lastrowid
+
+    def delete_rule(self, rule_id):
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("DELETE FROM categorization_rules WHERE id = ?", (rule_id,))
+            self.conn.commit()
+        except Exception as e:
+            self._rollback()
+            raise e
+        return cursor.rowcount > 0
+
+    def get_counterparts(self, account_name, chunk_size=5000):
+        """
+        What the journal has paired with an account, for learning categories: yields
+        (description, other_account, other_type, count) over its two-split transactions,
+        read in chunks. The UNCATEGORIZED accounts are left out.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            WITH own AS (
+                SELECT j.transaction_id AS tid FROM journal_entries j
+                WHERE j.account_id = (SELECT id FROM accounts WHERE name = ?)
+            )
+            SELECT t.description, a.name, a.type, COUNT(*)
+            FROM own
+            JOIN transactions t ON t.id = own.tid
+            JOIN journal_entries j ON j.transaction_id = own.tid
+            JOIN accounts a ON a.id = j.account_id
+            WHERE a.name != ? AND a.name NOT IN (?, ?)
+              AND (SELECT COUNT(*) FROM journal_entries x WHERE x.transaction_id = own.tid) = 2
+            GROUP BY t.description, a.id
+        """, (account_name, account_name, *(name for name, _ in self.UNCATEGORIZED.values())))
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+
+    def assign_staged_accounts(self, assignments):
+        """assignments: (line_id, account, account_type) for lines not posted yet. Returns the number updated."""
+        cursor = self.conn.cursor()
+        try:
+            cursor.executemany("""
+                UPDATE staged_lines SET account = ?, account_type = ?
+                WHERE id = ? AND status != 'posted'
+            """, [(account, acc_type, line_id) for line_id, account, acc_type in assignments])
+            self.conn.commit()
+        except Exception as e:
+            self._rollback()
+            raise e
+        return cursor.rowcount
@@ -1,14 +1,15 @@
 import sys
 import os
+from utils import startup_timing # First import: starts the startup clock
 from PyQt6.QtWidgets import QApplication, QSplashScreen
 from PyQt6.QtGui import QPixmap, QColor
 from PyQt6.QtCore import Qt, QTimer
 from database import DatabaseHandler
 from ui.dashboard import DashboardWindow
-from seed_gui import SetupWindow
 
 def main():
     app = QApplication(sys.argv)
+    startup_timing.mark("qt ready")
     
     # CRITICAL FIX: Prevents app from closing when SetupWindow is closed, 
     # ensuring the transition to DashboardWindow happens smoothly.
@@ -20,6 +21,9 @@ def main():
     def launch_dashboard():
         # 1. Init Database
         db = DatabaseHandler()
+        if os.environ.get("RATIO_TRACE") == "1":
+            db.enable_tracing() # Query tracing from launch; also toggled on the diagnostics page (Ctrl+Shift+D)
+        startup_timing.mark("database open")
         
         # 2. Show Ratio Splash
         pixmap = QPixmap(400, 300)
@@ -27,33 +31,51 @@ def main():
         splash = QSplashScreen(pixmap)
         splash.showMessage("RATIO\nPowered by 1CA", Qt.AlignmentFlag.AlignCenter, QColor("#00ADB5"))
         splash.show()
+        app.processEvents() # Paint the splash before the dashboard is built
         
-        # 3. Create Dashboard (Hidden initially)
-        dashboard = DashboardWindow(db)
+        # 3. Create Dashboard (only its first page is built, see DashboardWindow.page)
+        dashboard = DashboardWindow(db, stall_ms=int(os.environ.get("RATIO_STALL_MS", 250)))
         windows['dashboard'] = dashboard
+        startup_timing.mark("dashboard built")
         
-        def show_main():
-            # Close Setup if it exists
-            if 'setup' in windows:
-                windows['setup'].close()
-                
-            splash.finish(dashboard)
-            dashboard.show()
-            
-            # Now we can allow the app to quit if Dashboard is closed
-            app.setQuitOnLastWindowClosed(True)
-            
-        QTimer.singleShot(2000, show_main)
+        # Close Setup if it exists
+        if 'setup' in windows:
+            windows['setup'].close()
+        
+        # The splash goes as soon as the dashboard is up; no fixed delay
+        dashboard.show()
+        splash.finish(dashboard)
+        startup_timing.mark("window shown")
+        
+        # Now we can allow the app to quit if Dashboard is closed
+        app.setQuitOnLastWindowClosed(True)
+        
+        # The first event loop turn after show() is when the window takes input
+        QTimer.singleShot(0, lambda: startup_timing.mark("interactive"))
+        
+        def first_data_shown():
+            dashboard.stats_page.refreshed.disconnect(first_data_shown)
+            startup_timing.mark("dashboard data shown")
+            startup_timing.report()
+        dashboard.stats_page.refreshed.connect(first_data_shown)
 
     # --- Logic: Check for DB ---
     db_file = "ratio.db"
     
     if not os.path.exists(db_file):
         # 1. No DB found? Show Setup
-        setup = SetupWindow()
-        windows['setup'] = setup
-        setup.setup_complete.connect(launch_dashboard)
-        setup.show()
+        try:
+            from seed_gui import SetupWindow # Only needed on first run
+        except ImportError:
+            SetupWindow = None
+        if SetupWindow is None:
+            # No setup wizard in this build: start on an empty book (or load one with cli.py import)
+            launch_dashboard()
+        else:
+            setup = SetupWindow()
+            windows['setup'] = setup
+            setup.setup_complete.connect(launch_dashboard)
+            setup.show()
     else:
         # 2. DB exists? Go straight to Dashboard
         launch_dashboard()
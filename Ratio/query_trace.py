@@ -0,0 +1,304 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+# Opt-in SQL instrumentation for DatabaseHandler (see DatabaseHandler.enable_tracing).
+# Every statement is timed from execute() until its rows have been fetched, counted by
+# SQLite's trace callback (executemany runs one statement per row), and attributed to
+# the UI or export code that issued it.
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+# Frames in these files are plumbing: attribution skips past them to the real caller
+_PLUMBING = {os.path.join(_HERE, name) for name in ("database.py", "analytics.py", "query_trace.py")} | \
+            {os.path.join(_HERE, "ui", "query_executor.py")}
+_SPACES = re.compile(r"\s+")
+_PLACEHOLDER_LIST = re.compile(r"\bIN\s*\(\s*\?(\s*,\s*\?)*\s*\)", re.IGNORECASE)
+
+def normalize_sql(sql):
+    """One line, and IN (?, ?, ...) lists of any length (even one) collapse to one shape."""
+    return _PLACEHOLDER_LIST.sub("IN (?, ...)", _SPACES.sub(" ", sql).strip())
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+def find_caller():
+    """
+    (caller, api, call_id) for the statement being issued on this thread:
+    caller  the first frame outside the database plumbing, as Class.method (e.g. LedgerPage.populate_summary)
+    api     the DatabaseHandler method it went through (e.g. get_ledger_page)
+    call    the caller's (filename, lineno, function), so repeats inside one invocation can be
+            counted (N+1) without keeping the frame, and every local it holds, alive
+    """
+    frame = sys._getframe(2)
+    api = None
+    while frame is not None:
+        path = frame.f_code.co_filename
+        if path not in _PLUMBING:
+            break
+        if path.endswith("database.py") and not frame.f_code.co_name.startswith("_"):
+            api = frame.f_code.co_name
+        frame = frame.f_back
+    if frame is None:
+        return "(unknown)", api, None
+    # Lambdas that use self (executor.submit(key, lambda db: self.x(db), ...)) see it as a free variable
+    owner = frame.f_locals.get('self')
+    prefix = type(owner).__name__ if owner is not None else os.path.splitext(os.path.basename(frame.f_code.co_filename))[0]
+    code = frame.f_code
+    return f"{prefix}.{code.co_name}", api, (code.co_filename, frame.f_lineno, code.co_name)
+
+class _Stats:
+    __slots__ = ("count", "executions", "rows", "total", "max", "durations", "callers", "worst_repeat")
+
+    def __init__(self, keep):
+        self.count = 0
+        self.executions = 0
+        self.rows = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.durations = deque(maxlen=keep)
+        self.callers = {}
+        self.worst_repeat = 0
+
+    def add(self, record):
+        self.count += 1
+        self.executions += record['executions']
+        self.rows += record['rows']
+        self.total += record['ms']
+        self.max = max(self.max, record['ms'])
+        self.durations.append(record['ms'])
+        self.callers[record['caller']] = self.callers.get(record['caller'], 0) + 1
+
+    def summary(self):
+        ordered = sorted(self.durations)
+        return {'count': self.count, 'executions': self.executions, 'rows': self.rows,
+                'total_ms': self.total, 'mean_ms': self.total / self.count if self.count else 0.0,
+                'p50_ms': percentile(ordered, 50), 'p95_ms': percentile(ordered, 95),
+                'p99_ms': percentile(ordered, 99), 'max_ms': self.max,
+                'callers': dict(sorted(self.callers.items(), key=lambda kv: -kv[1]))}
+
+class QueryTracer:
+    """
+    Collects statement records from any number of traced connections (and threads).
+    recent: the last `history` statements; per-statement and per-caller aggregates keep
+    the last `keep` durations each for the percentiles. A statement repeated at least
+    n_plus_one times inside one caller invocation is reported as an N+1 suspect.
+    """
+
+    def __init__(self, history=2000, keep=1000, n_plus_one=20):
+        self.history = history
+        self.keep = keep
+        self.n_plus_one = n_plus_one
+        self.enabled = True
+        self._lock = threading.RLock() # RLock: a cursor finalized by the GC may record while we hold it
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.recent = deque(maxlen=self.history)
+            self.by_statement = {}
+            self.by_caller = {}
+            self._repeats = {} # (thread, call site, sql) -> statements issued during the current call
+            self._last_call = {} # thread name -> (filename, function) of its previous statement
+
+    def record(self, record):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.recent.append(record)
+            sql = record['sql']
+            stats = self.by_statement.get(sql)
+            if stats is None:
+                stats = self.by_statement[sql] = _Stats(self.keep)
+            stats.add(record)
+            caller = self.by_caller.get(record['caller'])
+            if caller is None:
+                caller = self.by_caller[record['caller']] = _Stats(self.keep)
+            caller.add(record)
+
+            # N+1: count repeats of this statement while the same caller keeps issuing
+            # statements on this thread; a statement from another caller ends the invocation
+            call = record.pop('call', None)
+            if call is not None:
+                thread = record['thread']
+                function = (call[0], call[2])
+                if self._last_call.get(thread) != function:
+                    self._repeats = {k: v for k, v in self._repeats.items() if k[0] != thread}
+                    self._last_call[thread] = function
+                key = (thread, call, sql)
+                self._repeats[key] = self._repeats.get(key, 0) + 1
+                stats.worst_repeat = max(stats.worst_repeat, self._repeats[key])
+
+    # --- REPORTS ---
+
+    def statements(self):
+        """Per-statement aggregates, slowest total first."""
+        with self._lock:
+            rows = [dict(sql=sql, worst_repeat=s.worst_repeat, **s.summary()) for sql, s in self.by_statement.items()]
+        return sorted(rows, key=lambda r: -r['total_ms'])
+
+    def callers(self):
+        with self._lock:
+            rows = [dict(caller=name, **s.summary()) for name, s in self.by_caller.items()]
+        for r in rows:
+            del r['callers']
+        return sorted(rows, key=lambda r: -r['total_ms'])
+
+    def n_plus_one_suspects(self):
+        return [r for r in self.statements() if r['worst_repeat'] >= self.n_plus_one]
+
+    def slowest(self, limit=50):
+        with self._lock:
+            recent = list(self.recent)
+        return sorted(recent, key=lambda r: -r['ms'])[:limit]
+
+    def report(self):
+        return {'started': datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+                'dumped': datetime.now().isoformat(timespec='seconds'),
+                'statements': self.statements(), 'callers': self.callers(),
+                'n_plus_one': self.n_plus_one_suspects(), 'slowest': self.slowest(),
+                'recent': list(self.recent)}
+
+    def dump(self, path=None):
+        """Writes report() as JSON. Returns the path."""
+        path = path or f"ratio_trace_{datetime.now():%Y%m%d_%H%M%S}.json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+        return path
+
+# --- TRACED CONNECTION ---
+
+class TracedCursor:
+    """Wraps a sqlite3.Cursor: a statement is timed from execute() until it is fully fetched."""
+
+    def __init__(self, conn, cursor):
+        self._conn = conn
+        self._cursor = cursor
+        self._record = None
+        self._t0 = 0.0
+
+    def _begin(self, sql):
+        self._finish()
+        caller, api, call = find_caller()
+        self._record = {'ts': time.time(), 'sql': normalize_sql(sql), 'ms': 0.0, 'rows': 0,
+                        'executions': 0, 'caller': caller, 'api': api,
+                        'thread': threading.current_thread().name, 'call': call}
+        self._conn._current.record = self._record
+        self._t0 = time.perf_counter()
+
+    def _pause(self, rows=0):
+        if self._record is not None:
+            self._record['ms'] += (time.perf_counter() - self._t0) * 1000
+            self._record['rows'] += rows
+
+    def _resume(self):
+        self._t0 = time.perf_counter()
+
+    def _finish(self):
+        record, self._record = self._record, None
+        if record is not None:
+            if self._cursor.rowcount > 0 and not record['rows']:
+                record['rows'] = self._cursor.rowcount # Writes: rows changed
+            self._conn.tracer.record(record)
+
+    def execute(self, sql, params=()):
+        self._begin(sql)
+        try:
+            self._cursor.execute(sql, params)
+        finally:
+            self._pause()
+        if self._cursor.description is None:
+            self._finish() # Nothing to fetch
+        return self
+
+    def executemany(self, sql, seq):
+        self._begin(sql)
+        try:
+            self._cursor.executemany(sql, seq)
+        finally:
+            self._pause()
+        self._finish()
+        return self
+
+    def fetchone(self):
+        self._resume()
+        row = self._cursor.fetchone()
+        self._pause(1 if row is not None else 0)
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        self._resume()
+        rows = self._cursor.fetchmany(size) if size is not None else self._cursor.fetchmany()
+        self._pause(len(rows))
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        self._resume()
+        rows = self._cursor.fetchall()
+        self._pause(len(rows))
+        self._finish()
+        return rows
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    def close(self):
+        self._finish()
+        self._cursor.close()
+
+    def __del__(self):
+        # Cursors read with a single fetchone() are never exhausted: record them when dropped
+        self._finish()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+class TracedConnection:
+    """Stands in for a sqlite3.Connection; everything but the cursors passes straight through."""
+
+    def __init__(self, conn, tracer):
+        self._raw = conn
+        self.tracer = tracer
+        self._current = threading.local() # The record the trace callback adds executions to
+        conn.set_trace_callback(self._on_statement)
+
+    def _on_statement(self, statement):
+        record = getattr(self._current, 'record', None)
+        if record is not None:
+            record['executions'] += 1
+
+    def cursor(self):
+        return TracedCursor(self, self._raw.cursor())
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq):
+        return self.cursor().executemany(sql, seq)
+
+    def detach(self):
+        """Stops tracing; returns the plain connection."""
+        self._raw.set_trace_callback(None)
+        return self._raw
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
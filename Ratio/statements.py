@@ -0,0 +1,85 @@
+from utils.money import fmt_money
+
+# Financial statements as display rows, built from a balances dict shaped like
+# DatabaseHandler.get_balances_period() (or JournalColumns.balances()). No Qt, no
+# matplotlib: the dashboard pages and the command line (cli.py) share these.
+# Amounts are integer cents; section headings carry "" instead of an amount.
+
+ACCOUNT_TYPES = ('Asset', 'Liability', 'Equity', 'Revenue', 'Expense')
+
+def trial_balance(balances):
+    """[(account, debit_total, credit_total), ..., ("TOTAL", debits, credits)], by account name."""
+    data = []
+    tot_dr = 0; tot_cr = 0
+    for name in sorted(balances.keys()):
+        info = balances[name]
+        dr = info['debit_total']; cr = info['credit_total']
+        data.append((name, dr, cr))
+        tot_dr += dr; tot_cr += cr
+    data.append(("TOTAL", tot_dr, tot_cr))
+    return data
+
+def _section(balances, acc_type, data):
+    total = 0
+    for name, info in balances.items():
+        if info['type'] == acc_type:
+            data.append((name, info['net_balance']))
+            total += info['net_balance']
+    return total
+
+def income_statement(balances):
+    """[(line, amount), ...]: revenue and expense accounts, their totals and NET INCOME."""
+    data = []
+    data.append(("--- REVENUE ---", ""))
+    rev_total = _section(balances, 'Revenue', data)
+    data.append(("Total Revenue", rev_total))
+
+    data.append(("--- EXPENSES ---", ""))
+    exp_total = _section(balances, 'Expense', data)
+    data.append(("Total Expenses", exp_total))
+
+    data.append(("", ""))
+    data.append(("NET INCOME", rev_total - exp_total))
+    return data
+
+def balance_sheet(balances):
+    """
+    [(line, amount), ...] from as-of balances: assets, liabilities and equity, with the
+    net income to date as Retained Earnings.
+    """
+    net_income = sum(i['net_balance'] for i in balances.values() if i['type'] == 'Revenue') - \
+                 sum(i['net_balance'] for i in balances.values() if i['type'] == 'Expense')
+    data = []
+    data.append(("--- ASSETS ---", ""))
+    asset_total = _section(balances, 'Asset', data)
+    data.append(("TOTAL ASSETS", asset_total))
+    data.append(("", ""))
+
+    data.append(("--- LIABILITIES ---", ""))
+    liab_total = _section(balances, 'Liability', data)
+
+    data.append(("--- EQUITY ---", ""))
+    equity_total = _section(balances, 'Equity', data)
+
+    data.append(("Retained Earnings", net_income))
+    equity_total += net_income
+
+    data.append(("TOTAL LIAB. & EQUITY", liab_total + equity_total))
+    return data
+
+def to_records(rows, columns):
+    """
+    Statement rows as dicts for JSON/CSV: amounts become decimal strings in currency
+    units ("1234.56"), headings and blank lines get None.
+    """
+    records = []
+    for row in rows:
+        record = {}
+        for col, value in zip(columns, row):
+            if isinstance(value, int):
+                value = fmt_money(value, grouping=False)
+            elif value == "" and col != columns[0]:
+                value = None
+            record[col] = value
+        records.append(record)
+    return records
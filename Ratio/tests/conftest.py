@@ -0,0 +1,46 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+# The app imports its modules flat from Ratio/ (from database import ..., from utils.x import ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseHandler
+
+@pytest.fixture
+def db(tmp_path):
+    handler = DatabaseHandler(str(tmp_path / "ratio.db"))
+    yield handler
+    handler.close()
+
+@pytest.fixture
+def post_bank(db):
+    """post_bank(date, description, amount, other, other_type): a two-split transaction on
+    Checking, amount in cents as the bank sees it (+ money in). Returns the transaction id."""
+    def post(date, description, amount, other="Sales", other_type="Revenue"):
+        db.add_transaction(date, description, [
+            {'account_name': 'Checking', 'account_type': 'Asset',
+             'debit': max(amount, 0), 'credit': max(-amount, 0)},
+            {'account_name': other, 'account_type': other_type,
+             'debit': max(-amount, 0), 'credit': max(amount, 0)},
+        ])
+        return db.conn.execute("SELECT id FROM transactions ORDER BY rowid DESC LIMIT 1").fetchone()[0]
+    return post
+
+@pytest.fixture
+def legacy_book(tmp_path):
+    """Path of a v0 file: account names on every split and REAL amounts in currency units."""
+    path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE transactions (id TEXT PRIMARY KEY, date TEXT, description TEXT, "
+                 "posted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+    conn.execute("CREATE TABLE journal_entries (id INTEGER PRIMARY KEY AUTOINCREMENT, transaction_id TEXT, "
+                 "account_name TEXT, account_type TEXT, debit REAL DEFAULT 0.0, credit REAL DEFAULT 0.0)")
+    conn.execute("INSERT INTO transactions (id, date, description) VALUES ('a', '2024-01-01', 'Sale')")
+    conn.execute("INSERT INTO journal_entries (transaction_id, account_name, account_type, debit, credit) "
+                 "VALUES ('a', 'Cash', 'Asset', 10.1, 0), ('a', 'Sales', 'Revenue', 0, 10.1)")
+    conn.commit()
+    conn.close()
+    return path
@@ -0,0 +1,59 @@
+import pytest
+
+def sale(amount, account="Cash", acc_type="Asset"):
+    return [{'account_name': account, 'account_type': acc_type, 'debit': amount, 'credit': 0},
+            {'account_name': 'Sales', 'account_type': 'Revenue', 'debit': 0, 'credit': amount}]
+
+def totals(db):
+    """account -> (debit_total, credit_total, entry_count) as stored in account_balances."""
+    rows = db.conn.execute("""
+        SELECT a.name, b.debit_total, b.credit_total, b.entry_count
+        FROM account_balances b JOIN accounts a ON a.id = b.account_id
+    """).fetchall()
+    return {name: (dr, cr, n) for name, dr, cr, n in rows}
+
+def last_id(db):
+    return db.conn.execute("SELECT id FROM transactions ORDER BY rowid DESC LIMIT 1").fetchone()[0]
+
+def test_add_keeps_running_totals(db):
+    db.add_transaction("2024-01-01", "A", sale(1000))
+    db.add_transaction("2024-01-02", "B", sale(250))
+    assert totals(db) == {'Cash': (1250, 0, 2), 'Sales': (0, 1250, 2)}
+    assert db.verify_account_balances() == []
+
+def test_update_moves_amounts_between_accounts(db):
+    db.add_transaction("2024-01-01", "A", sale(1000))
+    tid = last_id(db)
+    db.add_transaction("2024-01-02", "B", sale(250))
+    db.update_transaction(tid, "2024-01-01", "A", sale(400, "Bank", "Asset"))
+    assert totals(db) == {'Cash': (250, 0, 1), 'Bank': (400, 0, 1), 'Sales': (0, 650, 2)}
+    assert db.verify_account_balances() == []
+
+def test_delete_drops_accounts_left_without_splits(db):
+    db.add_transaction("2024-01-01", "A", sale(1000, "Bank", "Asset"))
+    tid = last_id(db)
+    db.add_transaction("2024-01-02", "B", sale(250))
+    db.delete_transaction(tid)
+    assert totals(db) == {'Cash': (250, 0, 1), 'Sales': (0, 250, 1)}
+    assert db.verify_account_balances() == []
+
+def test_failed_write_leaves_the_totals_alone(db):
+    db.add_transaction("2024-01-01", "A", sale(1000))
+    with pytest.raises(ValueError):
+        db.add_transaction("2024-01-02", "B", sale(2.5))
+    assert totals(db) == {'Cash': (1000, 0, 1), 'Sales': (0, 1000, 1)}
+
+def test_verify_reports_and_rebuild_repairs_drift(db):
+    db.add_transaction("2024-01-01", "A", sale(1000))
+    db.conn.execute("UPDATE account_balances SET debit_total = 1 WHERE debit_total = 1000")
+    db.conn.commit()
+    problems = db.verify_account_balances()
+    assert [(p['account'], p['stored'], p['derived']) for p in problems] == [('Cash', (1, 0, 1), (1000, 0, 1))]
+    db.rebuild_account_balances()
+    assert db.verify_account_balances() == []
+    assert db.get_account_balances()['Cash']['net_balance'] == 1000
+
+def test_clear_all_data_empties_the_totals(db):
+    db.add_transaction("2024-01-01", "A", sale(1000))
+    db.clear_all_data()
+    assert totals(db) == {} and db.verify_account_balances() == []
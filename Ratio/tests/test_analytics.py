@@ -0,0 +1,189 @@
+import numpy as np
+import pytest
+
+from analytics import JournalColumns
+
+def post(db, date, amount, debit=("Cash", "Asset"), credit=("Sales", "Revenue")):
+    db.add_transaction(date, "x", [
+        {'account_name': debit[0], 'account_type': debit[1], 'debit': amount, 'credit': 0},
+        {'account_name': credit[0], 'account_type': credit[1], 'debit': 0, 'credit': amount},
+    ])
+    return db.conn.execute("SELECT id FROM transactions ORDER BY rowid DESC LIMIT 1").fetchone()[0]
+
+def lines(amount, debit=("Cash", "Asset"), credit=("Sales", "Revenue")):
+    return [{'account_name': debit[0], 'account_type': debit[1], 'debit': amount, 'credit': 0},
+            {'account_name': credit[0], 'account_type': credit[1], 'debit': 0, 'credit': amount}]
+
+def same_as_sql(db, cols):
+    """The column store answers every query like the SQL it stands in for."""
+    assert np.all(np.diff(cols.day) >= 0) # Still in date order
+    for start, end in [(None, None), ("2024-02-01", None), (None, "2024-02-15"), ("2024-01-15", "2024-03-01")]:
+        assert cols.balances(start, end) == db.get_balances_period(start, end)
+        for granularity in ("daily", "weekly", "monthly"):
+            assert cols.revenue_expense_series(start, end, granularity) == \
+                db.get_revenue_expense_series(start, end, granularity)
+    assert cols.date_range() == db.get_date_range()
+
+@pytest.fixture
+def book(db):
+    post(db, "2024-02-01", 500)
+    post(db, "2024-01-10", 300, ("Rent", "Expense"), ("Cash", "Asset"))
+    post(db, "2024-03-05", 700)
+    return db
+
+def test_first_refresh_is_a_full_load(book):
+    cols = JournalColumns(book)
+    assert cols.refresh() is True and cols.refresh() is False
+    assert (cols.full_loads, cols.incremental_loads) == (1, 0)
+    same_as_sql(book, cols)
+
+def test_new_splits_merge_into_date_order(book):
+    cols = JournalColumns(book)
+    cols.refresh()
+    post(book, "2024-01-20", 40)   # Between loaded dates
+    post(book, "2023-12-31", 7)    # Before all of them
+    post(book, "2024-04-01", 9, ("Fees", "Expense"), ("Cash", "Asset")) # A new account
+    assert cols.refresh() is True
+    assert (cols.full_loads, cols.incremental_loads) == (1, 1)
+    assert len(cols.entry) == 12
+    same_as_sql(book, cols)
+
+def test_deleted_and_updated_splits_are_dropped(book):
+    cols = JournalColumns(book)
+    cols.refresh()
+    gone = post(book, "2024-02-10", 60)
+    moved = post(book, "2024-02-11", 80)
+    cols.refresh()
+    book.delete_transaction(gone)
+    book.update_transaction(moved, "2024-01-02", "moved", lines(90))
+    cols.refresh()
+    assert cols.full_loads == 1
+    entries = {row[0] for row in book.conn.execute("SELECT id FROM journal_entries")}
+    assert set(cols.entry.tolist()) == entries # Tombstoned ids gone, new ids in
+    assert cols.deleted_seq == book.conn.execute("SELECT MAX(seq) FROM deleted_entries").fetchone()[0]
+    same_as_sql(book, cols)
+
+def test_account_type_change_flips_existing_splits(book):
+    cols = JournalColumns(book)
+    cols.refresh()
+    # The latest posting decides an account's type: Sales turns debit-normal
+    post(book, "2024-03-10", 10, ("Sales", "Asset"), ("Cash", "Asset"))
+    cols.refresh()
+    assert cols.full_loads == 1
+    assert cols.balances()['Sales'] == {'type': "Asset", 'debit_total': 10, 'credit_total': 1200,
+                                        'net_balance': -1190}
+    assert cols.type_totals()['Revenue'] == 0
+    same_as_sql(book, cols)
+
+def test_cleared_journal_reloads_from_scratch(book):
+    cols = JournalColumns(book)
+    cols.refresh()
+    book.clear_all_data()
+    post(book, "2024-05-01", 1)
+    cols.refresh()
+    assert cols.full_loads == 2 and cols.entry.tolist() == [1, 2]
+    same_as_sql(book, cols)
+
+def test_empty_book(db):
+    cols = JournalColumns(db)
+    assert cols.balances() == {} and cols.date_range() == (None, None)
+    assert cols.revenue_expense_series() == [] and cols.net_income() == 0
+    with pytest.raises(ValueError):
+        cols.revenue_expense_series(granularity="hourly")
+
+# --- COLUMN CACHE FILE ---
+
+def cold_start(db):
+    """What a restart sees: a second handler on the same file, with a fresh column store."""
+    from database import DatabaseHandler
+    return DatabaseHandler(db.db_name)
+
+def test_sidecar_round_trip(tmp_path):
+    from analytics import read_sidecar, write_sidecar
+    path = str(tmp_path / "x.columns")
+    arrays = {'a': np.arange(5, dtype=np.int32), 'b': np.array([-1, 2**40], dtype=np.int64),
+              'empty': np.empty(0, dtype=np.int8)}
+    write_sidecar(path, {'book_id': "b"}, arrays)
+    header, loaded = read_sidecar(path)
+    assert header['book_id'] == "b"
+    for name, arr in arrays.items():
+        assert loaded[name].dtype == arr.dtype and loaded[name].tolist() == arr.tolist()
+    assert not loaded['a'].flags.writeable
+
+def test_build_then_warm_start(book):
+    cols = book.columns()
+    assert cols.wait_ready(10)
+    same_as_sql(book, cols)
+    book.close() # Persists the file
+
+    again = cold_start(book)
+    try:
+        warm = again.columns()
+        assert warm.ready and warm.full_loads == 0 # Mapped, not queried
+        same_as_sql(again, warm)
+    finally:
+        again.close()
+
+def test_stale_sidecar_is_caught_up(book):
+    book.columns().wait_ready(10)
+    book.columns().save_sidecar()
+    post(book, "2024-02-20", 33)
+    book.delete_transaction(post(book, "2024-01-02", 44))
+
+    again = cold_start(book)
+    try:
+        stale = again.columns()
+        assert not stale.ready # Stamp behind the change counter: rebuilt in the background
+        same_as_sql(again, stale) # Answered through SQL meanwhile
+        assert stale.wait_ready(10)
+        same_as_sql(again, stale)
+    finally:
+        again.close()
+
+@pytest.mark.parametrize("damage", ["garbage", "truncated", "other format"])
+def test_corrupt_sidecar_is_rebuilt(book, damage):
+    from analytics import SIDECAR_FORMAT, sidecar_path
+    book.columns().wait_ready(10)
+    book.columns().save_sidecar()
+    path = sidecar_path(book.db_name)
+    data = open(path, 'rb').read()
+    if damage == "garbage":
+        data = b"not a column file"
+    elif damage == "truncated":
+        data = data[:-8]
+    else:
+        data = data.replace(f'"format": {SIDECAR_FORMAT}'.encode(), b'"format": 9')
+    with open(path, 'wb') as f:
+        f.write(data)
+
+    again = cold_start(book)
+    try:
+        cols = again.columns()
+        assert not cols.ready
+        assert cols.wait_ready(10)
+        same_as_sql(again, cols)
+    finally:
+        again.close()
+
+def test_queries_during_a_build_do_not_reread_the_file(book, monkeypatch):
+    import threading
+    import analytics
+    release = threading.Event()
+    build = JournalColumns._build
+    monkeypatch.setattr(JournalColumns, '_build', lambda self: release.wait(10) and build(self))
+    reads = []
+    read = analytics.read_sidecar
+    monkeypatch.setattr(analytics, 'read_sidecar', lambda path: reads.append(path) or read(path))
+
+    cols = book.columns()
+    for _ in range(5):
+        assert cols.balances() == book.get_balances_period()
+    assert len(reads) == 1 # The constructor's look; the build is still running after it
+    release.set()
+    assert cols.wait_ready(10)
+    same_as_sql(book, cols)
+
+def test_close_twice(book):
+    book.columns().wait_ready(10)
+    book.close()
+    book.close()
@@ -0,0 +1,238 @@
+import io
+
+import pytest
+
+from utils.bank_import import (DateParser, _ofx_tags, import_statement, normalize_description, parse_amount,
+                               read_csv, read_ofx, read_qif)
+
+# --- AMOUNTS ---
+
+@pytest.mark.parametrize("text, decimal, cents", [
+    ("12.34", ".", 1234),
+    ("-12.3", ".", -1230),
+    ("5", ".", 500),
+    ("", ".", 0),
+    ("-1,234.56", ".", -123456),
+    ("1 234.56", ".", 123456),
+    ("1'234.56", ".", 123456),
+    ("(12.00)", ".", -1200),
+    ("12.00-", ".", -1200),
+    ("$5", ".", 500),
+    ("-$3.10", ".", -310),
+    ("5.00 DR", ".", -500),
+    ("5.00CR", ".", 500),
+    ("0.005", ".", 1),
+    ("-12,50", ",", -1250),
+    ("12,5", ",", 1250),
+    ("1.234,56", ",", 123456),
+    ("1 234,56", ",", 123456),
+    ("12,50 €", ",", 1250),
+    ("-1.234.567,89", ",", -123456789),
+    ("1.234", ",", 123400),
+])
+def test_parse_amount(text, decimal, cents):
+    assert parse_amount(text, decimal) == cents
+
+@pytest.mark.parametrize("text, decimal", [
+    ("-12,50", "."),
+    ("12,5", "."),
+    ("1.234,56", "."),
+    ("1 234,56", "."),
+    ("12 50", "."),
+    ("1,23,456.00", "."),
+    ("1,234.56", ","),
+    ("12.5", ","),
+    ("abc", "."),
+    ("12.00", ";"),
+])
+def test_parse_amount_rejects_separators_it_cannot_place(text, decimal):
+    with pytest.raises(ValueError):
+        parse_amount(text, decimal)
+
+# --- DATES ---
+
+@pytest.mark.parametrize("texts, date_format, expected", [
+    (["2024-03-04"], None, ["2024-03-04"]),
+    (["03/04/2024", "13/04/2024"], "%d/%m/%Y", ["2024-04-03", "2024-04-13"]),
+    # The first date that parses settles the format: 03/04 stays month first afterwards
+    (["12/25/2024", "03/04/2024"], None, ["2024-12-25", "2024-03-04"]),
+    # Settled on %m/%d/%Y, the two-digit year of the same format still reads
+    (["01/08/2024", "01/06/24"], None, ["2024-01-08", "2024-01-06"]),
+    (["04-Mar-2024"], None, ["2024-03-04"]),
+    (["20240304"], None, ["2024-03-04"]),
+])
+def test_date_parser(texts, date_format, expected):
+    parse = DateParser(date_format)
+    assert [parse(t) for t in texts] == expected
+
+def test_date_parser_error_names_the_settled_format():
+    parse = DateParser()
+    parse("12/25/2024")
+    with pytest.raises(ValueError, match="%m/%d/%Y"):
+        parse("25/12/2024")
+
+# --- FILES ---
+
+def test_read_csv_amount_column():
+    f = io.StringIO("Date,Payee,Amount,Reference\n2024-01-02,Coffee,-4.50,A1\n\n2024-01-03,Salary,100,\n")
+    assert list(read_csv(f)) == [(1, "2024-01-02", -450, "Coffee", "A1"), (2, "2024-01-03", 10000, "Salary", None)]
+
+def test_read_csv_debit_and_credit_columns():
+    f = io.StringIO("date,description,withdrawal,deposit\n2024-01-02,Rent,500.00,\n2024-01-03,Refund,,20\n")
+    assert [line[2] for line in read_csv(f)] == [-50000, 2000]
+
+def test_read_csv_semicolons_and_decimal_commas():
+    f = io.StringIO('Date;Description;Amount\n03.01.2024;Markt;-12,50\n04.01.2024;Gehalt;"2.500,00"\n')
+    assert list(read_csv(f, "%d.%m.%Y", ",")) == [(1, "2024-01-03", -1250, "Markt", None),
+                                                  (2, "2024-01-04", 250000, "Gehalt", None)]
+
+def test_read_csv_reports_the_bad_line():
+    f = io.StringIO("date,description,amount\n2024-01-02,Coffee,-4.50\n2024-01-03,Tea,\"-4,50\"\n")
+    with pytest.raises(ValueError, match="Line 3"):
+        list(read_csv(f))
+
+def test_read_csv_needs_the_columns():
+    with pytest.raises(ValueError, match="needs date"):
+        list(read_csv(io.StringIO("when,what\n2024-01-01,x\n")))
+
+OFX_SGML = """OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240105120000[-5:EST]<TRNAMT>-4.50<FITID>A1<NAME>Joe&apos;s &amp; Co
+</STMTTRN>
+<STMTTRN><TRNTYPE>CHECK<DTPOSTED>20240106<TRNAMT>-100.00<CHECKNUM>1001<MEMO>Cheque
+</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+OFX_XML = """<?xml version="1.0"?><OFX><BANKTRANLIST>
+<STMTTRN><DTPOSTED>20240105</DTPOSTED><TRNAMT>-4,50</TRNAMT><FITID>A1</FITID><NAME>Joe</NAME></STMTTRN>
+<STMTTRN><DTPOSTED>20240106</DTPOSTED><TRNAMT>250.00</TRNAMT><FITID>A2</FITID><NAME>Pay</NAME></STMTTRN>
+</BANKTRANLIST></OFX>"""
+
+@pytest.mark.parametrize("text, expected", [
+    (OFX_SGML, [(1, "2024-01-05", -450, "Joe's & Co", "A1"), (2, "2024-01-06", -10000, "Cheque", "1001")]),
+    (OFX_XML, [(1, "2024-01-05", -450, "Joe", "A1"), (2, "2024-01-06", 25000, "Pay", "A2")]),
+])
+def test_read_ofx(text, expected):
+    assert list(read_ofx(io.StringIO(text))) == expected
+
+def test_ofx_tags_across_block_boundaries():
+    whole = list(_ofx_tags(io.StringIO(OFX_SGML)))
+    for size in (1, 7, 64):
+        assert list(_ofx_tags(io.StringIO(OFX_SGML), size)) == whole
+
+def test_read_ofx_missing_amount():
+    with pytest.raises(ValueError, match="TRNAMT"):
+        list(read_ofx(io.StringIO("<STMTTRN><DTPOSTED>20240105<NAME>x</STMTTRN>")))
+
+QIF = """!Type:Bank
+D1/ 6'24
+T-4.50
+PCoffee
+N101
+^
+D01/08/2024
+U1,250.00
+MSalary
+SIncome:Salary
+$1,250.00
+^
+"""
+
+def test_read_qif():
+    assert list(read_qif(io.StringIO(QIF))) == [(1, "2024-01-06", -450, "Coffee", "101"),
+                                                (2, "2024-01-08", 125000, "Salary", None)]
+
+@pytest.mark.parametrize("text, words", [
+    ("POS 4411 STARBUCKS #0231 12/03", "starbucks"),
+    ("Card Purchase - Joe's Café", "joe s café"),
+    ("", ""),
+])
+def test_normalize_description(text, words):
+    assert normalize_description(text) == words
+
+# --- DUPLICATES ---
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+def statuses(db, batch_id):
+    return [(row[4], row[6]) for row in db.get_staged_lines(batch_id)]
+
+def test_flag_duplicates_against_the_journal(db, post_bank, tmp_path):
+    tid = post_bank("2024-01-05", "STARBUCKS 0231", -450, "Coffee", "Expense")
+    path = write(tmp_path, "s.csv", "date,description,amount\n"
+                                    "2024-01-05,POS 9 STARBUCKS #0999,-4.50\n"
+                                    "2024-01-05,POS 9 STARBUCKS #0999,-4.50\n"
+                                    "2024-01-06,Rent,-500\n")
+    stats = import_statement(db, path, "checking", categorize=False)
+    assert stats['duplicates'] == 1
+    # One split vouches for one line: the second identical coffee is new
+    assert statuses(db, stats['batch']) == [("POS 9 STARBUCKS #0999", "duplicate"),
+                                            ("POS 9 STARBUCKS #0999", "pending"), ("Rent", "pending")]
+    assert db.get_staged_lines(stats['batch'])[0][7] == tid
+
+def test_flag_duplicates_by_bank_reference_across_batches(db, tmp_path):
+    first = import_statement(db, write(tmp_path, "a.ofx", OFX_XML), "Checking", post=True, categorize=False)
+    assert first['posted'] == 2
+    # The same FITIDs with other descriptions in a later statement
+    later = OFX_XML.replace("Joe", "JOE CORRECTED").replace("20240106", "20240107")
+    second = import_statement(db, write(tmp_path, "b.ofx", later), "Checking", categorize=False)
+    assert second['duplicates'] == 2
+    assert second['batch'] != first['batch']
+
+def test_import_of_the_same_file_resumes_the_batch(db, tmp_path):
+    path = write(tmp_path, "s.csv", "date,description,amount\n2024-01-05,A,-1\n2024-01-06,B,-2\n")
+    first = import_statement(db, path, "Checking", categorize=False)
+    again = import_statement(db, path, "Checking", categorize=False)
+    assert again['batch'] == first['batch'] and again['staged'] == 0 and again['lines'] == 2
+
+def test_import_reports_progress(db, tmp_path):
+    path = write(tmp_path, "s.csv", "date,description,amount\n" +
+                 "".join(f"2024-01-0{i},Line {i},-{i}\n" for i in range(1, 6)))
+    seen = []
+    import_statement(db, path, "Checking", post=True, chunk_size=2, progress=seen.append)
+    assert seen == ["Reading the statement", "Reading the statement: 2 lines", "Reading the statement: 4 lines",
+                    "Looking for lines already in the book", "Categorizing", "Posting"]
+
+# --- JOURNAL PAGE ---
+
+def test_journal_page_imports_on_the_write_worker(db, tmp_path, monkeypatch):
+    import threading
+    import time
+    monkeypatch.setenv("QT_QPA_PLATFORM", "offscreen")
+    QtWidgets = pytest.importorskip("PyQt6.QtWidgets")
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    import ui.journal
+    from ui.write_worker import WriteWorker
+
+    path = write(tmp_path, "s.csv", "date,description,amount\n2024-01-05,A,-1\n2024-01-06,B,-2\n")
+    threads, shown, events = [], [], []
+    stage = ui.journal.import_statement
+    monkeypatch.setattr(ui.journal, 'import_statement',
+                        lambda *a, **kw: threads.append(threading.current_thread()) or stage(*a, **kw))
+    monkeypatch.setattr(ui.journal.QFileDialog, 'getOpenFileName', lambda *a: (path, ""))
+    monkeypatch.setattr(ui.journal.QInputDialog, 'getItem', lambda *a: ("Checking", True))
+    yes = QtWidgets.QMessageBox.StandardButton.Yes
+    monkeypatch.setattr(ui.journal.QMessageBox, 'question', lambda parent, title, text, buttons: shown.append(text) or yes)
+    monkeypatch.setattr(ui.journal.QMessageBox, 'information', lambda parent, title, text: shown.append(text))
+    monkeypatch.setattr(ui.journal.QMessageBox, 'critical', lambda parent, title, text: shown.append(text))
+    db.subscribe(lambda event: events.append(event['kind']))
+
+    writer = WriteWorker(db)
+    page = ui.journal.JournalPage(db, writer)
+    page.import_statement()
+    assert not page.btn_import.isEnabled() # Busy until the worker is done
+    deadline = time.monotonic() + 10
+    while len(shown) < 2 and time.monotonic() < deadline:
+        app.processEvents()
+    writer.shutdown()
+
+    assert threads and threads[0] is not threading.main_thread()
+    assert "Post the other 2 now?" in shown[0] and shown[1] == "2 transactions posted!"
+    assert events == ['bulk'] # Heard through the page's handler, though written on another connection
+    assert db.get_balances_snapshot()['Checking']['net_balance'] == -300
+    assert page.btn_import.isEnabled() and page.progress is None
+    page.close()
@@ -0,0 +1,61 @@
+import pytest
+
+def sales(n, start=0):
+    for i in range(start, start + n):
+        yield (f"2024-01-{i % 28 + 1:02d}", f"Sale {i}", [
+            {'account_name': 'cash ', 'account_type': 'Asset', 'debit': 100 + i, 'credit': 0},
+            {'account_name': 'Sales', 'account_type': 'Revenue', 'debit': 0, 'credit': 100 + i},
+        ])
+
+def count(db, table):
+    return db.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+@pytest.mark.parametrize("n, chunk_size, chunks", [(10, 3, [3, 3, 3, 1]), (6, 3, [3, 3]), (5, 100, [5])])
+def test_bulk_writes_in_chunks(db, n, chunk_size, chunks):
+    stats = db.add_transactions_bulk(sales(n), chunk_size=chunk_size)
+    assert (stats['transactions'], stats['splits']) == (n, 2 * n)
+    assert [c['transactions'] for c in stats['chunks']] == chunks
+    assert (count(db, "transactions"), count(db, "journal_entries")) == (n, 2 * n)
+
+def test_bulk_matches_one_by_one(db, tmp_path):
+    from database import DatabaseHandler
+    db.add_transactions_bulk(sales(30), chunk_size=7)
+    single = DatabaseHandler(str(tmp_path / "single.db"))
+    try:
+        for date, description, lines in sales(30):
+            single.add_transaction(date, description, lines)
+        assert db.get_balances_snapshot() == single.get_balances_snapshot()
+        assert [r[1:] for r in db.get_ledger("Cash")] == [r[1:] for r in single.get_ledger("Cash")]
+    finally:
+        single.close()
+    assert db.verify_account_balances() == []
+    assert db.search_entries("Sale 2")[0] # Indexed for search too
+
+def test_bulk_keeps_given_ids(db):
+    rows = [item + (f"id-{i}",) for i, item in enumerate(sales(3))]
+    db.add_transactions_bulk(rows)
+    assert [r[0] for r in db.conn.execute("SELECT id FROM transactions ORDER BY id")] == ["id-0", "id-1", "id-2"]
+
+def test_unbalanced_transaction_saves_nothing(db):
+    def broken():
+        yield from sales(5)
+        yield ("2024-02-01", "Typo", [
+            {'account_name': 'Cash', 'account_type': 'Asset', 'debit': 100, 'credit': 0},
+            {'account_name': 'Sales', 'account_type': 'Revenue', 'debit': 0, 'credit': 99},
+        ])
+    with pytest.raises(ValueError, match="#6"):
+        db.add_transactions_bulk(broken(), chunk_size=2)
+    assert count(db, "transactions") == 0 and count(db, "account_balances") == 0
+    assert db.get_unique_accounts() == []
+
+def test_before_commit_runs_inside_the_transaction(db):
+    def fail(cursor):
+        raise RuntimeError("stop")
+    with pytest.raises(RuntimeError):
+        db.add_transactions_bulk(sales(3), before_commit=fail)
+    assert count(db, "transactions") == 0
+
+    seen = []
+    db.add_transactions_bulk(sales(3), before_commit=lambda cursor: seen.append(
+        cursor.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]))
+    assert seen == [3]
@@ -0,0 +1,115 @@
+import re
+
+import pytest
+
+from utils.categorize import Categorizer, _Automaton, categorize_batch, learn, required_literal
+
+@pytest.mark.parametrize("patterns, text, found", [
+    ([("he", 1), ("she", 2), ("his", 3), ("hers", 4)], "ushers", {1, 2, 4}),
+    ([("he", 1), ("she", 2), ("his", 3), ("hers", 4)], "ahishers", {1, 2, 3, 4}),
+    ([("abc", 1), ("bcd", 2), ("c", 3)], "abcd", {1, 2, 3}),
+    ([("aaa", 1)], "aa", set()),
+    ([("a", 1), ("a", 2)], "a", {1, 2}),
+])
+def test_automaton(patterns, text, found):
+    assert _Automaton(patterns).search(text) == found
+
+@pytest.mark.parametrize("pattern, literal", [
+    (r"AMZN\s+MKTP", "amzn"),
+    (r"store #0231\b", "store #0231"),
+    (r"^amzn|amazon", None), # Alternation at the top level: nothing is required
+    (r"colou?r", "colo"),
+    (r"net\.?flix", "flix"),
+    (r"[a\]b]xyz", "xyz"),
+    (r"x[\\]yzw", "yzw"),
+    (r"(?i)foo bar", None),
+    (r"ab", None), # Too short to be worth it
+])
+def test_required_literal(pattern, literal):
+    assert required_literal(pattern) == literal
+
+def test_required_literal_is_in_every_match():
+    texts = ["amzn mktp", "AMZN  MKTP x", "colour", "color", "netflix", "net.flix", "bxyz", "]xyz", "x\\yzw"]
+    for pattern in (r"AMZN\s+MKTP", r"colou?r", r"net\.?flix", r"[a\]b]xyz", r"x[\\]yzw"):
+        literal = required_literal(pattern)
+        for text in texts:
+            if re.search(pattern, text, re.IGNORECASE):
+                assert literal in text.casefold(), (pattern, text)
+
+RULES = [
+    # (id, position, kind, pattern, account, type, min_amount, max_amount)
+    (1, 1, 'substring', "Starbucks", "Meals", "Expense", None, None),
+    (2, 2, 'regex', r"AMZN\s+MKTP", "Supplies", "Expense", None, -1),
+    (3, 3, 'regex', r"store #0231\b", "Coffee", "Expense", None, None),
+    (4, 4, 'substring', "acme payroll", "Bonus", "Revenue", 500000, None),
+    (5, 5, 'amount', None, "Bank Fees", "Expense", -500, -1),
+]
+LEARNED = {'acme payroll': ("Salary", "Revenue"), 'shell': ("Fuel", "Expense")}
+
+@pytest.mark.parametrize("description, amount, expected", [
+    ("POS 4411 STARBUCKS #0231 12/03", -450, ("Meals", "Expense", "rule 1")), # Rule order decides
+    ("AMZN MKTP US*2K4", -2500, ("Supplies", "Expense", "rule 2")), # Regex on the raw text, any case
+    ("amzn   mktp", -2500, ("Supplies", "Expense", "rule 2")),
+    ("AMZN MKTP refund", 2500, None), # Outside the rule's amount range
+    ("COSTA STORE #0231", -300, ("Coffee", "Expense", "rule 3")), # Digits only a regex can see
+    ("COSTA STORE #02310", -300, ("Bank Fees", "Expense", "rule 5")),
+    ("ACME PAYROLL 0424", 600000, ("Bonus", "Revenue", "rule 4")),
+    ("ACME PAYROLL 0424", 300000, ("Salary", "Revenue", "learned")),
+    ("SHELL 12", -300, ("Bank Fees", "Expense", "rule 5")), # Rules before learned
+    ("SHELL 12", -3000, ("Fuel", "Expense", "learned")),
+    ("Mystery", -3000, None),
+    (None, -3000, None),
+])
+def test_classify(description, amount, expected):
+    assert Categorizer(RULES, LEARNED).classify(description, amount) == expected
+
+def test_classify_caches_per_description():
+    categorizer = Categorizer(RULES)
+    for _ in range(3):
+        categorizer.classify("POS 1 STARBUCKS #1", -450)
+    assert categorizer.misses == 2 and categorizer.hits == 4 # Normalized and raw lookups
+
+def test_unusable_stored_rules_are_skipped():
+    rules = RULES + [(6, 6, 'substring', "shop1", "X", "Expense", None, None),
+                     (7, 7, 'regex', "(bad", "X", "Expense", None, None)]
+    categorizer = Categorizer(rules)
+    assert [rule_id for rule_id, _ in categorizer.skipped] == [6, 7]
+    assert categorizer.classify("STARBUCKS", -450)[2] == "rule 1"
+
+def test_regex_rules_sharing_a_group_name():
+    rules = [(1, 1, 'regex', r"(?P<n>coffee)", "A", "Expense", None, None),
+             (2, 2, 'regex', r"(?P<n>tea house)", "B", "Expense", None, None)]
+    assert Categorizer(rules).classify("THE TEA HOUSE", -1) == ("B", "Expense", "rule 2")
+
+@pytest.mark.parametrize("kind, pattern", [
+    ('substring', "shop1"),
+    ('substring', "#12"),
+    ('regex', "(bad"),
+    ('amount', "x"),
+    ('regex', ""),
+    ('other', "x"),
+])
+def test_add_rule_refuses_patterns_that_cannot_match(db, kind, pattern):
+    with pytest.raises(ValueError):
+        db.add_rule(kind, pattern, "X", "Expense")
+    assert db.get_rules() == []
+
+def test_learn_and_categorize_batch(db, post_bank, tmp_path):
+    from utils.bank_import import import_statement
+    post_bank("2024-01-01", "POS 1 SHELL #22", -4000, "Fuel", "Expense")
+    post_bank("2024-01-02", "SHELL 9", -3000, "Fuel", "Expense")
+    post_bank("2024-01-03", "Shell", -100, "Snacks", "Expense")
+    assert learn(db, "checking") == {'shell': ("Fuel", "Expense")}
+
+    db.add_rule('substring', "starbucks", "Meals", "Expense")
+    path = tmp_path / "s.csv"
+    path.write_text("date,description,amount\n2024-02-01,STARBUCKS 1,-4.50\n2024-02-02,SHELL 4,-40.00\n"
+                    "2024-02-03,Mystery,-70.00\n")
+    stats = import_statement(db, str(path), "Checking", post=True)
+    assert (stats['categorized'], stats['posted'], stats['skipped_rules']) == (2, 3, [])
+    balances = db.get_balances_snapshot()
+    assert balances['Meals']['net_balance'] == 450
+    assert balances['Fuel']['net_balance'] == 4000 + 3000 + 4000
+    assert balances['Uncategorized Expense']['net_balance'] == 7000
+    # Posted lines keep their account
+    assert categorize_batch(db, stats['batch'], overwrite=True)['lines'] == 0
@@ -0,0 +1,110 @@
+import pytest
+
+def lines(amount, account="Cash", acc_type="Asset"):
+    return [{'account_name': account, 'account_type': acc_type, 'debit': amount, 'credit': 0},
+            {'account_name': 'Sales', 'account_type': 'Revenue', 'debit': 0, 'credit': amount}]
+
+@pytest.fixture
+def events(db):
+    seen = []
+    db.subscribe(seen.append)
+    return seen
+
+def last_id(db):
+    return db.conn.execute("SELECT id FROM transactions ORDER BY rowid DESC LIMIT 1").fetchone()[0]
+
+def test_added(db, events):
+    db.add_transaction("2024-01-05", "Sale", lines(100))
+    assert events == [{
+        'kind': 'added', 'ids': [last_id(db)], 'dates': ["2024-01-05"], 'accounts': ["Cash", "Sales"],
+        'added': [("2024-01-05", "Cash", "Asset", 100, 0), ("2024-01-05", "Sales", "Revenue", 0, 100)],
+        'removed': None,
+    }]
+
+def test_updated_carries_both_states(db, events):
+    db.add_transaction("2024-01-05", "Sale", lines(100))
+    tid = last_id(db)
+    db.update_transaction(tid, "2024-02-01", "Sale", lines(250, "Bank"))
+    event = events[-1]
+    assert (event['kind'], event['ids']) == ('updated', [tid])
+    assert event['removed'] == [("2024-01-05", "Cash", "Asset", 100, 0), ("2024-01-05", "Sales", "Revenue", 0, 100)]
+    assert event['added'] == [("2024-02-01", "Bank", "Asset", 250, 0), ("2024-02-01", "Sales", "Revenue", 0, 250)]
+    assert event['dates'] == ["2024-01-05", "2024-02-01"] and event['accounts'] == ["Bank", "Cash", "Sales"]
+
+def test_deleted(db, events):
+    db.add_transaction("2024-01-05", "Sale", lines(100))
+    tid = last_id(db)
+    db.delete_transaction(tid)
+    assert events[-1]['kind'] == 'deleted' and events[-1]['added'] is None
+    assert events[-1]['removed'] == [("2024-01-05", "Cash", "Asset", 100, 0), ("2024-01-05", "Sales", "Revenue", 0, 100)]
+    db.delete_transaction(tid) # Nothing left to delete: nothing to tell
+    assert len(events) == 2
+
+def test_bulk_and_cleared_ask_listeners_to_reload(db, events):
+    db.add_transactions_bulk([("2024-03-01", "A", lines(1)), ("2024-01-01", "B", lines(2, "Bank"))], chunk_size=1)
+    db.add_transactions_bulk([])
+    db.clear_all_data()
+    assert events == [
+        {'kind': 'bulk', 'ids': None, 'dates': ["2024-01-01", "2024-03-01"], 'accounts': ["Bank", "Cash", "Sales"],
+         'added': None, 'removed': None, 'count': 2},
+        {'kind': 'cleared', 'ids': None, 'dates': None, 'accounts': None, 'added': None, 'removed': None},
+    ]
+
+def test_failed_write_emits_nothing(db, events):
+    with pytest.raises(ValueError):
+        db.add_transaction("2024-01-05", "Sale", lines(1.5))
+    assert events == []
+
+def test_a_broken_listener_does_not_hide_the_change(db, events, capsys):
+    def broken(event):
+        raise RuntimeError("boom")
+    db.subscribe(broken)
+    later = []
+    db.subscribe(later.append)
+    db.add_transaction("2024-01-05", "Sale", lines(100))
+    assert len(events) == 1 and len(later) == 1
+    assert "boom" in capsys.readouterr().out
+    db.unsubscribe(broken)
+    db.unsubscribe(later.append)
+    db.add_transaction("2024-01-06", "Sale", lines(100))
+    assert len(later) == 1 and len(events) == 2
+
+# --- PATCHING ---
+
+@pytest.mark.parametrize("start, end, cash", [(None, None, 150), ("2024-01-06", None, 50), (None, "2024-01-05", 100)])
+def test_patch_balances_matches_a_reload(db, events, start, end, cash):
+    patch_balances = pytest.importorskip("ui.change_events").patch_balances
+    balances = {name: dict(info) for name, info in db.get_balances_period(start, end).items()}
+    db.add_transaction("2024-01-05", "Sale", lines(100))
+    db.add_transaction("2024-01-10", "Sale", lines(50))
+    for event in events:
+        assert patch_balances(balances, event, start, end)
+    assert balances == db.get_balances_period(start, end)
+    assert balances['Cash']['net_balance'] == cash
+
+def test_patch_balances_gives_up_on_what_it_cannot_describe(db, events):
+    patch_balances = pytest.importorskip("ui.change_events").patch_balances
+    db.add_transaction("2024-01-05", "Sale", lines(100))
+    balances = {name: dict(info) for name, info in db.get_account_balances().items()}
+    db.add_transaction("2024-01-06", "Sale", lines(5, "Cash", "Expense")) # Cash changes type
+    db.add_transactions_bulk([("2024-01-07", "A", lines(1))])
+    assert not patch_balances(balances, events[-2])
+    assert not patch_balances(balances, events[-1])
+
+def test_ledger_page_patches_its_own_copy(db, monkeypatch):
+    monkeypatch.setenv("QT_QPA_PLATFORM", "offscreen")
+    QtWidgets = pytest.importorskip("PyQt6.QtWidgets")
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    from ui.ledger import LedgerPage
+    db.add_transaction("2024-01-05", "Sale", lines(100))
+    page = LedgerPage(db)
+    page.show()
+    page.refresh()
+    cached = db.get_account_balances()
+    page.on_change({'kind': 'added', 'ids': ["x"], 'dates': ["2024-01-06"], 'accounts': ["Cash", "Sales"],
+                    'added': [("2024-01-06", "Cash", "Asset", 7, 0), ("2024-01-06", "Sales", "Revenue", 0, 7)],
+                    'removed': None})
+    assert page.balances['Cash']['net_balance'] == 107
+    assert cached['Cash']['net_balance'] == 100 # The report cache's dict is left alone
+    page.close()
+    app.processEvents()
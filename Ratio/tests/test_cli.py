@@ -0,0 +1,54 @@
+import json
+import subprocess
+import sys
+
+import cli
+from database import DatabaseHandler
+
+JOURNAL = """date,description,account,type,debit,credit,ref
+2024-01-05,Invoice 1,Cash,Asset,120.50,,a
+2024-01-05,Invoice 1,Sales,Revenue,,120.50,a
+2024-01-09,Rent,Rent,Expense,80,,b
+2024-01-09,Rent,Cash,Asset,,80,b
+"""
+
+def run(capsys, *argv):
+    code = cli.main(list(argv))
+    out, err = capsys.readouterr()
+    return code, out, err
+
+def test_import_then_reports(tmp_path, capsys):
+    path, journal = str(tmp_path / "ratio.db"), tmp_path / "journal.csv"
+    journal.write_text(JOURNAL)
+    code, out, _ = run(capsys, "--db", path, "import", str(journal))
+    assert code == 0 and "Imported 2 transactions (4 splits)" in out
+
+    code, out, _ = run(capsys, "--db", path, "trial-balance", "--format", "json")
+    assert code == 0
+    assert {row['account']: (row['debit'], row['credit']) for row in json.loads(out)} == \
+        {'Cash': ("120.50", "80.00"), 'Rent': ("80.00", "0.00"), 'Sales': ("0.00", "120.50"),
+         'TOTAL': ("200.50", "200.50")}
+
+def test_bad_input_is_an_error_without_a_traceback(tmp_path, capsys):
+    journal = tmp_path / "journal.csv"
+    journal.write_text(JOURNAL.replace("80,,b", "81,,b"))
+    code, _, err = run(capsys, "--db", str(tmp_path / "ratio.db"), "import", str(journal))
+    assert code == 1 and "does not balance" in err
+    code, _, err = run(capsys, "--db", str(tmp_path / "missing.db"), "trial-balance")
+    assert code == 1 and "No database" in err
+
+def test_read_only_cli_command_upgrades_a_legacy_book(legacy_book, capsys):
+    code, out, _ = run(capsys, "--db", legacy_book, "trial-balance", "--format", "csv")
+    assert code == 0 and "Cash" in out
+    reader = DatabaseHandler(legacy_book, read_only=True)
+    try:
+        assert reader.schema_version() == DatabaseHandler.SCHEMA_VERSION
+    finally:
+        reader.close()
+
+def test_cli_never_imports_qt(tmp_path):
+    code = ("import sys, cli; cli.main(['--db', sys.argv[1], 'statement', 'income']); "
+            "assert not [m for m in sys.modules if m.startswith(('PyQt6', 'matplotlib'))]")
+    DatabaseHandler(str(tmp_path / "ratio.db")).close()
+    subprocess.run([sys.executable, "-c", code, str(tmp_path / "ratio.db")], check=True,
+                   cwd=cli.__file__.rsplit("cli.py", 1)[0] or ".")
@@ -0,0 +1,99 @@
+import csv
+import json
+import os
+
+import pytest
+
+from utils.ledger_export import (JOURNAL_COLUMNS, columnar_footer, export_journal, export_ledger,
+                                 export_trial_balance, format_for, read_columnar, write_chunks)
+
+def post(db, date, description, amount, debit=("Cash", "Asset"), credit=("Sales", "Revenue")):
+    db.add_transaction(date, description, [
+        {'account_name': debit[0], 'account_type': debit[1], 'debit': amount, 'credit': 0},
+        {'account_name': credit[0], 'account_type': credit[1], 'debit': 0, 'credit': amount},
+    ])
+
+@pytest.fixture
+def book(db):
+    for i in range(30):
+        post(db, f"2024-01-{i % 28 + 1:02d}", f"Sale {i % 4}", 1000 + i)
+    post(db, "2024-02-01", "Rent, February \"office\"", 80000, ("Rent", "Expense"), ("Cash", "Asset"))
+    post(db, "2024-02-02", "Café ☕", 5, ("Meals", "Expense"), ("Cash", "Asset"))
+    return db
+
+def journal(db, account_name=None):
+    return [row for rows in db.iter_journal(account_name) for row in rows]
+
+def columnar_rows(path, columns=None):
+    rows = []
+    for group in read_columnar(path, columns):
+        rows += zip(*group.values())
+    return rows
+
+def test_format_for():
+    assert [format_for(p) for p in ("a.csv", "b.JSONL", "c.rcol")] == ["csv", "jsonl", "rcol"]
+    with pytest.raises(ValueError):
+        format_for("d.xlsx")
+
+def test_rcol_round_trip(book, tmp_path):
+    path = str(tmp_path / "journal.rcol")
+    stats = export_journal(book, path, chunk_size=7)
+    assert (stats['rows'], stats['chunks'], stats['largest_chunk']) == (64, 10, 7)
+    assert columnar_rows(path) == journal(book)
+    footer = columnar_footer(path)
+    assert footer['rows'] == 64 and len(footer['row_groups']) == 10
+    assert [c['name'] for c in footer['columns']] == [name for name, _ in JOURNAL_COLUMNS]
+
+def test_rcol_reads_only_the_columns_asked_for(book, tmp_path):
+    path = str(tmp_path / "journal.rcol")
+    export_journal(book, path, chunk_size=7)
+    assert columnar_rows(path, ['date', 'debit']) == [(row[1], row[5]) for row in journal(book)]
+
+def test_csv_and_jsonl_write_amounts_in_currency_units(book, tmp_path):
+    export_journal(book, str(tmp_path / "journal.csv"), start_date="2024-02-01")
+    export_journal(book, str(tmp_path / "journal.jsonl"), start_date="2024-02-01")
+    with open(tmp_path / "journal.csv", newline="", encoding="utf-8") as f:
+        from_csv = list(csv.DictReader(f))
+    with open(tmp_path / "journal.jsonl", encoding="utf-8") as f:
+        from_jsonl = [json.loads(line) for line in f]
+    assert from_csv == [{k: str(v) for k, v in row.items()} for row in from_jsonl]
+    assert [(r['account'], r['description'], r['debit'], r['credit']) for r in from_jsonl] == [
+        ("Rent", "Rent, February \"office\"", "800.00", "0.00"),
+        ("Cash", "Rent, February \"office\"", "0.00", "800.00"),
+        ("Meals", "Café ☕", "0.05", "0.00"),
+        ("Cash", "Café ☕", "0.00", "0.05"),
+    ]
+
+def test_ledger_balance_opens_at_the_day_before(book, tmp_path):
+    path = str(tmp_path / "cash.rcol")
+    export_ledger(book, "Cash", path, start_date="2024-01-15", chunk_size=4)
+    rows = columnar_rows(path)
+    assert rows[0][1] >= "2024-01-15"
+    assert rows[-1][-1] == book.get_balances_snapshot()['Cash']['net_balance']
+    with pytest.raises(ValueError):
+        export_ledger(book, "Nope", str(tmp_path / "nope.csv"))
+
+def test_trial_balance(book, tmp_path):
+    path = str(tmp_path / "tb.rcol")
+    export_trial_balance(book, path)
+    balances = book.get_balances_snapshot()
+    assert columnar_rows(path) == [(name, info['type'], info['debit_total'], info['credit_total'],
+                                    info['net_balance']) for name, info in sorted(balances.items())]
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl", "rcol"])
+def test_failed_export_removes_its_partial_file(book, tmp_path, fmt):
+    path = str(tmp_path / f"journal.{fmt}")
+
+    def chunks():
+        yield from book.iter_journal(chunk_size=5)
+        raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        write_chunks(chunks(), path, JOURNAL_COLUMNS)
+    assert not os.path.exists(path)
+
+def test_bad_rows_remove_the_partial_file_too(tmp_path):
+    path = str(tmp_path / "x.rcol")
+    with pytest.raises(ValueError):
+        write_chunks([[("a", "2024-01-01")], [("b", "not a date")]], path, (('s', 'str'), ('d', 'date')))
+    assert not os.path.exists(path)
@@ -0,0 +1,43 @@
+import pytest
+
+def book(db, n=25):
+    for i in range(n):
+        day = f"2024-01-{i % 9 + 1:02d}" # Several transactions a day, posted out of date order
+        db.add_transaction(day, f"Sale {i}", [
+            {'account_name': 'Cash', 'account_type': 'Asset', 'debit': 100 + i, 'credit': 0},
+            {'account_name': 'Sales', 'account_type': 'Revenue', 'debit': 0, 'credit': 100 + i},
+        ])
+
+def pages(db, account, direction, limit, search=None):
+    rows, key = db.get_ledger_page(account, None, limit, direction, search)
+    out = list(rows)
+    while key is not None:
+        rows, key = db.get_ledger_page(account, key, limit, direction, search)
+        out.extend(rows)
+    return out
+
+@pytest.mark.parametrize("account", [None, "Cash"])
+@pytest.mark.parametrize("direction", ["asc", "desc"])
+@pytest.mark.parametrize("limit", [1, 4, 7, 100])
+def test_keyset_pages_add_up_to_one_page(db, account, direction, limit):
+    book(db)
+    everything, key = db.get_ledger_page(account, None, 1000, direction)
+    assert key is None
+    assert pages(db, account, direction, limit) == everything
+    assert len(everything) == (25 if account else 50)
+    dates = [row[1] for row in everything]
+    assert dates == sorted(dates, reverse=direction == "desc")
+
+def test_keyset_running_balance_matches_get_ledger(db):
+    book(db)
+    paged = pages(db, "Cash", "asc", 4)
+    assert [(row[0], row[7]) for row in paged] == [(row[0], row[7]) for row in db.get_ledger("Cash")]
+
+def test_keyset_paging_with_a_search(db):
+    book(db)
+    found = pages(db, None, "asc", 3, "Sale 1")
+    assert {row[4] for row in found} == {"Sale 1"} | {f"Sale {i}" for i in range(10, 20)}
+
+def test_keyset_paging_rejects_a_bad_direction(db):
+    with pytest.raises(ValueError):
+        db.get_ledger_page(None, None, 10, "sideways")
@@ -0,0 +1,54 @@
+import pytest
+
+from database import DatabaseHandler
+from utils.money import fmt_money, to_cents
+
+# --- CENTS ---
+
+@pytest.mark.parametrize("value, cents", [(None, 0), (0, 0), (1234, 1234), (-5, -5)])
+def test_cents_accepts_integer_cents(value, cents):
+    assert DatabaseHandler._cents(value) == cents
+
+@pytest.mark.parametrize("value", [12.0, 12.5, 0.0, True, "12"])
+def test_cents_refuses_everything_else(value):
+    with pytest.raises(ValueError):
+        DatabaseHandler._cents(value)
+
+@pytest.mark.parametrize("text, cents", [
+    ("12", 1200), ("1,234.56", 123456), ("0.005", 1), ("-0.005", -1), ("2.675", 268), (12.5, 1250),
+])
+def test_to_cents(text, cents):
+    assert to_cents(text) == cents
+
+@pytest.mark.parametrize("cents, kwargs, text", [
+    (123456, {}, "1,234.56"),
+    (-123456, {'parens': True}, "(1,234.56)"),
+    (123456, {'grouping': False}, "1234.56"),
+    (250, {'decimals': 0}, "3"), # Half up like to_cents, not half-even
+    (350, {'decimals': 0}, "4"),
+    (-250, {'decimals': 0}, "-3"),
+    (5, {'decimals': 1}, "0.1"),
+    (None, {}, "0.00"),
+])
+def test_fmt_money(cents, kwargs, text):
+    assert fmt_money(cents, **kwargs) == text
+
+def test_add_transaction_refuses_float_amounts(db):
+    with pytest.raises(ValueError, match="integer cents"):
+        db.add_transaction("2024-01-01", "x", [
+            {'account_name': 'Cash', 'account_type': 'Asset', 'debit': 12.0, 'credit': 0},
+            {'account_name': 'Sales', 'account_type': 'Revenue', 'debit': 0, 'credit': 12.0},
+        ])
+    assert db.get_balances_snapshot() == {}
+
+# --- MIGRATION ---
+
+def test_legacy_book_is_migrated_to_cents(legacy_book):
+    db = DatabaseHandler(legacy_book)
+    try:
+        assert db.schema_version() == DatabaseHandler.SCHEMA_VERSION
+        balances = db.get_balances_snapshot()
+        assert balances['Cash']['net_balance'] == 1010 and balances['Sales']['net_balance'] == 1010
+        assert db.verify_account_balances() == []
+    finally:
+        db.close()
@@ -0,0 +1,78 @@
+import pytest
+
+def sale(db, date, amount, account="Cash"):
+    db.add_transaction(date, f"Sale {date}", [
+        {'account_name': account, 'account_type': 'Asset', 'debit': amount, 'credit': 0},
+        {'account_name': 'Sales', 'account_type': 'Revenue', 'debit': 0, 'credit': amount},
+    ])
+    return db.conn.execute("SELECT id FROM transactions ORDER BY rowid DESC LIMIT 1").fetchone()[0]
+
+def cash(db, as_of):
+    return db.get_balances_snapshot(as_of).get('Cash', {}).get('net_balance', 0)
+
+def closed(db):
+    return [row[0] for row in db.get_closed_periods()]
+
+def scan(db, as_of):
+    """As-of balances the slow way: every split up to the date."""
+    return db._process_balances(db.conn.execute(
+        db._grouped_balances_sql("t.date <= ?"), (as_of,)).fetchall())
+
+@pytest.fixture
+def book(db):
+    for date, amount in [("2024-01-10", 100), ("2024-02-10", 200), ("2024-03-10", 400), ("2024-04-10", 800)]:
+        sale(db, date, amount)
+    return db
+
+def test_close_periods_monthly_and_yearly(book):
+    assert book.close_periods("2024-03-15") == ["2024-01-31", "2024-02-29"]
+    assert book.close_periods("2024-03-31") == ["2024-03-31"] # Only what is not closed yet
+    assert book.close_periods("2024-12-31", "yearly") == ["2024-12-31"]
+    with pytest.raises(ValueError):
+        book.close_periods("2024-12-31", "weekly")
+
+@pytest.mark.parametrize("as_of", ["2024-01-31", "2024-02-15", "2024-03-31", "2024-04-30", "2023-12-31"])
+def test_as_of_balances_match_a_full_scan(book, as_of):
+    book.close_periods("2024-03-31")
+    assert book.get_balances_snapshot(as_of) == scan(book, as_of)
+
+def test_back_dated_add_reopens_later_closes(book):
+    book.close_periods("2024-03-31")
+    sale(book, "2024-02-01", 5)
+    assert closed(book) == ["2024-01-31"]
+    assert cash(book, "2024-02-29") == 305 and cash(book, "2024-03-31") == 705
+    assert book.close_periods("2024-03-31") == ["2024-02-29", "2024-03-31"]
+    assert cash(book, "2024-03-31") == 705
+
+def test_back_dated_edit_invalidates_from_the_earlier_date(book):
+    tid = sale(book, "2024-03-05", 50)
+    book.close_periods("2024-03-31")
+    # Moved back into January: both the old and the new period change
+    book.update_transaction(tid, "2024-01-05", "Moved", [
+        {'account_name': 'Cash', 'account_type': 'Asset', 'debit': 70, 'credit': 0},
+        {'account_name': 'Sales', 'account_type': 'Revenue', 'debit': 0, 'credit': 70},
+    ])
+    assert closed(book) == []
+    book.close_periods("2024-03-31")
+    for as_of in ("2024-01-31", "2024-02-29", "2024-03-31"):
+        assert book.get_balances_snapshot(as_of) == scan(book, as_of)
+    assert cash(book, "2024-01-31") == 170
+
+def test_delete_invalidates_its_period(book):
+    tid = sale(book, "2024-02-20", 9)
+    book.close_periods("2024-03-31")
+    book.delete_transaction(tid)
+    assert closed(book) == ["2024-01-31"]
+    assert cash(book, "2024-02-29") == 300
+
+def test_later_postings_keep_earlier_closes(book):
+    book.close_periods("2024-03-31")
+    sale(book, "2024-05-01", 1)
+    assert closed(book) == ["2024-01-31", "2024-02-29", "2024-03-31"]
+    assert cash(book, "2024-05-31") == 1501
+
+def test_reopen_period(book):
+    book.close_periods("2024-03-31")
+    book.reopen_period("2024-02-29")
+    assert closed(book) == ["2024-01-31"]
+    assert cash(book, "2024-03-31") == 700
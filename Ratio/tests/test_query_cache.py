@@ -0,0 +1,65 @@
+def sale(db, amount, date="2024-01-01"):
+    db.add_transaction(date, "Sale", [
+        {'account_name': 'Cash', 'account_type': 'Asset', 'debit': amount, 'credit': 0},
+        {'account_name': 'Sales', 'account_type': 'Revenue', 'debit': 0, 'credit': amount},
+    ])
+
+def cash(balances):
+    return balances.get('Cash', {}).get('net_balance', 0)
+
+def test_repeated_reports_come_from_the_cache(db):
+    sale(db, 100)
+    first = db.get_balances_snapshot()
+    assert db.get_balances_snapshot() is first
+    assert db.get_net_income() == 100 and db.get_net_income() == 100
+    stats = db.cache_stats()
+    assert (stats['hits'], stats['misses']) == (3, 2) # net_income reads the cached snapshot
+
+def test_arguments_are_part_of_the_key(db):
+    sale(db, 100, "2024-01-01")
+    sale(db, 50, "2024-02-01")
+    assert cash(db.get_balances_snapshot("2024-01-31")) == 100
+    assert cash(db.get_balances_snapshot()) == 150
+    assert cash(db.get_balances_period("2024-02-01", "2024-02-29")) == 50
+
+def test_own_writes_invalidate(db):
+    sale(db, 100)
+    assert cash(db.get_balances_snapshot()) == 100
+    sale(db, 50)
+    assert cash(db.get_balances_snapshot()) == 150
+    assert db.cache_stats()['misses'] == 2
+
+def test_reader_sees_the_writers_commits(db):
+    sale(db, 100)
+    reader = db.open_reader()
+    try:
+        assert cash(reader.get_balances_snapshot()) == 100
+        assert cash(reader.get_balances_snapshot()) == 100
+        assert reader.cache_stats()['hits'] == 1
+
+        sale(db, 50) # Another connection: only PRAGMA data_version tells the reader
+        assert cash(reader.get_balances_snapshot()) == 150
+        assert reader.cache_stats()['misses'] == 2
+        assert reader.cache_stats()['generation'] == 0
+
+        first = db.conn.execute("SELECT id FROM transactions ORDER BY rowid LIMIT 1").fetchone()[0]
+        db.delete_transaction(first)
+        assert cash(reader.get_balances_snapshot()) == 50
+        assert reader.get_net_income() == 50
+    finally:
+        reader.close()
+
+def test_lru_eviction_and_clear(tmp_path):
+    from database import DatabaseHandler
+    db = DatabaseHandler(str(tmp_path / "small.db"), cache_size=2)
+    try:
+        sale(db, 100)
+        for end in ("2024-01-01", "2024-01-02", "2024-01-03"):
+            db.get_balances_snapshot(end)
+        assert db.cache_stats()['size'] == 2
+        db.get_balances_snapshot("2024-01-01") # Evicted first
+        assert db.cache_stats()['misses'] == 4
+        db.clear_cache()
+        assert db.cache_stats()['size'] == 0
+    finally:
+        db.close()
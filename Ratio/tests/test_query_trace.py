@@ -0,0 +1,59 @@
+import gc
+import weakref
+
+from query_trace import normalize_sql, percentile
+
+def sale(db, i):
+    db.add_transaction("2024-01-01", f"Sale {i}", [
+        {'account_name': 'Cash', 'account_type': 'Asset', 'debit': 100, 'credit': 0},
+        {'account_name': 'Sales', 'account_type': 'Revenue', 'debit': 0, 'credit': 100},
+    ])
+
+def test_normalize_sql_and_percentile():
+    assert normalize_sql("SELECT *\n  FROM t WHERE id IN (?, ?,?)") == "SELECT * FROM t WHERE id IN (?, ...)"
+    assert percentile([1, 2, 3, 4], 50) == 2 and percentile([], 95) == 0.0
+
+def n_plus_one(db, ids):
+    details = []
+    for tid in ids:
+        details.append(db.get_transaction_details(tid))
+    return details
+
+def one_query(db, ids):
+    return db.get_entry_rows(ids)
+
+def test_n_plus_one_suspects(db):
+    for i in range(25):
+        sale(db, i)
+    ids = [row[0] for row in db.conn.execute("SELECT id FROM transactions")]
+    tracer = db.enable_tracing()
+    one_query(db, ids)
+    n_plus_one(db, ids)
+    suspects = tracer.n_plus_one_suspects()
+    assert len(suspects) == 1 and suspects[0]['worst_repeat'] == 25
+    assert list(suspects[0]['callers']) == ["test_query_trace.n_plus_one"]
+
+def test_repeats_reset_between_callers(db):
+    sale(db, 0)
+    tid = db.conn.execute("SELECT id FROM transactions").fetchone()[0]
+    tracer = db.enable_tracing()
+    for _ in range(25):
+        n_plus_one(db, [tid]) # One query per call, with another caller in between
+        one_query(db, [tid])
+    assert tracer.n_plus_one_suspects() == []
+
+def test_tracing_keeps_no_frames_alive(db):
+    tracer = db.enable_tracing()
+
+    class Marker:
+        pass
+
+    def caller():
+        marker = Marker()
+        db.get_unique_accounts()
+        return weakref.ref(marker)
+
+    ref = caller()
+    gc.collect()
+    assert ref() is None # The caller's locals went with its frame
+    assert tracer.statements()[0]['count'] == 1
@@ -0,0 +1,94 @@
+import pytest
+
+from utils.reconcile import _subset_sum, match_lines, reconcile_statement
+
+# lines: (line_id, date, amount, description, transaction_id)
+# splits: (entry_id, tid, date, amount, description)
+
+@pytest.mark.parametrize("lines, splits, matches, unmatched", [
+    # own: the split the import posted for the line, whatever its date
+    ([(1, "2024-01-10", -450, "Coffee", "t1")],
+     [(10, "t1", "2024-01-01", -450, "Coffee")],
+     [(1, [10], 'own')], []),
+    # exact: same amount within the tolerance
+    ([(1, "2024-01-10", -450, "Coffee", None)],
+     [(10, "t1", "2024-01-12", -450, "Something else")],
+     [(1, [10], 'exact')], []),
+    # exact: the nearest day wins over a matching description further away
+    ([(1, "2024-01-10", -450, "Coffee", None)],
+     [(10, "t1", "2024-01-08", -450, "Coffee"), (11, "t2", "2024-01-11", -450, "Tea")],
+     [(1, [11], 'exact')], []),
+    # exact: on the same distance, the matching normalized description wins
+    ([(1, "2024-01-10", -450, "POS 1 COFFEE #9", None)],
+     [(10, "t1", "2024-01-09", -450, "Tea"), (11, "t2", "2024-01-11", -450, "coffee")],
+     [(1, [11], 'exact')], []),
+    # outside the tolerance, or another amount: unmatched
+    ([(1, "2024-01-10", -450, "Coffee", None), (2, "2024-01-10", -451, "Coffee", None)],
+     [(10, "t1", "2024-01-14", -450, "Coffee"), (11, "t2", "2024-01-10", -450, "Coffee")],
+     [(1, [11], 'exact')], [2]),
+    # group: a deposit of several cheques
+    ([(1, "2024-01-10", 13000, "Deposit", None)],
+     [(10, "t1", "2024-01-09", 10000, "A"), (11, "t2", "2024-01-09", 2551, "B"), (12, "t3", "2024-01-10", 449, "C")],
+     [(1, [10, 11, 12], 'group')], []),
+    # group: splits of the other sign never count
+    ([(1, "2024-01-10", 5000, "Deposit", None)],
+     [(10, "t1", "2024-01-10", 7000, "A"), (11, "t2", "2024-01-10", -2000, "B")],
+     [], [1]),
+])
+def test_match_lines(lines, splits, matches, unmatched):
+    got, left = match_lines(lines, splits, tolerance_days=3, max_group=4)
+    assert [(line_id, sorted(ids), kind) for line_id, ids, kind in got] == matches
+    assert left == unmatched
+
+def test_match_lines_uses_every_split_once():
+    lines = [(1, "2024-01-10", -450, "Coffee", None), (2, "2024-01-11", -450, "Coffee", None)]
+    splits = [(10, "t1", "2024-01-10", -450, "Coffee")]
+    got, left = match_lines(lines, splits)
+    assert got == [(1, [10], 'exact')] and left == [2]
+
+def test_match_lines_own_split_is_not_taken_by_an_exact_match():
+    # Line 1 sorts first by date but line 2 owns the split: line 2 keeps it
+    lines = [(1, "2024-01-09", -450, "Coffee", None), (2, "2024-01-10", -450, "Coffee", "t1")]
+    splits = [(10, "t1", "2024-01-10", -450, "Coffee")]
+    got, left = match_lines(lines, splits)
+    assert got == [(2, [10], 'own')] and left == [1]
+
+def test_match_lines_one_to_one_only():
+    lines = [(1, "2024-01-10", 300, "Deposit", None)]
+    splits = [(10, "t1", "2024-01-10", 100, "A"), (11, "t2", "2024-01-10", 200, "B")]
+    assert match_lines(lines, splits, max_group=1) == ([], [1])
+
+class _S:
+    def __init__(self, amount):
+        self.amount = amount
+
+@pytest.mark.parametrize("amounts, target, max_size, found", [
+    ([500, 300, 200], 700, 4, [500, 200]),
+    ([500, 300, 200], 1000, 4, [500, 300, 200]),
+    ([500, 300, 200], 1000, 2, None),
+    ([700], 700, 4, None), # A group has 2 splits or more
+    ([400, 400, 100], 900, 3, [400, 400, 100]),
+    ([-500, -200], -700, 4, [-500, -200]),
+])
+def test_subset_sum(amounts, target, max_size, found):
+    group = _subset_sum([_S(a) for a in amounts], target, max_size)
+    assert (None if group is None else [s.amount for s in group]) == found
+
+def test_reconcile_statement(db, post_bank, tmp_path):
+    from utils.bank_import import import_statement
+    post_bank("2024-03-01", "Invoice 1", 10000)
+    post_bank("2024-03-02", "Invoice 2", 2550)
+    post_bank("2024-03-04", "Rent", -50000, "Rent", "Expense")
+    path = tmp_path / "s.csv"
+    path.write_text("date,description,amount\n2024-03-03,DEPOSIT,125.50\n2024-03-05,RENT,-500.00\n"
+                    "2024-03-20,Fee,-2.00\n")
+    batch = import_statement(db, str(path), "Checking", categorize=False)['batch']
+
+    dry = reconcile_statement(db, batch, apply=False)
+    assert (dry['exact'], dry['group'], dry['splits_reconciled']) == (1, 1, 0)
+    done = reconcile_statement(db, batch)
+    assert done['splits_reconciled'] == 3 and len(done['unmatched']) == 1
+    assert db.get_reconciliation_summary("Checking")['open'] == 0
+    # Only what is still open is looked at again
+    again = reconcile_statement(db, batch)
+    assert (again['lines'], again['matched']) == (1, 0)
@@ -0,0 +1,114 @@
+import pytest
+
+from utils.search import parse_search
+
+def post(db, date, description, amount, account="Cash", acc_type="Asset", other="Sales", other_type="Revenue"):
+    db.add_transaction(date, description, [
+        {'account_name': account, 'account_type': acc_type, 'debit': amount, 'credit': 0},
+        {'account_name': other, 'account_type': other_type, 'debit': 0, 'credit': amount},
+    ])
+    return db.conn.execute("SELECT id FROM transactions ORDER BY rowid DESC LIMIT 1").fetchone()[0]
+
+def found(db, **criteria):
+    """(date, account, description) of every split a search finds, oldest first."""
+    rows, key = db.search_entries(direction="asc", **criteria)
+    assert key is None
+    return [(row[1], row[2], row[4]) for row in rows]
+
+@pytest.fixture
+def book(db):
+    post(db, "2024-01-05", "Starbucks coffee", 450, "Meals", "Expense", "Cash", "Asset")
+    post(db, "2024-01-20", "Invoice 17 Acme", 120000)
+    post(db, "2024-02-02", "Coffee beans wholesale", 9000, "Supplies", "Expense", "Cash", "Asset")
+    post(db, "2024-03-15", "Acme retainer", 50000)
+    return db
+
+# --- FULL TEXT ---
+
+@pytest.mark.parametrize("text, descriptions", [
+    ("coffee", {"Starbucks coffee", "Coffee beans wholesale"}),
+    ("COF", {"Starbucks coffee", "Coffee beans wholesale"}), # Prefix match, any case
+    ("acme inv", {"Invoice 17 Acme"}),                       # Every word must match
+    ("supplies", {"Coffee beans wholesale"}),                # The account name is indexed too
+    ('"acme" OR', set()),                                    # FTS5 syntax is taken literally: OR is a word
+    ("tea", set()),
+])
+def test_text_search(book, text, descriptions):
+    assert {d for _, _, d in found(book, text=text)} == descriptions
+
+def test_index_follows_updates_and_deletes(book):
+    tid = post(book, "2024-04-01", "Office chair", 20000, "Furniture", "Asset", "Cash", "Asset")
+    assert len(found(book, text="chair")) == 2
+    book.update_transaction(tid, "2024-04-02", "Standing desk", [
+        {'account_name': 'Furniture', 'account_type': 'Asset', 'debit': 30000, 'credit': 0},
+        {'account_name': 'Cash', 'account_type': 'Asset', 'debit': 0, 'credit': 30000},
+    ])
+    assert found(book, text="chair") == []
+    assert found(book, text="desk") == [("2024-04-02", "Furniture", "Standing desk"),
+                                        ("2024-04-02", "Cash", "Standing desk")]
+    book.delete_transaction(tid)
+    assert found(book, text="desk") == [] and found(book, text="furniture") == []
+    book.clear_all_data()
+    assert found(book, text="coffee") == []
+
+def test_rebuild_search_index(book):
+    before = found(book, text="acme")
+    book.conn.execute("DELETE FROM journal_fts")
+    book.conn.commit()
+    assert found(book, text="acme") == []
+    book.rebuild_search_index()
+    assert found(book, text="acme") == before
+
+# --- FILTERS ---
+
+@pytest.mark.parametrize("criteria, expected", [
+    ({'min_amount': 9000, 'max_amount': 50000},
+     {("2024-02-02", "Supplies"), ("2024-02-02", "Cash"), ("2024-03-15", "Cash"), ("2024-03-15", "Sales")}),
+    ({'max_amount': 450}, {("2024-01-05", "Meals"), ("2024-01-05", "Cash")}),
+    ({'start_date': "2024-01-20", 'end_date': "2024-02-02", 'account_type': "Expense"},
+     {("2024-02-02", "Supplies")}),
+    ({'text': "acme", 'min_amount': 100000}, {("2024-01-20", "Cash"), ("2024-01-20", "Sales")}),
+    ({'text': "coffee", 'start_date': "2024-01-06"}, {("2024-02-02", "Supplies"), ("2024-02-02", "Cash")}),
+    ({'text': "coffee", 'end_date': "2024-01-05", 'account_type': "Expense"}, {("2024-01-05", "Meals")}),
+    ({'text': "acme", 'account_name': "Sales", 'max_amount': 60000}, {("2024-03-15", "Sales")}),
+    ({'account_name': "Cash", 'min_amount': 100000}, {("2024-01-20", "Cash")}),
+])
+def test_combined_filters(book, criteria, expected):
+    assert {(date, account) for date, account, _ in found(book, **criteria)} == expected
+
+@pytest.mark.parametrize("narrow", [True, False])
+@pytest.mark.parametrize("text", [None, "acme"])
+def test_both_amount_plans_agree(book, monkeypatch, narrow, text):
+    monkeypatch.setattr(type(book), '_amount_range_is_narrow', lambda self, low, high: narrow)
+    criteria = book.plan_search({'text': text, 'min_amount': 450, 'max_amount': 50000})
+    assert criteria['amount_index'] is (narrow and not text)
+    rows, _ = book.get_ledger_page(None, None, 100, "asc", criteria, with_balance=False)
+    expected = found(book, text=text, min_amount=450, max_amount=50000)
+    assert [(row[1], row[2], row[4]) for row in rows] == expected
+
+def test_a_paged_search_is_planned_once(book, monkeypatch):
+    calls = []
+    probe = type(book)._amount_range_is_narrow
+    monkeypatch.setattr(type(book), '_amount_range_is_narrow',
+                        lambda self, low, high: calls.append((low, high)) or probe(self, low, high))
+    criteria = book.plan_search({'min_amount': 1})
+    rows, key = book.get_ledger_page(None, None, 3, "desc", criteria, with_balance=False)
+    while key is not None:
+        more, key = book.get_ledger_page(None, key, 3, "desc", criteria, with_balance=False)
+        rows += more
+    assert len(rows) == 8 and calls == [(1, None)]
+
+# --- SEARCH BAR SYNTAX ---
+
+@pytest.mark.parametrize("text, criteria", [
+    ("", {}),
+    ("coffee shop", {'text': "coffee shop"}),
+    (">20 <=100.50", {'min_amount': 2001, 'max_amount': 10050}),
+    ("20..1,000", {'min_amount': 2000, 'max_amount': 100000}),
+    ("=42.50", {'min_amount': 4250, 'max_amount': 4250}),
+    ("type:Expense from:2024-01-01 to:2024-03-31 acme",
+     {'account_type': "Expense", 'start_date': "2024-01-01", 'end_date': "2024-03-31", 'text': "acme"}),
+    ("type:nope from:yesterday", {'text': "type:nope from:yesterday"}),
+])
+def test_parse_search(text, criteria):
+    assert parse_search(text) == criteria
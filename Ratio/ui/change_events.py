@@ -0,0 +1,44 @@
+from PyQt6.QtCore import QObject, pyqtSignal
+from database import DatabaseHandler
+
+class DatabaseEvents(QObject):
+    """
+    Qt side of DatabaseHandler.subscribe(): re-emits each change event as changed(event).
+    Listeners always run on the thread that owns this object (the UI thread), even
+    when the write happened on a worker.
+    """
+    changed = pyqtSignal(object)
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        db.subscribe(self._forward)
+
+    def _forward(self, event):
+        self.changed.emit(event)
+
+    def close(self):
+        self.db.unsubscribe(self._forward)
+
+# --- PATCHING HELPERS ---
+
+def patch_balances(balances, event, start_date=None, end_date=None):
+    """
+    Applies a change event's splits dated within [start_date, end_date] (None = open) to a
+    balances dict shaped like db.get_balances_period(). Returns False when the dict cannot
+    be patched and must be reloaded: a bulk load or reset, or an account that changed type.
+    """
+    if event['added'] is None and event['removed'] is None:
+        return False
+    for sign, splits in ((-1, event['removed']), (1, event['added'])):
+        for date, name, acc_type, dr, cr in splits or []:
+            if (start_date and date < start_date) or (end_date and date > end_date):
+                continue
+            info = balances.setdefault(name, {'type': acc_type, 'debit_total': 0,
+                                              'credit_total': 0, 'net_balance': 0})
+            if info['type'] != acc_type:
+                return False
+            info['debit_total'] += sign * dr
+            info['credit_total'] += sign * cr
+            info['net_balance'] += sign * DatabaseHandler.signed_amount(acc_type, dr, cr)
+    return True
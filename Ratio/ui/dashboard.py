@@ -2,7 +2,7 @@ from PyQt6.QtWidgets import (QMainWindow, QWidget, QHBoxLayout, QVBoxLayout, QFr
                              QPushButton, QStackedWidget, QLabel, QTableWidget, QTableWidgetItem, 
                              QHeaderView, QGraphicsDropShadowEffect, QMessageBox)
 from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QColor
+from PyQt6.QtGui import QColor, QKeySequence, QShortcut
 
 # Imports
 from ui.journal import JournalPage
@@ -10,17 +10,36 @@ from ui.ledger import LedgerPage
 from ui.general_journal import GeneralJournalPage 
 from ui.reports import ReportsPage
 from ui.stats import StatsPage
+from utils.money import fmt_money
+import statements
+from ui.query_executor import QueryExecutor
+from ui.write_worker import WriteWorker
+from ui.change_events import DatabaseEvents
+from ui.diagnostics import DiagnosticsPage
+from ui.watchdog import StallWatchdog, phase, span
 
 class SimpleTablePage(QWidget):
-    def __init__(self, title, headers, data_loader_func):
+    def __init__(self, title, headers, data_loader_func, executor=None, events=None):
         super().__init__()
-        self.loader = data_loader_func
+        self.loader = data_loader_func # loader(db) -> rows
+        self.executor = executor
+        self.key = title
+        self.dirty = True
+        if events is not None:
+            events.changed.connect(self.on_change)
         layout = QVBoxLayout()
         self.setLayout(layout)
         
+        header = QHBoxLayout()
         lbl = QLabel(title)
         lbl.setStyleSheet("font-size: 20px; font-weight: bold; color: #00ADB5; margin: 10px;")
-        layout.addWidget(lbl)
+        self.lbl_loading = QLabel("Loading…")
+        self.lbl_loading.setStyleSheet("color: #888;")
+        self.lbl_loading.hide()
+        header.addWidget(lbl)
+        header.addWidget(self.lbl_loading)
+        header.addStretch()
+        layout.addLayout(header)
         
         self.table = QTableWidget()
         self.table.setColumnCount(len(headers))
@@ -30,36 +49,60 @@ class SimpleTablePage(QWidget):
         self.table.setAlternatingRowColors(True)
         layout.addWidget(self.table)
         
+    def on_change(self, event):
+        # Totals are cheap to recompute from the column store; only reload while on screen
+        if self.isVisible():
+            self.refresh()
+        else:
+            self.dirty = True
+
+    @phase("refresh")
     def refresh(self):
-        data = self.loader()
+        self.dirty = False
+        self.lbl_loading.show()
+        if self.executor:
+            self.executor.submit(self.key, self.fetch, self.populate, self.on_error)
+        else:
+            try:
+                self.populate(self.fetch(None))
+            except Exception as e:
+                self.on_error(e)
+
+    @phase("fetch")
+    def fetch(self, db):
+        return self.loader(db)
+
+    def on_error(self, error):
+        self.lbl_loading.hide()
+        QMessageBox.critical(self, "Error", str(error))
+
+    @phase("model")
+    def populate(self, data):
+        self.lbl_loading.hide()
         self.table.setRowCount(len(data))
         for r, row_data in enumerate(data):
             for c, item in enumerate(row_data):
-                if isinstance(item, (float, int)) and c > 0:
-                    val = float(item)
-                    if val < 0:
-                        val_str = f"({abs(val):,.2f})"
-                        table_item = QTableWidgetItem(val_str)
-                        table_item.setForeground(QColor("#FF5555"))
-                    else:
-                        val_str = f"{val:,.2f}"
-                        table_item = QTableWidgetItem(val_str)
-                        table_item.setForeground(QColor("white"))
+                if isinstance(item, int) and c > 0:
+                    # Amounts are integer cents
+                    table_item = QTableWidgetItem(fmt_money(item, parens=True))
+                    table_item.setForeground(QColor("#FF5555" if item < 0 else "white"))
                     self.table.setItem(r, c, table_item)
                 else:
                     self.table.setItem(r, c, QTableWidgetItem(str(item)))
 
 class DashboardWindow(QMainWindow):
-    def __init__(self, db):
+    def __init__(self, db, stall_ms=250):
         super().__init__()
         self.db = db
+        # Reports UI thread stalls longer than stall_ms on the diagnostics page (0 = off)
+        self.watchdog = StallWatchdog(stall_ms, parent=self) if stall_ms else None
         self.setWindowTitle("Ratio - The Art of Accounting")
         self.resize(1380, 850)
         
         self.setStyleSheet("""
             QMainWindow { background-color: #121212; }
             QLabel { color: white; }
-            QTableWidget { background-color: #1e1e1e; color: white; gridline-color: #333; border: none; }
+            QTableView { background-color: #1e1e1e; color: white; gridline-color: #333; border: none; }
             QHeaderView::section { background-color: #333; color: white; padding: 5px; font-weight: bold; }
         """)
         
@@ -143,29 +186,33 @@ class DashboardWindow(QMainWindow):
     def setup_content(self):
         self.stack = QStackedWidget()
         
-        self.stats_page = StatsPage(self.db) 
-        self.journal_view_page = GeneralJournalPage(self.db) 
-        self.ledger_page = LedgerPage(self.db)
-        self.tb_page = SimpleTablePage("Trial Balance", ["Account", "Debit Total", "Credit Total"], self.get_tb_data)
-        self.is_page = SimpleTablePage("Income Statement", ["Line Item", "Amount"], self.get_is_data)
-        self.bs_page = SimpleTablePage("Balance Sheet", ["Line Item", "Amount"], self.get_bs_data)
-        self.reports_page = ReportsPage(self.db)
-        self.journal_entry_page = JournalPage(self.db)
-        
-        # Connect Dashboard Signals
-        self.stats_page.go_to_income_stmt.connect(lambda: self.switch_page(4))
-        self.stats_page.go_to_ledger.connect(lambda: self.switch_page(2))
+        # Page queries run on a worker thread with its own read connection
+        self.executor = QueryExecutor(self.db, self)
+        # Long writes (statement imports) run on another worker with its own write connection
+        self.writer = WriteWorker(self.db, self)
+        # Writes reach the pages as change events: the visible page patches itself,
+        # the others mark themselves dirty and reload on the next switch_page
+        self.events = DatabaseEvents(self.db, self)
         
-        self.stack.addWidget(self.stats_page)        # 0
-        self.stack.addWidget(self.journal_view_page) # 1
-        self.stack.addWidget(self.ledger_page)       # 2
-        self.stack.addWidget(self.tb_page)           # 3
-        self.stack.addWidget(self.is_page)           # 4
-        self.stack.addWidget(self.bs_page)           # 5
-        self.stack.addWidget(self.reports_page)      # 6
-        self.stack.addWidget(self.journal_entry_page)# 7
+        # Pages are built on first navigation (see page()); until then the stack holds
+        # an empty placeholder at their index
+        self.page_builders = [
+            self.build_stats_page,                                                  # 0
+            lambda: GeneralJournalPage(self.db, self.events),                       # 1
+            lambda: LedgerPage(self.db, self.executor, self.events),                # 2
+            lambda: SimpleTablePage("Trial Balance", ["Account", "Debit Total", "Credit Total"], self.get_tb_data, self.executor, self.events), # 3
+            lambda: SimpleTablePage("Income Statement", ["Line Item", "Amount"], self.get_is_data, self.executor, self.events), # 4
+            lambda: SimpleTablePage("Balance Sheet", ["Line Item", "Amount"], self.get_bs_data, self.executor, self.events), # 5
+            lambda: ReportsPage(self.db),                                           # 6
+            lambda: JournalPage(self.db, self.writer),                              # 7
+            lambda: DiagnosticsPage(self.db, self.executor, self.watchdog),         # 8 (hidden, Ctrl+Shift+D)
+        ]
+        self.pages = [None] * len(self.page_builders)
+        for _ in self.page_builders:
+            self.stack.addWidget(QWidget())
         
         self.layout.addWidget(self.stack)
+        QShortcut(QKeySequence("Ctrl+Shift+D"), self, activated=lambda: self.switch_page(8))
         self.switch_page(0)
 
     def switch_page(self, index):
@@ -177,14 +224,43 @@ class DashboardWindow(QMainWindow):
         else:
             self.fab.hide()
             
+        page = self.page(index)
         self.stack.setCurrentIndex(index)
         
-        if index == 0: self.stats_page.refresh()
-        if index == 1: self.journal_view_page.refresh()
-        if index == 2: self.ledger_page.refresh()
-        if index == 3: self.tb_page.refresh()
-        if index == 4: self.is_page.refresh()
-        if index == 5: self.bs_page.refresh()
+        # New pages load here; built ones only if they missed a change while hidden (see DatabaseEvents)
+        if getattr(page, 'dirty', False):
+            page.refresh()
+
+    def page(self, index):
+        """The page at a stack index, built on first use."""
+        page = self.pages[index]
+        if page is None:
+            with span(f"DashboardWindow.page({index})", "build"):
+                page = self.page_builders[index]()
+            self.pages[index] = page
+            placeholder = self.stack.widget(index)
+            current = self.stack.currentIndex()
+            self.stack.insertWidget(index, page)
+            self.stack.removeWidget(placeholder)
+            placeholder.deleteLater()
+            self.stack.setCurrentIndex(current)
+        return page
+
+    def build_stats_page(self):
+        page = StatsPage(self.db, self.executor, self.events)
+        page.go_to_income_stmt.connect(lambda: self.switch_page(4))
+        page.go_to_ledger.connect(lambda: self.switch_page(2))
+        return page
+
+    stats_page = property(lambda self: self.page(0))
+    journal_view_page = property(lambda self: self.page(1))
+    ledger_page = property(lambda self: self.page(2))
+    tb_page = property(lambda self: self.page(3))
+    is_page = property(lambda self: self.page(4))
+    bs_page = property(lambda self: self.page(5))
+    reports_page = property(lambda self: self.page(6))
+    journal_entry_page = property(lambda self: self.page(7))
+    diagnostics_page = property(lambda self: self.page(8))
 
     def open_new_entry(self):
         self.switch_page(7)
@@ -209,75 +285,28 @@ class DashboardWindow(QMainWindow):
             except Exception as e:
                 QMessageBox.critical(self, "Error", str(e))
 
+    def closeEvent(self, event):
+        if self.watchdog is not None:
+            self.watchdog.stop()
+        self.events.close()
+        self.executor.shutdown()
+        self.writer.shutdown() # Lets a running import finish: its writes are never cut short
+        self.db.close() # Also saves the analytics column cache, so the next launch starts warm
+        super().closeEvent(event)
+
     def resizeEvent(self, event):
         self.fab.move(self.width() - 90, self.height() - 90)
         super().resizeEvent(event)
 
     # --- DATA LOADERS ---
-    def get_tb_data(self):
-        raw = self.db.get_account_balances()
-        data = []
-        tot_dr = 0; tot_cr = 0
-        for name in sorted(raw.keys()):
-            info = raw[name]
-            dr = info['debit_total']; cr = info['credit_total']
-            data.append((name, dr, cr))
-            tot_dr += dr; tot_cr += cr
-        data.append(("TOTAL", tot_dr, tot_cr))
-        return data
+    # These run on the query thread (db = its read connection); None means self.db.
+    # Balances come from the connection's NumPy column store (see analytics.py);
+    # the statement layouts are shared with the command line (see statements.py).
+    def get_tb_data(self, db=None):
+        return statements.trial_balance((db or self.db).columns().balances())
 
-    def get_is_data(self):
-        raw = self.db.get_account_balances()
-        data = []
-        rev_total = 0; exp_total = 0
-        
-        data.append(("--- REVENUE ---", ""))
-        for name, info in raw.items():
-            if info['type'] == 'Revenue':
-                data.append((name, info['net_balance']))
-                rev_total += info['net_balance']
-        data.append(("Total Revenue", rev_total))
-        
-        data.append(("--- EXPENSES ---", ""))
-        for name, info in raw.items():
-            if info['type'] == 'Expense':
-                data.append((name, info['net_balance']))
-                exp_total += info['net_balance']
-        data.append(("Total Expenses", exp_total))
-        
-        net_income = float(rev_total - exp_total)
-        data.append(("", ""))
-        data.append(("NET INCOME", net_income))
-        return data
+    def get_is_data(self, db=None):
+        return statements.income_statement((db or self.db).columns().balances())
 
-    def get_bs_data(self):
-        raw = self.db.get_account_balances()
-        net_income = self.db.get_net_income()
-        data = []
-        asset_total = 0; liab_total = 0; equity_total = 0
-        
-        data.append(("--- ASSETS ---", ""))
-        for name, info in raw.items():
-            if info['type'] == 'Asset':
-                data.append((name, info['net_balance']))
-                asset_total += info['net_balance']
-        data.append(("TOTAL ASSETS", asset_total))
-        data.append(("", ""))
-
-        data.append(("--- LIABILITIES ---", ""))
-        for name, info in raw.items():
-            if info['type'] == 'Liability':
-                data.append((name, info['net_balance']))
-                liab_total += info['net_balance']
-        
-        data.append(("--- EQUITY ---", ""))
-        for name, info in raw.items():
-            if info['type'] == 'Equity':
-                data.append((name, info['net_balance']))
-                equity_total += info['net_balance']
-        
-        data.append(("Retained Earnings", net_income))
-        equity_total += net_income
-        
-        data.append(("TOTAL LIAB. & EQUITY", liab_total + equity_total))
-        return data
\ No newline at end of file
+    def get_bs_data(self, db=None):
+        return statements.balance_sheet((db or self.db).columns().balances())
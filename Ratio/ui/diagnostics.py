@@ -0,0 +1,207 @@
+import json
+from datetime import datetime
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QCheckBox,
+                             QTableWidget, QTableWidgetItem, QHeaderView, QTabWidget, QFileDialog,
+                             QSpinBox)
+from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtGui import QColor
+from ui.watchdog import span_summary
+
+class DiagnosticsPage(QWidget):
+    """
+    Hidden page (Ctrl+Shift+D) over the query tracer and the stall watchdog: per-statement
+    and per-page query timings, N+1 suspects, UI thread stalls and phase timings, and a dump
+    of everything to JSON. Tracing covers the main connection and the query executor's
+    read connection.
+    """
+    SLOW_MS = 100 # p95 above this is highlighted
+
+    def __init__(self, db, executor=None, watchdog=None):
+        super().__init__()
+        self.db = db
+        self.executor = executor
+        self.watchdog = watchdog
+
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+        layout.setContentsMargins(20, 20, 20, 20)
+
+        header = QHBoxLayout()
+        title = QLabel("Diagnostics")
+        title.setStyleSheet("font-size: 20px; font-weight: bold; color: #00ADB5;")
+        self.lbl_summary = QLabel("")
+        self.lbl_summary.setStyleSheet("color: #888; margin-left: 15px;")
+        header.addWidget(title)
+        header.addWidget(self.lbl_summary)
+        header.addStretch()
+
+        self.chk_trace = QCheckBox("Trace queries")
+        self.chk_trace.setStyleSheet("color: white;")
+        self.chk_trace.setChecked(self.db.tracer is not None)
+        self.chk_trace.toggled.connect(self.set_tracing)
+        header.addWidget(self.chk_trace)
+
+        if self.watchdog is not None:
+            lbl_stall = QLabel("Stall ≥")
+            lbl_stall.setStyleSheet("color: white; margin-left: 10px;")
+            self.spin_stall = QSpinBox()
+            self.spin_stall.setRange(20, 10000)
+            self.spin_stall.setSingleStep(50)
+            self.spin_stall.setSuffix(" ms")
+            self.spin_stall.setValue(int(self.watchdog.threshold * 1000))
+            self.spin_stall.valueChanged.connect(self.watchdog.set_threshold)
+            header.addWidget(lbl_stall)
+            header.addWidget(self.spin_stall)
+
+        btn_style = "background-color: #333; color: white; padding: 6px 14px; border-radius: 4px;"
+        btn_reset = QPushButton("Reset")
+        btn_reset.setStyleSheet(btn_style)
+        btn_reset.clicked.connect(self.reset)
+        btn_dump = QPushButton("Dump to File…")
+        btn_dump.setStyleSheet(btn_style)
+        btn_dump.clicked.connect(self.dump)
+        header.addWidget(btn_reset)
+        header.addWidget(btn_dump)
+        layout.addLayout(header)
+
+        self.tabs = QTabWidget()
+        self.tbl_statements = self.create_table(["Statement", "Count", "Rows", "Total ms", "p50", "p95", "p99", "Max", "Top caller"])
+        self.tbl_callers = self.create_table(["Caller", "Count", "Rows", "Total ms", "p50", "p95", "p99", "Max"])
+        self.tbl_n_plus_one = self.create_table(["Statement", "Repeats in one call", "Count", "Total ms", "Top caller"])
+        self.tbl_slowest = self.create_table(["Statement", "ms", "Rows", "Caller", "API", "Thread"])
+        self.tabs.addTab(self.tbl_statements, "Statements")
+        self.tabs.addTab(self.tbl_callers, "Pages")
+        self.tabs.addTab(self.tbl_n_plus_one, "N+1 Suspects")
+        self.tabs.addTab(self.tbl_slowest, "Slowest Recent")
+        self.tbl_stalls = self.create_table(["Blame", "ms", "Time", "Phases inside", "Code"])
+        self.tbl_spans = self.create_table(["Span", "Phase", "Count", "Total ms", "p50", "p95", "Max"])
+        self.tabs.addTab(self.tbl_stalls, "UI Stalls")
+        self.tabs.addTab(self.tbl_spans, "UI Phases")
+        layout.addWidget(self.tabs)
+
+        # Live while on screen
+        self.timer = QTimer(self)
+        self.timer.setInterval(1000)
+        self.timer.timeout.connect(self.refresh)
+
+    def create_table(self, headers):
+        table = QTableWidget()
+        table.setColumnCount(len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        table.setStyleSheet("alternate-background-color: #252525;")
+        table.setAlternatingRowColors(True)
+        return table
+
+    def showEvent(self, event):
+        self.refresh()
+        self.timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    # --- TRACING ---
+
+    def connections(self):
+        dbs = [self.db]
+        if self.executor is not None and self.executor.read_db is not self.db:
+            dbs.append(self.executor.read_db)
+        return dbs
+
+    def set_tracing(self, enabled):
+        tracer = self.db.enable_tracing() if enabled else None
+        if not enabled:
+            self.db.disable_tracing()
+        if len(self.connections()) > 1:
+            # The reader's connection belongs to the query thread, which may be mid-statement:
+            # swap it there, between two queries
+            self.executor.submit("tracing", lambda db: self.trace_reader(db, tracer), lambda _: self.refresh())
+        self.refresh()
+
+    @staticmethod
+    def trace_reader(db, tracer):
+        if tracer is None:
+            db.disable_tracing()
+        else:
+            db.enable_tracing(tracer)
+
+    def reset(self):
+        if self.db.tracer is not None:
+            self.db.tracer.reset()
+        if self.watchdog is not None:
+            self.watchdog.stalls.clear()
+        self.refresh()
+
+    def dump(self):
+        default = f"ratio_diagnostics_{datetime.now():%Y%m%d_%H%M%S}.json"
+        path, _ = QFileDialog.getSaveFileName(self, "Dump Diagnostics", default, "JSON (*.json)")
+        if not path:
+            return
+        report = {'queries': self.db.tracer.report() if self.db.tracer is not None else None,
+                  'ui': self.watchdog.report() if self.watchdog is not None else None}
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+        except Exception as e:
+            print(f"Diagnostics Dump Error: {e}")
+
+    # --- TABLES ---
+
+    def refresh(self):
+        self.refresh_ui()
+        tracer = self.db.tracer
+        if tracer is None:
+            self.lbl_summary.setText("Tracing is off")
+            for table in (self.tbl_statements, self.tbl_callers, self.tbl_n_plus_one, self.tbl_slowest):
+                table.setRowCount(0)
+            return
+
+        statements = tracer.statements()
+        suspects = [s for s in statements if s['worst_repeat'] >= tracer.n_plus_one]
+        total = sum(s['count'] for s in statements)
+        self.lbl_summary.setText(f"{total:,} statements, {len(statements)} distinct, {len(suspects)} N+1 suspects")
+
+        def top(callers):
+            return next(iter(callers), "")
+
+        self.fill(self.tbl_statements, statements, lambda s: [
+            s['sql'], s['count'], s['rows'], s['total_ms'], s['p50_ms'], s['p95_ms'], s['p99_ms'], s['max_ms'], top(s['callers'])])
+        self.fill(self.tbl_callers, tracer.callers(), lambda c: [
+            c['caller'], c['count'], c['rows'], c['total_ms'], c['p50_ms'], c['p95_ms'], c['p99_ms'], c['max_ms']])
+        self.fill(self.tbl_n_plus_one, suspects, lambda s: [
+            s['sql'], s['worst_repeat'], s['count'], s['total_ms'], top(s['callers'])])
+        self.fill(self.tbl_slowest, tracer.slowest(), lambda r: [
+            r['sql'], r['ms'], r['rows'], r['caller'], r['api'] or "", r['thread']])
+
+    def refresh_ui(self):
+        if self.watchdog is None:
+            return
+        stalls = list(self.watchdog.stalls)[::-1] # Newest first
+        self.fill(self.tbl_stalls, stalls, lambda s: [
+            s['blame'], s['ms'], s['time'][11:],
+            ", ".join(f"{p['name']} {p['ms']:.0f}" for p in s['phases'][:3]), " < ".join(s['frames'][:3])])
+        self.fill(self.tbl_spans, span_summary(), lambda s: [
+            s['name'], s['phase'], s['count'], s['total_ms'], s['p50_ms'], s['p95_ms'], s['max_ms']])
+        self.tabs.setTabText(4, f"UI Stalls ({len(stalls)})")
+
+    def fill(self, table, rows, cells):
+        table.setUpdatesEnabled(False)
+        table.setRowCount(len(rows))
+        for r, row in enumerate(rows):
+            values = cells(row)
+            slow = row.get('p95_ms', row.get('ms', 0)) > self.SLOW_MS
+            for c, value in enumerate(values):
+                text = f"{value:,.2f}" if isinstance(value, float) else (f"{value:,}" if isinstance(value, int) else str(value))
+                item = QTableWidgetItem(text)
+                if c > 0 and isinstance(value, (int, float)):
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                if c == 0:
+                    item.setToolTip(str(value))
+                if slow:
+                    item.setForeground(QColor("#FF5555"))
+                table.setItem(r, c, item)
+        table.setUpdatesEnabled(True)
@@ -1,12 +1,17 @@
-from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QTableWidget, QTableWidgetItem, 
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QTableView, 
                              QLabel, QHeaderView, QAbstractItemView, QMenu, QMessageBox)
-from PyQt6.QtGui import QColor, QAction
+from PyQt6.QtGui import QAction
 from PyQt6.QtCore import Qt
+from ui.ledger_model import LedgerTableModel
+from ui.search_bar import SearchBar
+from ui.watchdog import phase
 
 class GeneralJournalPage(QWidget):
-    def __init__(self, db):
+    def __init__(self, db, events=None):
         super().__init__()
         self.db = db
+        self.events = events
+        self.dirty = True
         layout = QVBoxLayout()
         self.setLayout(layout)
         
@@ -15,20 +20,30 @@ class GeneralJournalPage(QWidget):
         lbl.setStyleSheet("font-size: 20px; font-weight: bold; color: #00ADB5; margin: 10px;")
         layout.addWidget(lbl)
         
-        # Table
-        self.table = QTableWidget()
-        # Added hidden "ID" column at index 5
-        self.table.setColumnCount(6)
-        self.table.setHorizontalHeaderLabels(["Date", "Transaction / Description", "Account", "Debit", "Credit", "ID"])
+        # Search (text, amounts, dates and account type; runs in SQL)
+        self.search_bar = SearchBar()
+        layout.addWidget(self.search_bar)
+        
+        # Table (lazy model: rows are fetched page by page as you scroll)
+        self.model = LedgerTableModel(
+            self.db, ['date', 'description', 'account', 'debit', 'credit'],
+            headers=["Date", "Transaction / Description", "Account", "Debit", "Credit"],
+            direction="desc", color_amounts=True)
+        self.table = QTableView()
+        self.table.setModel(self.model)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         
         # Styling: Widen the Description column
-        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents)
-        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
-        self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeMode.ResizeToContents)
+        # (Fixed widths instead of ResizeToContents, which would measure every loaded row)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Interactive)
+        self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeMode.Interactive)
+        self.table.setColumnWidth(0, 110)
+        self.table.setColumnWidth(2, 200)
+        self.table.verticalHeader().setDefaultSectionSize(28)
         
-        # Hide ID Column
-        self.table.setColumnHidden(5, True)
+        # Newest first; clicking the Date header flips the order (in SQL)
+        self.table.horizontalHeader().setSortIndicator(0, Qt.SortOrder.DescendingOrder)
+        self.table.setSortingEnabled(True)
         
         # Read-Only & Selection Mode
         self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
@@ -42,43 +57,30 @@ class GeneralJournalPage(QWidget):
         self.table.doubleClicked.connect(self.on_double_click)
         
         layout.addWidget(self.table)
+        self.search_bar.search.connect(self.model.set_filter)
+        if events is not None:
+            events.changed.connect(self.on_change)
 
+    @phase("refresh")
     def refresh(self):
-        # Fetch all transactions chronologically
-        rows = self.db.get_ledger("All") 
-        self.table.setRowCount(len(rows))
-        
-        for i, row in enumerate(rows):
-            # row: (tid, date, name, type, desc, dr, cr, run_bal)
-            tid, date, name, _, desc, dr, cr, _ = row
-            
-            self.table.setItem(i, 0, QTableWidgetItem(date))
-            self.table.setItem(i, 1, QTableWidgetItem(desc))
-            self.table.setItem(i, 2, QTableWidgetItem(name))
-            
-            # Debit Formatting
-            dr_item = QTableWidgetItem(f"{dr:,.2f}" if dr > 0 else "")
-            if dr > 0: dr_item.setForeground(QColor("#00ADB5")) # Teal
-            self.table.setItem(i, 3, dr_item)
-            
-            # Credit Formatting
-            cr_item = QTableWidgetItem(f"{cr:,.2f}" if cr > 0 else "")
-            if cr > 0: cr_item.setForeground(QColor("#FF5555")) # Red
-            self.table.setItem(i, 4, cr_item)
-            
-            # Hidden ID
-            self.table.setItem(i, 5, QTableWidgetItem(str(tid)))
+        self.dirty = False
+        self.model.reload()
+
+    def on_change(self, event):
+        if not self.isVisible():
+            self.dirty = True # Reloaded by the next switch to this page
+            return
+        self.model.apply_change(event)
 
     def on_double_click(self, index):
-        row = index.row()
-        trans_id = self.table.item(row, 5).text()
+        trans_id = self.model.transaction_id(index.row())
         self.trigger_edit(trans_id)
 
     def open_context_menu(self, position):
         row = self.table.rowAt(position.y())
         if row == -1: return
         
-        trans_id = self.table.item(row, 5).text()
+        trans_id = self.model.transaction_id(row)
         
         menu = QMenu()
         edit_action = QAction("Edit Transaction", self)
@@ -107,4 +109,5 @@ class GeneralJournalPage(QWidget):
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if confirm == QMessageBox.StandardButton.Yes:
             self.db.delete_transaction(trans_id)
-            self.refresh()
\ No newline at end of file
+            if self.events is None: # Otherwise on_change patches the table
+                self.refresh()
\ No newline at end of file
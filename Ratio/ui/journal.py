@@ -1,12 +1,17 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QGridLayout, QLineEdit, 
-                             QComboBox, QPushButton, QLabel, QFrame, QMessageBox)
+                             QComboBox, QPushButton, QLabel, QFrame, QMessageBox, QFileDialog,
+                             QInputDialog, QProgressDialog)
 from PyQt6.QtCore import Qt, QDate
 from PyQt6.QtGui import QColor
+from utils.money import fmt_money, to_cents
+from utils.bank_import import import_statement
 
 class JournalPage(QWidget):
-    def __init__(self, db):
+    def __init__(self, db, writer=None):
         super().__init__()
         self.db = db
+        self.writer = writer # Optional WriteWorker: statement imports then run off the UI thread
+        self.progress = None # The import's QProgressDialog while one runs
         self.current_trans_id = None # Track if we are editing
         
         # Main Layout
@@ -98,6 +103,16 @@ class JournalPage(QWidget):
         btn_layout.addWidget(self.btn_delete)
         btn_layout.addStretch()
         
+        self.btn_import = QPushButton("IMPORT STATEMENT")
+        self.btn_import.setFixedSize(200, 50)
+        self.btn_import.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.btn_import.clicked.connect(self.import_statement)
+        self.btn_import.setStyleSheet("""
+            QPushButton { background-color: #333; color: white; font-weight: bold; border-radius: 5px; }
+            QPushButton:hover { background-color: #444; }
+        """)
+        btn_layout.addWidget(self.btn_import)
+        
         self.post_btn = QPushButton("POST TRANSACTION")
         self.post_btn.setFixedSize(200, 50)
         self.post_btn.setCursor(Qt.CursorShape.PointingHandCursor)
@@ -137,22 +152,7 @@ class JournalPage(QWidget):
         """Called by other pages to Edit a transaction"""
         self.current_trans_id = trans_id
         
-        # Fetch Data
-        # We need a new DB function to get Header + Splits nicely
-        # For now, we will hack it using existing fetchers:
-        details = self.db.get_ledger("All") # Inefficient but works with existing code
-        # Filter manually (Ideally create db.get_transaction(id))
-        
-        # Let's use the splits fetcher we made for the dialog
-        splits = self.db.get_transaction_details(trans_id)
-        
-        # We also need the date/desc which is in the transactions table
-        # Add this helper to database.py if missing:
-        # cursor.execute("SELECT date, description FROM transactions WHERE id=?", (id,))
-        
-        # Assuming you add that, or we assume the caller passed the data.
-        # To keep it simple for you, let's assume we implement `db.get_full_transaction(id)`
-        
+        # Fetch Data (Header + Splits for this transaction only)
         header, lines = self.db.get_full_transaction(trans_id) 
         
         # Populate UI
@@ -171,7 +171,7 @@ class JournalPage(QWidget):
         if dr_line:
             self.dr_group['name'].setText(dr_line['name'])
             self.dr_group['type'].setCurrentText(dr_line['type'])
-            self.amount_input.setText(str(dr_line['debit']))
+            self.amount_input.setText(fmt_money(dr_line['debit'], grouping=False))
             
         if cr_line:
             self.cr_group['name'].setText(cr_line['name'])
@@ -194,7 +194,7 @@ class JournalPage(QWidget):
 
     def post_transaction(self):
         try:
-            amt = float(self.amount_input.text())
+            amt = to_cents(self.amount_input.text())
             if amt <= 0: raise ValueError
         except ValueError:
             QMessageBox.warning(self, "Error", "Invalid Amount")
@@ -206,12 +206,12 @@ class JournalPage(QWidget):
             {
                 "account_name": self.dr_group['name'].text().strip(),
                 "account_type": self.dr_group['type'].currentText(),
-                "debit": amt, "credit": 0.0
+                "debit": amt, "credit": 0
             },
             {
                 "account_name": self.cr_group['name'].text().strip(),
                 "account_type": self.cr_group['type'].currentText(),
-                "debit": 0.0, "credit": amt
+                "debit": 0, "credit": amt
             }
         ]
 
@@ -238,4 +238,81 @@ class JournalPage(QWidget):
         if confirm == QMessageBox.StandardButton.Yes:
             self.db.delete_transaction(self.current_trans_id)
             QMessageBox.information(self, "Deleted", "Transaction removed.")
-            self.reset_form()
\ No newline at end of file
+            self.reset_form()
+
+    def import_statement(self):
+        if self.progress is not None:
+            return # One import at a time
+        path, _ = QFileDialog.getOpenFileName(self, "Import Bank Statement", "",
+                                              "Bank Statements (*.csv *.ofx *.qfx *.qif)")
+        if not path:
+            return
+        balances = self.db.get_balances_snapshot()
+        banks = sorted(name for name, info in balances.items() if info['type'] in ('Asset', 'Liability'))
+        account, ok = QInputDialog.getItem(self, "Import Bank Statement", "Bank account:", banks or ["Cash"], 0, True)
+        if not ok or not account.strip():
+            return
+
+        def stage(db, progress):
+            # Parse, stage, flag duplicates and categorize; posting waits for the user's go-ahead
+            stats = import_statement(db, path, account, progress=progress)
+            return stats, db.get_import_batch(stats['batch'])
+
+        self.start_import_step("Reading the statement", stage, self.on_import_staged)
+
+    def start_import_step(self, text, fn, on_result):
+        """Runs fn(db, progress) on the write worker behind a progress dialog (inline without a worker)."""
+        self.btn_import.setEnabled(False)
+        self.progress = QProgressDialog(text, None, 0, 0, self) # No range: a busy indicator
+        self.progress.setWindowTitle("Import Bank Statement")
+        self.progress.setCancelButton(None) # A write in progress is never cut short
+        self.progress.setMinimumDuration(0)
+        self.progress.show()
+        if self.writer is not None:
+            self.writer.submit(fn, on_result, self.on_import_error, self.progress.setLabelText)
+            return
+        try:
+            result = fn(self.db, self.progress.setLabelText)
+        except Exception as e:
+            self.on_import_error(e)
+            return
+        on_result(result)
+
+    def finish_import_step(self):
+        if self.progress is not None:
+            self.progress.close()
+            self.progress.deleteLater()
+            self.progress = None
+        self.btn_import.setEnabled(True)
+
+    def on_import_staged(self, result):
+        self.finish_import_step()
+        stats, batch = result
+        pending = batch['counts'].get('pending', 0)
+        summary = (f"{stats['lines']:,} lines read, {stats['duplicates']:,} already in the book, "
+                   f"{stats['categorized']:,} categorized.")
+        if stats['skipped_rules']:
+            summary += f"\n{len(stats['skipped_rules'])} categorization rule(s) skipped: " + \
+                       "; ".join(f"rule {rule_id}: {reason}" for rule_id, reason in stats['skipped_rules'])
+        if not pending:
+            QMessageBox.information(self, "Import Bank Statement", summary + "\nNothing new to post.")
+            return
+        confirm = QMessageBox.question(self, "Import Bank Statement", summary + f"\nPost the other {pending:,} now?",
+                                       QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        if confirm != QMessageBox.StandardButton.Yes:
+            return
+
+        def post(db, progress):
+            progress(f"Posting {pending:,} transactions")
+            db.set_staged_status(batch['id'], 'approved', only=('pending',))
+            return db.post_staged_lines(batch['id'])
+
+        self.start_import_step("Posting", post, self.on_import_posted)
+
+    def on_import_posted(self, posted):
+        self.finish_import_step()
+        QMessageBox.information(self, "Success", f"{posted['transactions']:,} transactions posted!")
+
+    def on_import_error(self, error):
+        self.finish_import_step()
+        QMessageBox.critical(self, "Import Error", str(error))
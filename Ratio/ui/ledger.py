@@ -1,13 +1,24 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, 
-                             QPushButton, QLabel, QHeaderView, QMenu, QMessageBox, 
+                             QTableView, QPushButton, QLabel, QHeaderView, QMenu, QMessageBox, 
                              QDialog, QAbstractItemView, QStackedWidget)
 from PyQt6.QtGui import QAction, QColor, QFont
 from PyQt6.QtCore import Qt
+from ui.ledger_model import LedgerTableModel
+from ui.search_bar import SearchBar
+from ui.change_events import patch_balances
+from ui.watchdog import phase
+from utils.money import fmt_money
 
 class LedgerPage(QWidget):
-    def __init__(self, db):
+    def __init__(self, db, executor=None, events=None):
         super().__init__()
         self.db = db
+        self.executor = executor
+        self.events = events
+        self.balances = None # Copy of the last summary data, patched in place by change events
+        self.dirty = True
+        if events is not None:
+            events.changed.connect(self.on_change)
         
         self.stack = QStackedWidget()
         layout = QVBoxLayout()
@@ -72,12 +83,19 @@ class LedgerPage(QWidget):
         top_bar.addStretch()
         layout.addLayout(top_bar)
         
-        # Details Table
-        self.details_table = QTableWidget()
-        self.details_table.setColumnCount(7) 
-        self.details_table.setHorizontalHeaderLabels(["Date", "Account", "Description", "Debit", "Credit", "Balance", "ID"])
+        # Search within the account (the balance column is hidden while filtering)
+        self.search_bar = SearchBar()
+        layout.addWidget(self.search_bar)
+        
+        # Details Table (lazy model, oldest first so the balance reads top to bottom)
+        self.details_model = LedgerTableModel(
+            self.db, ['date', 'account', 'description', 'debit', 'credit', 'balance'], direction="asc")
+        self.details_table = QTableView()
+        self.details_table.setModel(self.details_model)
         self.details_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        self.details_table.setColumnHidden(6, True) # Hide ID
+        self.details_table.verticalHeader().setDefaultSectionSize(28)
+        self.details_table.horizontalHeader().setSortIndicator(0, Qt.SortOrder.AscendingOrder)
+        self.details_table.setSortingEnabled(True)
         self.details_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
         self.details_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         
@@ -85,17 +103,42 @@ class LedgerPage(QWidget):
         self.details_table.customContextMenuRequested.connect(self.open_context_menu)
         
         layout.addWidget(self.details_table)
+        self.search_bar.search.connect(self.details_model.set_filter)
 
+    @phase("refresh")
     def refresh(self):
-        if self.stack.currentIndex() == 0:
+        self.dirty = False
+        self.load_summary_data()
+        if self.details_model.account_name:
+            self.details_model.reload()
+
+    def on_change(self, event):
+        if not self.isVisible():
+            self.dirty = True # Reloaded by the next switch to this page
+            return
+        if self.details_model.account_name:
+            self.details_model.apply_change(event)
+        pending = self.executor and self.executor.is_pending("ledger_summary")
+        if self.balances is None or pending or not patch_balances(self.balances, event):
             self.load_summary_data()
         else:
-            acc_name = self.lbl_current_account.text().replace("Ledger: ", "")
-            self.load_detail_data(acc_name)
+            self.populate_summary(self.balances)
 
     def load_summary_data(self):
+        if self.executor:
+            self.executor.submit("ledger_summary", self.fetch_summary, self.populate_summary)
+        else:
+            self.populate_summary(self.fetch_summary(self.db))
+
+    @phase("fetch")
+    def fetch_summary(self, db):
+        return db.get_account_balances()
+
+    @phase("model")
+    def populate_summary(self, balances):
+        # get_account_balances() is the shared report cache's dict: keep our own copy to patch
+        self.balances = balances = {name: dict(info) for name, info in balances.items()}
         self.summary_table.setRowCount(0)
-        balances = self.db.get_account_balances()
         sorted_accs = sorted(balances.items()) 
         self.summary_table.setRowCount(len(sorted_accs))
         
@@ -104,10 +147,7 @@ class LedgerPage(QWidget):
             self.summary_table.setItem(i, 1, QTableWidgetItem(info['type']))
             
             bal = info['net_balance']
-            bal_str = f"{bal:,.2f}"
-            if bal < 0: bal_str = f"({abs(bal):,.2f})"
-            
-            item_bal = QTableWidgetItem(bal_str)
+            item_bal = QTableWidgetItem(fmt_money(bal, parens=True))
             item_bal.setFont(QFont("Arial", 10, QFont.Weight.Bold))
             if bal < 0: item_bal.setForeground(QColor("#FF5555"))
             self.summary_table.setItem(i, 2, item_bal)
@@ -120,36 +160,23 @@ class LedgerPage(QWidget):
     def on_account_selected(self, index):
         row = index.row()
         acc_name = self.summary_table.item(row, 0).text()
+        # A new account starts unfiltered
+        self.search_bar.blockSignals(True)
+        self.search_bar.clear()
+        self.search_bar.blockSignals(False)
+        self.details_model.search = None
         self.load_detail_data(acc_name)
         self.stack.setCurrentIndex(1)
 
     def load_detail_data(self, account_name):
         self.lbl_current_account.setText(f"Ledger: {account_name}")
-        rows = self.db.get_ledger(account_name) 
-        self.details_table.setRowCount(len(rows))
-        
-        for i, row in enumerate(rows):
-            tid, date, name, _, desc, dr, cr, run_bal = row
-            
-            self.details_table.setItem(i, 0, QTableWidgetItem(str(date)))
-            self.details_table.setItem(i, 1, QTableWidgetItem(str(name)))
-            self.details_table.setItem(i, 2, QTableWidgetItem(str(desc)))
-            self.details_table.setItem(i, 3, QTableWidgetItem(f"{dr:,.2f}" if dr > 0 else ""))
-            self.details_table.setItem(i, 4, QTableWidgetItem(f"{cr:,.2f}" if cr > 0 else ""))
-            
-            bal_str = f"{run_bal:,.2f}"
-            if run_bal < 0: bal_str = f"({abs(run_bal):,.2f})"
-            
-            bal_item = QTableWidgetItem(bal_str)
-            bal_item.setBackground(QColor("#252525"))
-            self.details_table.setItem(i, 5, bal_item)
-            self.details_table.setItem(i, 6, QTableWidgetItem(str(tid))) 
+        self.details_model.set_account(account_name)
 
     def open_context_menu(self, position):
         row = self.details_table.rowAt(position.y())
         if row == -1: return
         
-        trans_id = self.details_table.item(row, 6).text()
+        trans_id = self.details_model.transaction_id(row)
         
         menu = QMenu()
         edit_action = QAction("Edit Transaction", self)
@@ -176,5 +203,6 @@ class LedgerPage(QWidget):
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if confirm == QMessageBox.StandardButton.Yes:
             self.db.delete_transaction(trans_id)
-            acc_name = self.lbl_current_account.text().replace("Ledger: ", "")
-            self.load_detail_data(acc_name)
\ No newline at end of file
+            if self.events is None: # Otherwise on_change patches the tables
+                acc_name = self.lbl_current_account.text().replace("Ledger: ", "")
+                self.load_detail_data(acc_name)
\ No newline at end of file
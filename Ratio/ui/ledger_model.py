@@ -0,0 +1,224 @@
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt6.QtGui import QColor
+from utils.money import fmt_money
+from utils.search import parse_search
+from ui.watchdog import phase
+
+# Field name -> (header, index into a get_ledger_page row)
+FIELDS = {
+    'date': ("Date", 1),
+    'account': ("Account", 2),
+    'description': ("Description", 4),
+    'debit': ("Debit", 5),
+    'credit': ("Credit", 6),
+    'balance': ("Balance", 7),
+}
+
+class LedgerTableModel(QAbstractTableModel):
+    """
+    Lazy, read-only view of the journal for QTableView.
+    Rows are pulled from db.get_ledger_page() a page at a time as the view scrolls
+    (canFetchMore / fetchMore). Only the raw tuples are kept; text and colours are
+    produced in data() for the cells Qt actually paints. Sorting (by date) and
+    filtering run in SQL.
+    While a filter is active the Balance column is left blank: a running balance over
+    the matching rows alone would be wrong, and over all rows it is the slow part.
+    """
+
+    def __init__(self, db, fields, headers=None, account_name=None, direction="desc",
+                 page_size=200, color_amounts=False):
+        super().__init__()
+        self.db = db
+        self.fields = fields
+        self.headers = headers or [FIELDS[f][0] for f in fields]
+        self.account_name = account_name
+        self.direction = direction
+        self.page_size = page_size
+        self.color_amounts = color_amounts
+        self.search = None
+
+        self.rows = []
+        self.next_key = None
+        self.exhausted = True
+
+    # --- QUERY STATE ---
+
+    def set_account(self, account_name):
+        self.account_name = account_name
+        self.reload()
+
+    def set_filter(self, text):
+        criteria = parse_search(text) # Search bar syntax, see utils.search
+        # Planned once, so every page of the search runs the same query plan
+        self.search = self.db.plan_search(criteria) if criteria else None
+        self.reload()
+
+    @phase("model")
+    def reload(self):
+        self.beginResetModel()
+        self.next_key = None
+        self.rows = self._fetch_page()
+        self.endResetModel()
+
+    @phase("fetch")
+    def _fetch_page(self):
+        rows, self.next_key = self.db.get_ledger_page(
+            self.account_name, self.next_key, self.page_size, self.direction, self.search,
+            with_balance='balance' in self.fields and not self.search)
+        self.exhausted = self.next_key is None
+        return rows
+
+    # --- CHANGE EVENTS ---
+
+    @phase("model")
+    def apply_change(self, event):
+        """
+        Patches the loaded rows for a DatabaseHandler change event (see db.subscribe):
+        splits of the changed transactions are removed and re-inserted in key order, and
+        running balances after them shift by the split's amount. Anything that cannot be
+        patched in place reloads.
+        """
+        if event['kind'] not in ('added', 'updated', 'deleted') or self.search:
+            self.reload() # Rows matching a filter cannot be told apart without the query
+            return
+        ids = set(event['ids'])
+        unloaded = [(acc, dr, cr, self.db.signed_amount(acc_type, dr, cr))
+                    for _, acc, acc_type, dr, cr in event['removed'] or []
+                    if not self.account_name or self.account_name in ("All", acc)]
+        for i in range(len(self.rows) - 1, -1, -1):
+            if self.rows[i][0] in ids:
+                row = self.rows[i]
+                self.beginRemoveRows(QModelIndex(), i, i)
+                del self.rows[i]
+                self.endRemoveRows()
+                signed = self._signed(row)
+                self._shift_balances(row[2], -signed, self._key(row))
+                if (row[2], row[5], row[6], signed) in unloaded:
+                    unloaded.remove((row[2], row[5], row[6], signed))
+        
+        # Removed splits past the loaded rows are older than all of them when newest-first
+        if self.direction == "desc" and not self.exhausted:
+            for acc, _, _, signed in unloaded:
+                self._shift_balances(acc, -signed)
+        
+        if event['kind'] != 'deleted':
+            for row in self.db.get_entry_rows(event['ids'], self.account_name):
+                if not self._insert_row(row):
+                    self.reload()
+                    return
+
+    @staticmethod
+    def _key(row):
+        return (row[1], row[8], row[9])
+
+    def _signed(self, row):
+        return self.db.signed_amount(row[3], row[5], row[6])
+
+    def _tracks_balance(self):
+        return 'balance' in self.fields and not self.search
+
+    def _shift_balances(self, account, delta, after=None):
+        """Adds delta to the balance of the account's rows later than key after (all if None)."""
+        # Balances are per account and in time order, whatever the display order
+        if not self._tracks_balance() or not delta:
+            return
+        col = self.fields.index('balance')
+        for i, other in enumerate(self.rows):
+            if other[2] == account and (after is None or self._key(other) > after):
+                self.rows[i] = other[:7] + (other[7] + delta,) + other[8:]
+                self.dataChanged.emit(self.index(i, col), self.index(i, col))
+
+    def _insert_row(self, row):
+        """Inserts a fetched row if it falls inside the loaded window. False = cannot patch."""
+        key = self._key(row)
+        asc = self.direction == "asc"
+        pos = next((i for i, r in enumerate(self.rows)
+                    if (self._key(r) > key if asc else self._key(r) < key)), len(self.rows))
+        visible = pos < len(self.rows) or self.exhausted # Else fetchMore will bring it in
+        
+        if self._tracks_balance():
+            same = [r for r in self.rows if r[2] == row[2]]
+            if any(r[3] != row[3] for r in same):
+                return False # The account changed type, so every balance flips sign
+            signed = self._signed(row)
+            if visible:
+                before = [r for r in same if self._key(r) < key]
+                after = [r for r in same if self._key(r) > key]
+                if before:
+                    balance = max(before, key=self._key)[7] + signed
+                elif after:
+                    nxt = min(after, key=self._key)
+                    balance = nxt[7] - self._signed(nxt) + signed
+                else:
+                    return False # Opening balance unknown without querying
+                row = row[:7] + (balance,) + row[8:]
+            self._shift_balances(row[2], signed, key) # Later rows may be loaded even when this one is not
+        
+        if visible:
+            self.beginInsertRows(QModelIndex(), pos, pos)
+            self.rows.insert(pos, row)
+            self.endInsertRows()
+        return True
+
+    def transaction_id(self, row):
+        if 0 <= row < len(self.rows):
+            return self.rows[row][0]
+        return None
+
+    # --- LAZY LOADING ---
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.exhausted:
+            return
+        rows = self._fetch_page()
+        if not rows:
+            return
+        self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(rows) - 1)
+        self.rows.extend(rows)
+        self.endInsertRows()
+
+    # --- QAbstractTableModel ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.fields)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.headers[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        field = self.fields[index.column()]
+        value = self.rows[index.row()][FIELDS[field][1]]
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if field in ('debit', 'credit'):
+                return fmt_money(value) if value > 0 else ""
+            if field == 'balance':
+                return fmt_money(value, parens=True) if value is not None else ""
+            return str(value)
+
+        if role == Qt.ItemDataRole.ForegroundRole and self.color_amounts:
+            if field == 'debit' and value > 0: return QColor("#00ADB5") # Teal
+            if field == 'credit' and value > 0: return QColor("#FF5555") # Red
+
+        if role == Qt.ItemDataRole.BackgroundRole and field == 'balance':
+            return QColor("#252525")
+        return None
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        # The page key is date based, so date is the only sortable column
+        if self.fields[column] != 'date':
+            return
+        direction = "asc" if order == Qt.SortOrder.AscendingOrder else "desc"
+        if direction != self.direction:
+            self.direction = direction
+            self.reload()
@@ -0,0 +1,122 @@
+import sqlite3
+import threading
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+class _Signals(QObject):
+    # key, ticket, result, error
+    done = pyqtSignal(str, int, object, object)
+
+class _QueryTask(QRunnable):
+    def __init__(self, executor, key, ticket, fn):
+        super().__init__()
+        self.setAutoDelete(False) # The executor keeps the reference (needed for tryTake)
+        self.executor = executor
+        self.key = key
+        self.ticket = ticket
+        self.fn = fn
+
+    def run(self):
+        ex = self.executor
+        if not ex._start(self):
+            return # Superseded while waiting in the queue
+        result, error = None, None
+        try:
+            result = self.fn(ex.read_db)
+        except Exception as e:
+            error = e
+        finally:
+            ex._finish(self)
+        ex._signals.done.emit(self.key, self.ticket, result, error)
+
+class QueryExecutor(QObject):
+    """
+    Runs page queries off the Qt main thread.
+    submit(key, fn, on_result): fn(read_db) runs on a worker thread with its own read-only
+    connection; on_result(result) is then called back on the main thread. A newer submit
+    with the same key supersedes the older one: a queued request is dropped, a running
+    query is interrupted, and a stale result is never delivered.
+    """
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.read_db = db.open_reader()
+        self.owns_reader = self.read_db is not db
+
+        # One worker thread <-> one read connection
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+
+        self._lock = threading.Lock()
+        self._tickets = {}   # key -> newest ticket
+        self._tasks = {}     # (key, ticket) -> (task, on_result, on_error)
+        self._running = None
+        self._closed = False
+
+        self._signals = _Signals()
+        self._signals.done.connect(self._on_done)
+
+    def submit(self, key, fn, on_result, on_error=None):
+        with self._lock:
+            if self._closed:
+                return None
+            ticket = self._tickets.get(key, 0) + 1
+            self._tickets[key] = ticket
+
+            # Cancel older requests for the same key
+            for (k, t), (task, _, _) in list(self._tasks.items()):
+                if k == key and self.pool.tryTake(task):
+                    del self._tasks[(k, t)]
+            if self._running is not None and self._running.key == key:
+                self.read_db.conn.interrupt()
+
+            task = _QueryTask(self, key, ticket, fn)
+            self._tasks[(key, ticket)] = (task, on_result, on_error)
+        self.pool.start(task)
+        return ticket
+
+    def is_pending(self, key):
+        with self._lock:
+            return any(k == key for k, _ in self._tasks)
+
+    def _start(self, task):
+        with self._lock:
+            if self._tickets.get(task.key) != task.ticket:
+                self._tasks.pop((task.key, task.ticket), None)
+                return False
+            self._running = task
+            return True
+
+    def _finish(self, task):
+        with self._lock:
+            self._running = None
+
+    def _on_done(self, key, ticket, result, error):
+        # Main thread
+        with self._lock:
+            entry = self._tasks.pop((key, ticket), None)
+            stale = self._tickets.get(key) != ticket
+        if entry is None or stale:
+            return
+        task, on_result, on_error = entry
+        if error is None:
+            on_result(result)
+        elif isinstance(error, sqlite3.OperationalError) and "interrupt" in str(error):
+            # Caught by an interrupt aimed at another request: just run it again
+            self.submit(key, task.fn, on_result, on_error)
+        elif on_error is not None:
+            on_error(error)
+        else:
+            print(f"Query Error ({key}): {error}")
+
+    def shutdown(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._tickets.clear()
+        self.pool.clear()
+        if self._running is not None:
+            self.read_db.conn.interrupt()
+        self.pool.waitForDone()
+        if self.owns_reader:
+            self.read_db.close()
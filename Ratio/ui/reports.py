@@ -1,13 +1,13 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QPushButton, QLabel, QMessageBox, 
                              QFrame, QDateEdit, QGridLayout, QSizePolicy)
 from PyQt6.QtCore import Qt, QDate
-from utils.pdf_export import PDFExporter
+from ui.watchdog import span
 
 class ReportsPage(QWidget):
     def __init__(self, db):
         super().__init__()
         self.db = db
-        self.exporter = PDFExporter(db)
+        self.exporter = None # Created on first export: reportlab is slow to import
         
         layout = QVBoxLayout()
         self.setLayout(layout)
@@ -84,9 +84,28 @@ class ReportsPage(QWidget):
             QPushButton:pressed { background-color: #008C94; }
         """)
         
+        # Period close: month-end snapshots that as-of reports start from
+        self.close_btn = QPushButton("CLOSE MONTHS THROUGH PERIOD END")
+        self.close_btn.setFixedHeight(40)
+        self.close_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.close_btn.clicked.connect(self.close_books)
+        self.close_btn.setStyleSheet("""
+            QPushButton { 
+                background-color: transparent; 
+                color: #00ADB5; 
+                border: 1px solid #00ADB5; 
+                border-radius: 5px; 
+                font-weight: bold; 
+                padding: 8px;
+            }
+            QPushButton:hover { background-color: #00ADB5; color: white; }
+        """)
+        
         card_layout.addWidget(info)
         card_layout.addWidget(sub_info)
         card_layout.addWidget(self.export_btn)
+        card_layout.addSpacing(10)
+        card_layout.addWidget(self.close_btn)
         
         layout.addWidget(card)
         layout.addStretch()
@@ -96,7 +115,23 @@ class ReportsPage(QWidget):
         e_date = self.end_date.date().toString("yyyy-MM-dd")
         
         try:
-            filename = self.exporter.generate_full_report(s_date, e_date)
+            if self.exporter is None:
+                from utils.pdf_export import PDFExporter
+                self.exporter = PDFExporter(self.db)
+            with span("ReportsPage.export_all", "export"):
+                filename = self.exporter.generate_full_report(s_date, e_date)
             QMessageBox.information(self, "Success", f"Report generated successfully:\n\n{filename}")
         except Exception as e:
-            QMessageBox.critical(self, "Export Error", f"Failed to generate PDF:\n{str(e)}")
\ No newline at end of file
+            QMessageBox.critical(self, "Export Error", f"Failed to generate PDF:\n{str(e)}")
+
+    def close_books(self):
+        e_date = self.end_date.date().toString("yyyy-MM-dd")
+        try:
+            closed = self.db.close_periods(e_date, "monthly")
+        except Exception as e:
+            QMessageBox.critical(self, "Close Error", f"Failed to close periods:\n{str(e)}")
+            return
+        if closed:
+            QMessageBox.information(self, "Success", f"Closed {len(closed)} month(s), through {closed[-1]}.")
+        else:
+            QMessageBox.information(self, "Up To Date", f"Every month through {e_date} is already closed.")
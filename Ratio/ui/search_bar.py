@@ -0,0 +1,29 @@
+from PyQt6.QtWidgets import QLineEdit
+from PyQt6.QtCore import QTimer, pyqtSignal
+
+class SearchBar(QLineEdit):
+    """
+    Search box for the ledger tables. Emits search(text) once typing pauses, so a
+    query runs per pause rather than per keystroke. The syntax is utils.search.parse_search's.
+    """
+    search = pyqtSignal(str)
+
+    def __init__(self, delay_ms=250, parent=None):
+        super().__init__(parent)
+        self.setPlaceholderText("Search...   e.g.  coffee  >20  10..50  type:expense  from:2024-01-01  to:2024-03-31")
+        self.setClearButtonEnabled(True)
+        self.setStyleSheet("""
+            QLineEdit { background-color: #252525; color: white; border: 1px solid #444; border-radius: 5px; padding: 8px; }
+            QLineEdit:focus { border: 1px solid #00ADB5; }
+        """)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay_ms)
+        self.timer.timeout.connect(lambda: self.search.emit(self.text()))
+        self.textChanged.connect(lambda _: self.timer.start())
+        self.returnPressed.connect(self.fire_now)
+
+    def fire_now(self):
+        self.timer.stop()
+        self.search.emit(self.text())
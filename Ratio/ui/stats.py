@@ -1,16 +1,15 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QFrame, 
                              QSizePolicy, QScrollArea, QTableWidget, QTableWidgetItem, 
                              QHeaderView, QAbstractItemView, QComboBox)
-from PyQt6.QtCore import Qt, pyqtSignal, QDate
+from PyQt6.QtCore import Qt, pyqtSignal, QDate, QTimer
 from PyQt6.QtGui import QColor, QCursor
 
-import matplotlib
-matplotlib.use('QtAgg') 
-from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-import matplotlib.dates as mdates
-import numpy as np # Needed for Radar math
+# matplotlib is imported on first use (see ensure_charts): it is the slowest import in the app
 import datetime
+import math
+from utils.money import fmt_money, from_cents
+from ui.change_events import patch_balances
+from ui.watchdog import phase
 
 # --- THEME COLORS ---
 COLOR_BG = "#121212"
@@ -47,20 +46,23 @@ class KPICard(QFrame):
         lbl_title = QLabel(title.upper())
         lbl_title.setStyleSheet(f"color: {COLOR_SUBTEXT}; font-size: 11px; font-weight: bold; letter-spacing: 1px; border: none; background: transparent;")
         
+        self.lbl_val = QLabel()
+        self.lbl_sub = QLabel()
+        self.lbl_sub.setStyleSheet(f"color: {COLOR_SUBTEXT}; font-size: 12px; border: none; background: transparent;")
+        self.set_value(value, subtext, is_positive, is_neutral)
+        
+        layout.addWidget(lbl_title)
+        layout.addWidget(self.lbl_val)
+        layout.addWidget(self.lbl_sub)
+
+    def set_value(self, value, subtext, is_positive=True, is_neutral=False):
         if is_neutral:
             color = COLOR_TEXT
         else:
             color = COLOR_SUCCESS if is_positive else COLOR_DANGER
-            
-        lbl_val = QLabel(value)
-        lbl_val.setStyleSheet(f"color: {color}; font-size: 28px; font-weight: bold; border: none; background: transparent;")
-        
-        lbl_sub = QLabel(subtext)
-        lbl_sub.setStyleSheet(f"color: {COLOR_SUBTEXT}; font-size: 12px; border: none; background: transparent;")
-        
-        layout.addWidget(lbl_title)
-        layout.addWidget(lbl_val)
-        layout.addWidget(lbl_sub)
+        self.lbl_val.setText(value)
+        self.lbl_val.setStyleSheet(f"color: {color}; font-size: 28px; font-weight: bold; border: none; background: transparent;")
+        self.lbl_sub.setText(subtext)
 
     def mousePressEvent(self, event):
         self.clicked.emit()
@@ -95,13 +97,13 @@ class RecentTransactionsCard(QFrame):
     def update_data(self, transactions):
         self.table.setRowCount(len(transactions))
         for i, row in enumerate(transactions):
-            _, date, _, _, desc, dr, cr, _ = row
+            date, desc, dr, cr = row[1], row[4], row[5], row[6]
             
             if dr > 0:
-                amt = f"-{dr:,.0f}" 
+                amt = f"-{fmt_money(dr, decimals=0)}" 
                 color = COLOR_TEXT
             else:
-                amt = f"+{cr:,.0f}"
+                amt = f"+{fmt_money(cr, decimals=0)}"
                 color = COLOR_SUCCESS
             
             self.table.setItem(i, 0, QTableWidgetItem(date[5:])) 
@@ -114,10 +116,16 @@ class RecentTransactionsCard(QFrame):
 class StatsPage(QWidget):
     go_to_income_stmt = pyqtSignal()
     go_to_ledger = pyqtSignal()
+    refreshed = pyqtSignal() # After each refresh lands (or fails)
     
-    def __init__(self, db):
+    def __init__(self, db, executor=None, events=None):
         super().__init__()
         self.db = db
+        self.executor = executor # Optional QueryExecutor: queries then run off the UI thread
+        self.data = None # Last fetch_data result, patched in place by change events
+        self.dirty = True
+        if events is not None:
+            events.changed.connect(self.on_change)
         
         main_layout = QVBoxLayout(self)
         main_layout.setContentsMargins(0, 0, 0, 0)
@@ -136,7 +144,16 @@ class StatsPage(QWidget):
         title = QLabel("Financial Overview")
         title.setStyleSheet(f"font-size: 26px; font-weight: bold; color: {COLOR_TEXT};")
         
-        # Filters
+        self.lbl_loading = QLabel("Loading…")
+        self.lbl_loading.setStyleSheet(f"color: {COLOR_SUBTEXT}; font-size: 13px; margin-left: 10px;")
+        self.lbl_loading.hide()
+        
+        # Filters: changes in quick succession coalesce into one refresh
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(200)
+        self.refresh_timer.timeout.connect(self.refresh)
+        
         self.date_filter = QComboBox()
         self.date_filter.addItems(["All Time", "This Month", "Last Month", "Year to Date"])
         self.date_filter.setFixedWidth(140)
@@ -144,15 +161,16 @@ class StatsPage(QWidget):
             QComboBox { padding: 8px; border: 1px solid #444; border-radius: 5px; background: #252525; color: white; }
             QComboBox::drop-down { border: none; }
         """)
-        self.date_filter.currentTextChanged.connect(self.refresh)
+        self.date_filter.currentTextChanged.connect(lambda _: self.refresh_timer.start())
         
         self.granularity_filter = QComboBox()
         self.granularity_filter.addItems(["Daily", "Monthly"])
         self.granularity_filter.setFixedWidth(100)
         self.granularity_filter.setStyleSheet(self.date_filter.styleSheet())
-        self.granularity_filter.currentTextChanged.connect(self.refresh)
+        self.granularity_filter.currentTextChanged.connect(lambda _: self.refresh_timer.start())
         
         header_layout.addWidget(title)
+        header_layout.addWidget(self.lbl_loading)
         header_layout.addStretch()
         header_layout.addWidget(QLabel("View:"))
         header_layout.addWidget(self.granularity_filter)
@@ -164,15 +182,20 @@ class StatsPage(QWidget):
         # --- KPI ROW ---
         self.kpi_layout = QHBoxLayout()
         self.kpi_layout.setSpacing(20)
+        self.kpi_cards = [] # Built by the first update_kpis
         self.content_layout.addLayout(self.kpi_layout)
         
         # --- MIDDLE SECTION (Trend + Recent) ---
         middle_layout = QHBoxLayout()
         middle_layout.setSpacing(20)
         
-        self.trend_canvas = self.create_chart_canvas()
-        self.trend_canvas.setMinimumHeight(350)
-        middle_layout.addWidget(self.trend_canvas, stretch=2)
+        # Chart canvases go into these slots once the first data arrives (ensure_charts)
+        self.trend_canvas = self.radar_canvas = self.net_worth_canvas = None
+        self.trend = self.radar = self.net_worth = None # Each chart's axes and artists, see plot_*
+        self.chart_keys = {} # canvas -> inputs it last plotted
+        self.stale = set() # Canvases plotted but not drawn yet (draw_charts)
+        self.trend_slot = self.create_chart_slot()
+        middle_layout.addWidget(self.trend_slot, stretch=2)
         
         self.recent_list = RecentTransactionsCard()
         middle_layout.addWidget(self.recent_list, stretch=1)
@@ -184,24 +207,42 @@ class StatsPage(QWidget):
         bottom_layout.setSpacing(20)
         
         # Renamed variable to reflect new Spider Chart
-        self.radar_canvas = self.create_chart_canvas()
-        self.radar_canvas.setMinimumHeight(350)
+        self.radar_slot = self.create_chart_slot()
+        self.net_worth_slot = self.create_chart_slot()
         
-        self.net_worth_canvas = self.create_chart_canvas()
-        self.net_worth_canvas.setMinimumHeight(350)
-        
-        bottom_layout.addWidget(self.radar_canvas)
-        bottom_layout.addWidget(self.net_worth_canvas)
+        bottom_layout.addWidget(self.radar_slot)
+        bottom_layout.addWidget(self.net_worth_slot)
         self.content_layout.addLayout(bottom_layout)
 
         self.scroll_area.setWidget(self.content_widget)
+        # Charts skipped while out of view are drawn as they scroll in
+        self.scroll_area.verticalScrollBar().valueChanged.connect(lambda _: self.draw_charts())
         main_layout.addWidget(self.scroll_area)
 
-    def create_chart_canvas(self):
+    def create_chart_slot(self):
+        slot = QFrame()
+        slot.setMinimumHeight(350)
+        slot.setStyleSheet(f"background-color: {COLOR_CARD}; border-radius: 12px; border: 1px solid #333;")
+        layout = QVBoxLayout(slot)
+        layout.setContentsMargins(0, 0, 0, 0)
+        return slot
+
+    @phase("build")
+    def ensure_charts(self):
+        if self.trend_canvas is not None:
+            return
+        self.trend_canvas = self.create_chart_canvas(self.trend_slot)
+        self.radar_canvas = self.create_chart_canvas(self.radar_slot)
+        self.net_worth_canvas = self.create_chart_canvas(self.net_worth_slot)
+
+    def create_chart_canvas(self, slot):
+        from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.figure import Figure
         fig = Figure(figsize=(5, 4), dpi=100)
         fig.patch.set_facecolor(COLOR_CARD)
         canvas = FigureCanvas(fig)
         canvas.setStyleSheet(f"background-color: {COLOR_CARD}; border-radius: 12px; border: 1px solid #333;")
+        slot.layout().addWidget(canvas)
         return canvas
 
     def get_date_range(self):
@@ -220,48 +261,150 @@ class StatsPage(QWidget):
             return start.toString("yyyy-MM-dd"), today.toString("yyyy-MM-dd")
         return None, None
 
+    @phase("refresh")
     def refresh(self):
+        self.refresh_timer.stop()
+        self.dirty = False
+        start, end = self.get_date_range()
+        granularity = self.granularity_filter.currentText()
+        self.lbl_loading.show()
+        
+        if self.executor:
+            self.executor.submit("stats", lambda db: self.fetch_data(db, start, end, granularity),
+                                 self.apply_data, self.on_refresh_error)
+        else:
+            try:
+                self.apply_data(self.fetch_data(self.db, start, end, granularity))
+            except Exception as e:
+                self.on_refresh_error(e)
+
+    @phase("fetch")
+    def fetch_data(self, db, start, end, granularity):
+        """Database work for one refresh. Runs on the query thread: no widgets in here."""
+        import matplotlib.figure # Warms the chart import off the UI thread (no-op once loaded)
+        return db.get_dashboard_snapshot(start, end, granularity, recent_n=8)
+
+    def recent_rows(self, db):
+        rows, _ = db.get_ledger_page(None, None, 8, "desc", with_balance=False)
+        return rows
+
+    # --- CHANGE EVENTS ---
+
+    def on_change(self, event):
+        if not self.isVisible():
+            self.dirty = True # Reloaded by the next switch to this page
+            return
+        data = self.data
+        if data is None or (self.executor and self.executor.is_pending("stats")):
+            self.refresh() # A load in flight may have read the data from before the change
+            return
+        if not self.patch_data(data, event):
+            self.refresh()
+            return
+        if not self.executor:
+            data['recent'] = self.recent_rows(self.db)
+            self.apply_data(data)
+            return
+
+        # The recent list is a query: off the UI thread like the rest of the page's reads
+        def with_recent(rows):
+            data['recent'] = rows
+            self.apply_data(data)
+
+        self.executor.submit("stats", self.recent_rows, with_recent, self.on_refresh_error)
+
+    def patch_data(self, data, event):
+        """Applies an event to fetch_data's result: KPI balances and the affected trend buckets."""
+        start, end = data['start'], data['end']
+        lo, hi = data['span']
+        if data['bucket'] != "monthly" and not start and event['dates'] and lo and \
+                (event['dates'][0] < lo or event['dates'][-1] > hi):
+            return False # Widens the All Time span, which may change the bucket size
+        if not patch_balances(data['period'], event, start, end):
+            return False
+        if not patch_balances(data['snapshot'], event, None, end):
+            return False
+        
+        trend = dict((k, [rv, ex]) for k, rv, ex in data['trend'])
+        for sign, splits in ((-1, event['removed']), (1, event['added'])):
+            for date, _, acc_type, dr, cr in splits or []:
+                if acc_type not in ('Revenue', 'Expense'):
+                    continue
+                if (start and date < start) or (end and date > end):
+                    continue
+                totals = trend.setdefault(self.bucket_start(date, data['bucket']), [0, 0])
+                totals[0 if acc_type == 'Revenue' else 1] += sign * self.db.signed_amount(acc_type, dr, cr)
+        data['trend'] = [(k, rv, ex) for k, (rv, ex) in sorted(trend.items())]
+        data.update(self.db.dashboard_figures(data['period'], data['snapshot']))
+        return True
+
+    @staticmethod
+    def bucket_start(iso_date, bucket):
+        # Same buckets as revenue_expense_series: weeks start on Monday
+        day = datetime.date.fromisoformat(iso_date)
+        if bucket == "weekly":
+            day -= datetime.timedelta(days=day.weekday())
+        elif bucket == "monthly":
+            day = day.replace(day=1)
+        return day.isoformat()
+
+    @phase("model")
+    def apply_data(self, data):
+        self.data = data
         try:
-            start, end = self.get_date_range()
-            
-            # Fetch Data
-            if start:
-                period_bals = self.db.get_balances_period(start, end)
-            else:
-                period_bals = self.db.get_balances_snapshot() 
-            
-            snap_bals = self.db.get_balances_snapshot(end)
-            
+            self.ensure_charts()
             # Update UI
-            self.update_kpis(period_bals, start, end)
-            self.update_recent_activity()
+            self.update_kpis(data['kpis'], data['start'])
+            self.recent_list.update_data(data['recent'])
             
-            self.plot_trend_chart(start, end)
-            self.plot_expense_radar(period_bals) # NEW RADAR
-            self.plot_net_worth_bar(snap_bals)
-            
-            # Draw
-            self.trend_canvas.draw()
-            self.radar_canvas.draw()
-            self.net_worth_canvas.draw()
+            self.plot_trend_chart(data['trend'], data['bucket'])
+            self.plot_expense_radar(data['top_expenses']) # NEW RADAR
+            self.plot_net_worth_bar(data['net_worth'])
+            self.draw_charts()
+            if self.stale:
+                QTimer.singleShot(0, self.draw_charts) # New canvases are not laid out until the next pass
         except Exception as e:
             print(f"Stats Refresh Error: {e}")
+        finally:
+            self.lbl_loading.hide()
+            self.refreshed.emit()
 
-    def update_kpis(self, balances, start, end):
-        while self.kpi_layout.count():
-            child = self.kpi_layout.takeAt(0)
-            if child.widget(): child.widget().deleteLater()
-            
-        rev = sum(d['net_balance'] for d in balances.values() if d['type'] == 'Revenue')
-        exp = sum(d['net_balance'] for d in balances.values() if d['type'] == 'Expense')
-        net_income = rev - exp
-        margin = (net_income / rev * 100) if rev > 0 else 0.0
+    @phase("draw")
+    def draw_charts(self):
+        """Draws the charts that changed since their last draw, unless scrolled out of view."""
+        for canvas in list(self.stale):
+            if canvas.isVisible() and not canvas.visibleRegion().isEmpty():
+                canvas.draw()
+                self.stale.discard(canvas)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.stale:
+            QTimer.singleShot(0, self.draw_charts) # Once the layout has placed the canvases
+
+    def on_refresh_error(self, error):
+        self.lbl_loading.hide()
+        print(f"Stats Refresh Error: {error}")
+        self.refreshed.emit()
+
+    @phase("model")
+    def update_kpis(self, kpis, start):
+        rev, exp = kpis['revenue'], kpis['expenses']
+        net_income, margin = kpis['net_income'], kpis['margin']
         period_text = "Selected Period" if start else "All Time"
 
-        card_ni = KPICard("Net Income", f"{net_income:,.2f}", period_text, net_income >= 0)
-        card_rev = KPICard("Revenue", f"{rev:,.2f}", period_text, True)
-        card_exp = KPICard("Expenses", f"{exp:,.2f}", period_text, False)
-        card_mar = KPICard("Profit Margin", f"{margin:.1f}%", "Net / Rev", margin > 0, is_neutral=False)
+        values = [("Net Income", fmt_money(net_income), period_text, net_income >= 0),
+                  ("Revenue", fmt_money(rev), period_text, True),
+                  ("Expenses", fmt_money(exp), period_text, False),
+                  ("Profit Margin", f"{margin:.1f}%", "Net / Rev", margin > 0)]
+        if self.kpi_cards:
+            # Updated in place: new cards would re-layout the page (and resize the charts)
+            for card, (_, value, subtext, positive) in zip(self.kpi_cards, values):
+                card.set_value(value, subtext, positive)
+            return
+
+        self.kpi_cards = [KPICard(*args) for args in values]
+        card_ni, card_rev, card_exp, card_mar = self.kpi_cards
         
         card_ni.clicked.connect(self.go_to_income_stmt.emit)
         card_rev.clicked.connect(self.go_to_income_stmt.emit)
@@ -272,104 +415,104 @@ class StatsPage(QWidget):
         self.kpi_layout.addWidget(card_exp)
         self.kpi_layout.addWidget(card_mar)
 
-    def update_recent_activity(self):
-        rows = self.db.get_ledger("All") 
-        self.recent_list.update_data(rows[:8])
+    # --- CHARTS ---
+    # Each chart keeps its axes and artists: an update only swaps their data, and a
+    # chart whose inputs did not change is neither updated nor redrawn (see chart_changed).
 
-    def plot_trend_chart(self, start, end):
-        self.trend_canvas.figure.clear()
-        ax = self.trend_canvas.figure.add_subplot(111)
-        self.style_ax(ax)
-        
-        rows = self.db.get_ledger("All")
-        trend_data = {}
-        
-        granularity = self.granularity_filter.currentText()
-        auto_weekly = False
-        if granularity == "Daily":
-            if start and end:
-                s_date = datetime.datetime.strptime(start, "%Y-%m-%d")
-                e_date = datetime.datetime.strptime(end, "%Y-%m-%d")
-                if (e_date - s_date).days > 60: auto_weekly = True
-            elif not start and rows:
-                 # Logic for All Time auto-grouping
-                 last = datetime.datetime.strptime(rows[0][1], "%Y-%m-%d")
-                 first = datetime.datetime.strptime(rows[-1][1], "%Y-%m-%d")
-                 if (last - first).days > 60: auto_weekly = True
-
-        for row in rows:
-            date_str = row[1]
-            if start and (date_str < start or date_str > end): continue
-            
-            if granularity == "Monthly":
-                key = date_str[:7] + "-01"
-            elif auto_weekly:
-                dt = datetime.datetime.strptime(date_str, "%Y-%m-%d")
-                start_of_week = dt - datetime.timedelta(days=dt.weekday())
-                key = start_of_week.strftime("%Y-%m-%d")
-            else:
-                key = date_str
-            
-            if key not in trend_data: trend_data[key] = {'rev': 0.0, 'exp': 0.0}
-            
-            if row[3] == 'Revenue': trend_data[key]['rev'] += (row[6] - row[5])
-            elif row[3] == 'Expense': trend_data[key]['exp'] += (row[5] - row[6])
-                
-        sorted_keys = sorted(trend_data.keys())
-        dates, revs, exps = [], [], []
-        
-        if not sorted_keys:
-             ax.text(0.5, 0.5, "No Activity", ha='center', color=COLOR_SUBTEXT)
-             return
-
-        for k in sorted_keys:
-            dt = datetime.datetime.strptime(k, "%Y-%m-%d")
-            dates.append(dt)
-            revs.append(trend_data[k]['rev'])
-            exps.append(trend_data[k]['exp'])
-            
-        ax.plot(dates, revs, color=COLOR_SUCCESS, linewidth=2, marker='o', label='Rev')
-        ax.plot(dates, exps, color=COLOR_DANGER, linewidth=2, marker='o', label='Exp')
-        ax.fill_between(dates, revs, alpha=0.1, color=COLOR_SUCCESS)
+    def chart_changed(self, canvas, key):
+        """True (and the canvas is queued for draw_charts) if key differs from the last plotted one."""
+        if self.chart_keys.get(canvas) == key:
+            return False
+        self.chart_keys[canvas] = key
+        self.stale.add(canvas)
+        return True
+
+    @phase("chart")
+    def plot_trend_chart(self, series, bucket):
+        """series: [(bucket_start, revenue, expense), ...] from get_revenue_expense_series"""
+        import matplotlib.dates as mdates
+        if not self.chart_changed(self.trend_canvas, (tuple(series), bucket)):
+            return
+        chart = self.trend
+        if chart is None:
+            ax = self.trend_canvas.figure.add_subplot(111)
+            self.style_ax(ax)
+            rev_line, = ax.plot([], [], color=COLOR_SUCCESS, linewidth=2, marker='o', label='Rev')
+            exp_line, = ax.plot([], [], color=COLOR_DANGER, linewidth=2, marker='o', label='Exp')
+            ax.xaxis.set_major_locator(mdates.AutoDateLocator())
+            legend = ax.legend(frameon=False, labelcolor='white')
+            empty = ax.text(0.5, 0.5, "No Activity", ha='center', color=COLOR_SUBTEXT, transform=ax.transAxes)
+            chart = self.trend = {'ax': ax, 'rev': rev_line, 'exp': exp_line, 'fill': None,
+                                  'legend': legend, 'empty': empty}
+        ax = chart['ax']
+        
+        if chart['fill'] is not None:
+            chart['fill'].remove() # A fill cannot take new data: it is rebuilt below
+            chart['fill'] = None
+        has_data = bool(series)
+        for artist in (chart['rev'], chart['exp'], chart['legend'], ax.xaxis, ax.yaxis):
+            artist.set_visible(has_data)
+        chart['empty'].set_visible(not has_data)
+        if not has_data:
+            ax.set_title("")
+            return
         
-        if granularity == "Monthly":
+        # Plain numbers on a date formatter: set_data does not convert dates itself
+        dates = mdates.date2num([datetime.date.fromisoformat(k) for k, _, _ in series])
+        revs = [from_cents(r) for _, r, _ in series]
+        exps = [from_cents(e) for _, _, e in series]
+        chart['rev'].set_data(dates, revs)
+        chart['exp'].set_data(dates, exps)
+        ax.relim()
+        chart['fill'] = ax.fill_between(dates, revs, alpha=0.1, color=COLOR_SUCCESS) # Adds itself to the limits
+        ax.autoscale_view()
+        
+        if bucket == "monthly":
             ax.xaxis.set_major_formatter(mdates.DateFormatter('%b %y'))
-        elif auto_weekly:
+        elif bucket == "weekly":
              ax.xaxis.set_major_formatter(mdates.DateFormatter('%d %b'))
         else:
             ax.xaxis.set_major_formatter(mdates.DateFormatter('%d'))
         
-        ax.xaxis.set_major_locator(mdates.AutoDateLocator())
-        ax.legend(frameon=False, labelcolor='white')
-        
-        if granularity == "Monthly": title = "Monthly Trend"
-        elif auto_weekly: title = "Weekly Trend"
+        if bucket == "monthly": title = "Monthly Trend"
+        elif bucket == "weekly": title = "Weekly Trend"
         else: title = "Daily Trend"
         ax.set_title(title, color=COLOR_TEXT, fontsize=10, pad=10, loc='left')
 
-    def plot_expense_radar(self, balances):
+    @phase("chart")
+    def plot_expense_radar(self, top_expenses):
         """Generates a Spider/Radar Chart for Expense Composition"""
-        self.radar_canvas.figure.clear()
-        
-        # 1. Filter Data (Top 6 Expenses)
-        data = []
-        for name, info in balances.items():
-            if info['type'] == 'Expense' and info['net_balance'] > 0:
-                data.append((name, info['net_balance']))
+        # 1. Top expense accounts, largest first (see DatabaseHandler.dashboard_figures)
+        data = [(name, from_cents(amount)) for name, amount in top_expenses]
+        if not self.chart_changed(self.radar_canvas, tuple(data)):
+            return
         
-        data.sort(key=lambda x: x[1], reverse=True)
-        data = data[:6] # Top 6
+        # 2. Setup Polar Plot (once)
+        chart = self.radar
+        if chart is None:
+            ax = self.radar_canvas.figure.add_subplot(111, polar=True)
+            ax.set_facecolor(COLOR_CARD)
+            line, = ax.plot([], [], color=COLOR_DANGER, linewidth=2, linestyle='solid')
+            fill, = ax.fill([0], [0], color=COLOR_DANGER, alpha=0.25)
+            ax.set_rlabel_position(0)
+            ax.spines['polar'].set_visible(False) # Hide outer circle line
+            empty = ax.text(0.5, 0.5, "No Expenses", ha='center', color=COLOR_SUBTEXT, transform=ax.transAxes)
+            chart = self.radar = {'ax': ax, 'line': line, 'fill': fill, 'empty': empty}
+        ax = chart['ax']
         
         # Handle Empty State
-        if not data:
-            ax = self.radar_canvas.figure.add_subplot(111)
-            ax.text(0.5, 0.5, "No Expenses", ha='center', color=COLOR_SUBTEXT)
-            self.style_ax(ax)
+        has_data = bool(data)
+        chart['line'].set_visible(has_data)
+        chart['fill'].set_visible(has_data)
+        chart['empty'].set_visible(not has_data)
+        if has_data:
+            ax.grid(color='#333', linestyle='--')
+        else:
+            ax.grid(False)
+        if not has_data:
+            ax.set_xticks([])
+            ax.set_title("")
             return
-            
-        # 2. Setup Polar Plot
-        ax = self.radar_canvas.figure.add_subplot(111, polar=True)
-        ax.set_facecolor(COLOR_CARD)
         
         # 3. Prepare Math (Angles & Values)
         categories = [x[0] for x in data]
@@ -377,56 +520,54 @@ class StatsPage(QWidget):
         N = len(categories)
         
         # Compute angles (one slice per category)
-        angles = [n / float(N) * 2 * np.pi for n in range(N)]
+        angles = [n / float(N) * 2 * math.pi for n in range(N)]
         
         # Close the loop (repeat first item)
         values += values[:1]
         angles += angles[:1]
         
         # 4. Plot
-        ax.plot(angles, values, color=COLOR_DANGER, linewidth=2, linestyle='solid')
-        ax.fill(angles, values, color=COLOR_DANGER, alpha=0.25)
+        chart['line'].set_data(angles, values)
+        chart['fill'].set_xy(list(zip(angles, values)))
+        ax.relim()
+        ax.autoscale_view()
         
         # 5. Styling The Web
         # X-Labels (Categories)
         ax.set_xticks(angles[:-1])
         ax.set_xticklabels(categories, color=COLOR_TEXT, fontsize=9)
         
-        # Y-Labels (Radial Rings) - Make them subtle
-        ax.set_rlabel_position(0)
-        plt_grids = ax.yaxis.get_gridlines()
-        for gl in plt_grids:
-            gl.set_color('#333')
-            gl.set_linestyle('--')
-            
-        ax.spines['polar'].set_visible(False) # Hide outer circle line
-        ax.grid(color='#333', linestyle='--')
-        
         # Remove radial numbers to keep it clean (optional, often better for dashboards)
         ax.set_yticklabels([]) 
         
         ax.set_title("Expense Composition", color=COLOR_TEXT, fontsize=10, pad=20, loc='center')
 
-    def plot_net_worth_bar(self, balances):
-        self.net_worth_canvas.figure.clear()
-        ax = self.net_worth_canvas.figure.add_subplot(111)
-        self.style_ax(ax)
-        
-        assets = sum(d['net_balance'] for d in balances.values() if d['type'] == 'Asset')
-        liabs = sum(d['net_balance'] for d in balances.values() if d['type'] == 'Liability')
-        equity = assets - liabs
-        
-        cats = ['Assets', 'Liabilities', 'Equity']
-        vals = [assets, liabs, equity]
-        cols = [COLOR_SUCCESS, COLOR_DANGER, COLOR_ACCENT]
-        
-        bars = ax.bar(cats, vals, color=cols, width=0.5)
-        for bar in bars:
-            h = bar.get_height()
-            ax.annotate(f'{h:,.0f}', xy=(bar.get_x() + bar.get_width()/2, h),
-                        xytext=(0, 3), textcoords="offset points", ha='center', va='bottom', color=COLOR_TEXT)
+    @phase("chart")
+    def plot_net_worth_bar(self, net_worth):
+        assets, liabs, equity = net_worth['assets'], net_worth['liabilities'], net_worth['equity']
+        if not self.chart_changed(self.net_worth_canvas, (assets, liabs)):
+            return
+        vals = [from_cents(assets), from_cents(liabs), from_cents(equity)]
         
-        ax.set_title("Financial Position", color=COLOR_TEXT, fontsize=10, pad=10, loc='left')
+        chart = self.net_worth
+        if chart is None:
+            ax = self.net_worth_canvas.figure.add_subplot(111)
+            self.style_ax(ax)
+            cats = ['Assets', 'Liabilities', 'Equity']
+            cols = [COLOR_SUCCESS, COLOR_DANGER, COLOR_ACCENT]
+            bars = ax.bar(cats, [0, 0, 0], color=cols, width=0.5)
+            labels = [ax.annotate("", xy=(bar.get_x() + bar.get_width()/2, 0), xytext=(0, 3),
+                                  textcoords="offset points", ha='center', va='bottom', color=COLOR_TEXT)
+                      for bar in bars]
+            ax.set_title("Financial Position", color=COLOR_TEXT, fontsize=10, pad=10, loc='left')
+            chart = self.net_worth = {'ax': ax, 'bars': bars, 'labels': labels}
+        
+        for bar, label, h in zip(chart['bars'], chart['labels'], vals):
+            bar.set_height(h)
+            label.xy = (bar.get_x() + bar.get_width()/2, h)
+            label.set_text(f'{h:,.0f}')
+        chart['ax'].relim()
+        chart['ax'].autoscale_view()
 
     def style_ax(self, ax):
         ax.set_facecolor(COLOR_CARD)
@@ -0,0 +1,168 @@
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime
+from PyQt6.QtCore import QObject, QTimer
+
+# Main-thread stall detection. Pages mark their phases as spans (fetch, model, chart, draw,
+# build); StallWatchdog notices when the UI thread stops answering for longer than its
+# threshold and blames the spans open at the time, plus the Ratio code it was running.
+
+_RATIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_THIS = os.path.abspath(__file__)
+_open = {}                   # thread ident -> stack of open [name, phase, start] spans
+_spans = deque(maxlen=5000)  # Finished spans, newest last
+_main = threading.main_thread().ident
+
+@contextmanager
+def span(name, phase):
+    """Times a block as name (e.g. StatsPage.apply_data) in a phase (fetch, model, chart, draw, build)."""
+    stack = _open.setdefault(threading.get_ident(), [])
+    entry = [name, phase, time.perf_counter()]
+    stack.append(entry)
+    try:
+        yield
+    finally:
+        stack.pop()
+        end = time.perf_counter()
+        _spans.append({'name': name, 'phase': phase, 'start': entry[2], 'ms': (end - entry[2]) * 1000,
+                       'depth': len(stack), 'main': threading.get_ident() == _main})
+
+def phase(kind):
+    """
+    Method decorator: each call is a span named Class.method. The wrapper takes any
+    arguments, so connect decorated methods to signals that carry values through a lambda.
+    """
+    def wrap(fn):
+        @functools.wraps(fn)
+        def run(self, *args, **kwargs):
+            with span(f"{type(self).__name__}.{fn.__name__}", kind):
+                return fn(self, *args, **kwargs)
+        return run
+    return wrap
+
+def open_spans(thread_ident=None):
+    """Names of the spans currently open on a thread (the main thread by default), outermost first."""
+    return [f"{name} ({kind})" for name, kind, _ in list(_open.get(thread_ident or _main, ()))]
+
+def recent_spans():
+    return list(_spans)
+
+def span_summary():
+    """Per (name, phase) timings over the finished spans still in the ring buffer, slowest p95 first."""
+    groups = {}
+    for s in list(_spans):
+        groups.setdefault((s['name'], s['phase']), []).append(s['ms'])
+    rows = []
+    for (name, kind), durations in groups.items():
+        durations.sort()
+        n = len(durations)
+        rows.append({'name': name, 'phase': kind, 'count': n, 'total_ms': sum(durations),
+                     'p50_ms': durations[n // 2], 'p95_ms': durations[min(n - 1, int(n * 0.95))],
+                     'max_ms': durations[-1]})
+    return sorted(rows, key=lambda r: -r['p95_ms'])
+
+def ratio_frames(frame, limit=8):
+    """The Ratio (non-library) frames of a stack as Class.method:line, innermost first."""
+    frames = []
+    while frame is not None and len(frames) < limit:
+        path = frame.f_code.co_filename
+        if path.startswith(_RATIO) and path != _THIS and "site-packages" not in path:
+            owner = frame.f_locals.get('self')
+            prefix = type(owner).__name__ if owner is not None else os.path.splitext(os.path.basename(path))[0]
+            frames.append(f"{prefix}.{frame.f_code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return frames
+
+class StallWatchdog(QObject):
+    """
+    A heartbeat QTimer on the UI thread and a watcher thread. When the heartbeat is late by
+    more than threshold_ms the watcher samples what the UI thread is doing (open spans and
+    Ratio stack frames) until it beats again; the stall is then recorded with its length.
+    The last `history` stalls are kept in self.stalls.
+    The watcher thread never touches the Qt objects: the UI thread publishes what it needs
+    as plain floats (heartbeat, the time.monotonic() of the last beat, and interval).
+    """
+
+    def __init__(self, threshold_ms=250, history=500, parent=None):
+        super().__init__(parent)
+        self.stalls = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._samples = [] # (open spans, frames) taken during the stall in progress
+        self._stop = threading.Event()
+        self._last_beat = time.perf_counter() # UI thread only: spans are timed on this clock
+        self.heartbeat = time.monotonic()
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self._beat)
+        self.set_threshold(threshold_ms)
+        self.timer.start()
+        self._thread = threading.Thread(target=self._watch, name="StallWatchdog", daemon=True)
+        self._thread.start()
+
+    def set_threshold(self, threshold_ms):
+        self.threshold = max(20, threshold_ms) / 1000
+        # Beats often enough that lateness beyond the threshold is always a real stall
+        self.timer.setInterval(max(10, int(threshold_ms // 4)))
+        self.interval = self.timer.interval() / 1000
+
+    def _beat(self):
+        self.heartbeat = time.monotonic()
+        now = time.perf_counter()
+        gap = now - self._last_beat - self.interval
+        started = self._last_beat
+        self._last_beat = now
+        with self._lock:
+            samples, self._samples = self._samples, []
+        if gap >= self.threshold:
+            self.record(started, gap, samples)
+
+    def _watch(self):
+        while not self._stop.wait(self.threshold / 2):
+            if time.monotonic() - self.heartbeat - self.interval < self.threshold:
+                continue
+            frame = sys._current_frames().get(_main)
+            sample = (open_spans(), ratio_frames(frame))
+            del frame
+            with self._lock:
+                self._samples.append(sample)
+
+    def record(self, started, gap, samples):
+        # Spans that ran inside the stall: the phases it was spent in
+        during = [s for s in list(_spans) if s['main'] and s['start'] >= started]
+        during.sort(key=lambda s: -s['ms'])
+        # Blame the innermost open span seen most often while it lasted, else the longest
+        # span that finished inside it, else the Ratio code the UI thread was in
+        counts = Counter(spans[-1] for spans, _ in samples if spans)
+        blame = counts.most_common(1)[0][0] if counts else None
+        spans, frames = next(((s, f) for s, f in samples if s and s[-1] == blame), samples[0] if samples else ([], []))
+        if blame is None:
+            if during:
+                blame = f"{during[0]['name']} ({during[0]['phase']})"
+            else:
+                blame = frames[0] if frames else "(unknown)"
+        self.stalls.append({
+            'time': datetime.now().isoformat(timespec='milliseconds'), 'ms': gap * 1000, 'blame': blame,
+            'open_spans': spans, 'frames': frames,
+            'phases': [{'name': s['name'], 'phase': s['phase'], 'ms': s['ms']} for s in during[:10]],
+        })
+
+    def report(self):
+        return {'threshold_ms': self.threshold * 1000, 'dumped': datetime.now().isoformat(timespec='seconds'),
+                'stalls': list(self.stalls), 'spans': span_summary(), 'recent_spans': recent_spans()}
+
+    def export(self, path=None):
+        """Writes report() as JSON. Returns the path."""
+        path = path or f"ratio_stalls_{datetime.now():%Y%m%d_%H%M%S}.json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+        return path
+
+    def stop(self):
+        self.timer.stop()
+        self._stop.set()
@@ -0,0 +1,93 @@
+import threading
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+class _Signals(QObject):
+    progress = pyqtSignal(str)
+    # result, error
+    done = pyqtSignal(object, object)
+
+class _WriteTask(QRunnable):
+    def __init__(self, worker, fn):
+        super().__init__()
+        self.worker = worker
+        self.fn = fn
+
+    def run(self):
+        worker = self.worker
+        result, error = None, None
+        try:
+            result = self.fn(worker.write_db, worker._signals.progress.emit)
+        except Exception as e:
+            error = e
+        worker._signals.done.emit(result, error)
+
+class WriteWorker(QObject):
+    """
+    Runs long writes (a statement import, posting it) off the Qt main thread, one at a time.
+    submit(fn, on_result, on_error, on_progress): fn(write_db, progress) runs on a worker
+    thread with its own writable connection (db.open_writer(), so change events still reach
+    db's subscribers) and may call progress(text); on_progress(text) and then on_result(result)
+    or on_error(error) are called back on the main thread. Returns False while busy.
+    """
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.write_db = None # Opened with the first job: most sessions never import
+
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+
+        self._lock = threading.Lock()
+        self._job = None # (on_result, on_error, on_progress) of the running job
+        self._closed = False
+
+        self._signals = _Signals()
+        self._signals.progress.connect(self._on_progress)
+        self._signals.done.connect(self._on_done)
+
+    def busy(self):
+        with self._lock:
+            return self._job is not None
+
+    def submit(self, fn, on_result, on_error=None, on_progress=None):
+        with self._lock:
+            if self._closed or self._job is not None:
+                return False
+            self._job = (on_result, on_error, on_progress)
+        if self.write_db is None:
+            self.write_db = self.db.open_writer()
+        self.pool.start(_WriteTask(self, fn))
+        return True
+
+    def _on_progress(self, text):
+        # Main thread
+        job = self._job
+        if job is not None and job[2] is not None:
+            job[2](text)
+
+    def _on_done(self, result, error):
+        # Main thread
+        with self._lock:
+            job, self._job = self._job, None
+        if job is None:
+            return # Shut down meanwhile
+        on_result, on_error, _ = job
+        if error is None:
+            on_result(result)
+        elif on_error is not None:
+            on_error(error)
+        else:
+            print(f"Write Error: {error}")
+
+    def shutdown(self):
+        """Waits for the running job (a write is never cut short) and closes the connection."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self.pool.waitForDone()
+        with self._lock:
+            self._job = None
+        if self.write_db is not None and self.write_db is not self.db:
+            self.write_db.close()
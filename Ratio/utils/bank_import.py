@@ -0,0 +1,313 @@
+import csv
+import functools
+import hashlib
+import html
+import itertools
+import os
+import re
+import time
+from datetime import datetime
+
+from utils.money import MINOR_UNITS, to_cents
+
+# Bank statement import: CSV, OFX/QFX and QIF files parsed as generators of statement lines
+#     (line_no, date, amount, description, ref)
+# line_no counts transactions from 1 in file order, date is YYYY-MM-DD, amount signed cents
+# as the bank sees it (+ money in, - money out), ref the bank's id for the line (OFX FITID,
+# a cheque number) or None. import_statement runs the pipeline on a DatabaseHandler:
+# stage (resumable), flag duplicates, and optionally approve and post.
+
+FORMATS = {'.csv': 'csv', '.ofx': 'ofx', '.qfx': 'ofx', '.qif': 'qif'}
+
+# Tried in order when a file does not say (CSV, QIF). The first that parses a file's first
+# date is kept for the rest of it, so 03/04 means the same thing on every line.
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%d/%m/%Y", "%d.%m.%Y", "%Y/%m/%d", "%m/%d/%y", "%d/%m/%y",
+                "%d-%b-%Y", "%d %b %Y", "%b %d, %Y", "%Y%m%d")
+
+# CSV header names, most specific first
+CSV_COLUMNS = {
+    'date': ("date", "transaction date", "posted date", "posting date", "booking date", "value date"),
+    'description': ("description", "payee", "name", "details", "narrative", "transaction description", "memo"),
+    'amount': ("amount", "transaction amount"),
+    'debit': ("debit", "withdrawal", "withdrawals", "money out", "paid out"),
+    'credit': ("credit", "deposit", "deposits", "money in", "paid in"),
+    'ref': ("ref", "reference", "id", "transaction id", "fitid", "check number", "cheque number"),
+}
+
+def format_for(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in FORMATS:
+        raise ValueError(f"Cannot tell the statement format of {path!r}: use {', '.join(FORMATS)}")
+    return FORMATS[ext]
+
+def file_hash(path):
+    """Content hash of a file: the same statement imported twice maps to the same batch."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+# --- NORMALIZATION ---
+
+_NON_WORD = re.compile(r"[\W_]+")
+_DIGIT = re.compile(r"\d")
+# Card and channel words banks put in front of the payee
+_NOISE = frozenset(("pos", "eftpos", "atm", "ach", "card", "debit", "purchase", "visa", "mc", "dd", "ref"))
+
+@functools.lru_cache(maxsize=1 << 16)
+def normalize_description(text):
+    """
+    Casefolded words without punctuation, anything holding a digit (card numbers,
+    references, dates) or _NOISE: "POS 4411 STARBUCKS #0231 12/03" -> "starbucks".
+    """
+    words = _NON_WORD.sub(" ", (text or "").casefold()).split()
+    return " ".join(w for w in words if w not in _NOISE and not _DIGIT.search(w))
+
+def match_key(date, amount, description):
+    """The duplicate-detection key of a line or split as a signed 64-bit integer."""
+    text = f"{date}|{amount}|{normalize_description(description)}"
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+# --- PARSING ---
+
+# decimal: the statement's decimal separator, "." (1,234.56) or "," (1.234,56). Never guessed
+# from the amounts: "12,500" is 12500 in one file and 12.5 in another.
+DECIMALS = (".", ",")
+_PLAIN_AMOUNT = {".": re.compile(r"(-?)(\d+)(?:\.(\d\d?))?$"), ",": re.compile(r"(-?)(\d+)(?:,(\d\d?))?$")}
+# Digits grouped in threes by the other separator (spaces and apostrophes too), then decimals
+_GROUPED_AMOUNT = {".": re.compile(r"(?:\d{1,3}(?:,\d{3})+|\d*)(?:\.\d+)?$"),
+                   ",": re.compile(r"(?:\d{1,3}(?:\.\d{3})+|\d*)(?:,\d+)?$")}
+_SPACE_GROUPS = re.compile(r"(?<=\d)[ '\u00a0\u202f\u2019](?=\d)")
+
+def parse_amount(text, decimal="."):
+    """
+    Bank amounts in currency units to signed cents: "-1,234.56", "(12.00)", "12.00-", "$5",
+    "5.00 DR", or with decimal="," "-1.234,56", "1 234,56". ValueError for a separator that
+    does not fit (with "." as the decimal point, "12,50" is an error, not 1250.00).
+    """
+    if decimal not in DECIMALS:
+        raise ValueError(f"Decimal separator must be one of {' '.join(DECIMALS)}, not {decimal!r}")
+    text = (text or "").strip()
+    plain = _PLAIN_AMOUNT[decimal].match(text)
+    if plain:
+        # Most lines: no symbols or grouping, so integer arithmetic instead of a Decimal
+        sign, units, minor = plain.groups()
+        cents = int(units) * MINOR_UNITS + int((minor or "0").ljust(2, "0"))
+        return -cents if sign else cents
+    given = text
+    text = text.upper()
+    negative = False
+    if text.endswith(("CR", "DR")):
+        negative = text.endswith("DR")
+        text = text[:-2].strip()
+    if text.startswith("(") and text.endswith(")"):
+        negative, text = True, text[1:-1]
+    if text.endswith("-"):
+        negative, text = True, text[:-1]
+    text = text.strip().strip("$€£¥").strip()
+    if text.startswith("-"):
+        negative, text = not negative, text[1:].lstrip("$€£¥")
+    if not text:
+        return 0
+    group = "," if decimal == "." else "."
+    # Spaces and apostrophes group thousands too: checked as if they were the group separator
+    digits = _SPACE_GROUPS.sub(group, text.strip())
+    if not _GROUPED_AMOUNT[decimal].match(digits) or not any(c.isdigit() for c in digits):
+        raise ValueError(f"Invalid amount {given!r} with {decimal!r} as the decimal separator")
+    cents = to_cents(digits.replace(group, "").replace(decimal, "."))
+    return -cents if negative else cents
+
+class DateParser:
+    """
+    Parses a file's dates with the first format that worked (or the one given). Statements
+    repeat a few hundred dates over thousands of lines, so each text is parsed once.
+    """
+
+    def __init__(self, date_format=None):
+        self.formats = [date_format] if date_format else list(DATE_FORMATS)
+        self.parsed = {}
+
+    def __call__(self, text):
+        day = self.parsed.get(text)
+        if day is None:
+            day = self.parsed[text] = self.parse(text.strip())
+        return day
+
+    def parse(self, text):
+        for i, fmt in enumerate(self.formats):
+            try:
+                parsed = datetime.strptime(text, fmt).date()
+            except ValueError:
+                continue
+            if i:
+                # Settled: later ambiguous dates read the same way. The year may still come
+                # with either width (QIF writes 1/05'24 and 01/05/2024 in one file).
+                self.formats = [fmt, fmt.replace("%Y", "%y") if "%Y" in fmt else fmt.replace("%y", "%Y")]
+            return parsed.isoformat()
+        settled = f" (dates in this file read as {self.formats[0]})" if len(self.formats) <= 2 else ""
+        raise ValueError(f"Unrecognized date {text!r}{settled}")
+
+def read_csv(f, date_format=None, decimal=None):
+    decimal = decimal or "."
+    # Files written with decimal commas usually separate fields with semicolons
+    first = f.readline()
+    delimiter = max((",", ";", "\t"), key=first.count)
+    reader = csv.reader(itertools.chain([first], f), delimiter=delimiter)
+    header = [h.strip().lower() for h in next(reader, [])]
+
+    def column(kind):
+        return next((header.index(name) for name in CSV_COLUMNS[kind] if name in header), None)
+
+    cols = {kind: column(kind) for kind in CSV_COLUMNS}
+    if cols['date'] is None or cols['description'] is None or \
+            (cols['amount'] is None and (cols['debit'] is None or cols['credit'] is None)):
+        raise ValueError("A statement CSV needs date, description and amount (or debit and credit) columns")
+    parse_date = DateParser(date_format)
+    line_no = 0
+    for row_no, row in enumerate(reader, start=2):
+        if not any(cell.strip() for cell in row):
+            continue
+        try:
+            day = parse_date(row[cols['date']])
+            if cols['amount'] is not None:
+                amount = parse_amount(row[cols['amount']], decimal)
+            else:
+                amount = abs(parse_amount(row[cols['credit']], decimal)) - abs(parse_amount(row[cols['debit']], decimal))
+        except (ValueError, IndexError) as e:
+            raise ValueError(f"Line {row_no}: {e}")
+        ref = row[cols['ref']].strip() if cols['ref'] is not None and cols['ref'] < len(row) else None
+        line_no += 1
+        yield line_no, day, amount, row[cols['description']].strip(), ref or None
+
+_OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+
+def _ofx_tags(f, size=1 << 16):
+    """(closing, TAG, text) for every tag, read in blocks: SGML (OFX 1) and XML (OFX 2) alike."""
+    buf = ""
+    while True:
+        block = f.read(size)
+        buf += block
+        # A tag's text runs up to the next "<", so everything before the last one is complete
+        end = buf.rfind("<") if block else len(buf)
+        if end > 0:
+            for m in _OFX_TAG.finditer(buf, 0, end):
+                yield m.group(1) == "/", m.group(2).upper(), html.unescape(m.group(3).strip())
+            buf = buf[end:]
+        if not block:
+            return
+
+def read_ofx(f, date_format=None, decimal=None):
+    # OFX amounts have no grouping and either "." or "," for the decimal point (the spec
+    # allows both), so decimal is only needed to insist on one
+    parse_date = DateParser("%Y%m%d") # DTPOSTED: YYYYMMDD[HHMMSS[.XXX]][[TZ]]
+    line_no = 0
+    trn = None
+    for closing, tag, text in _ofx_tags(f):
+        if tag == "STMTTRN":
+            if not closing:
+                trn = {}
+                continue
+            if trn is None:
+                continue
+            try:
+                day = parse_date(trn['DTPOSTED'][:8])
+                text = trn['TRNAMT']
+                amount = parse_amount(text, decimal or ("," if "," in text else "."))
+            except KeyError as e:
+                raise ValueError(f"Transaction {line_no + 1}: no {e.args[0]}")
+            line_no += 1
+            yield line_no, day, amount, trn.get('NAME') or trn.get('MEMO') or "", trn.get('FITID') or trn.get('CHECKNUM')
+            trn = None
+        elif trn is not None and not closing and text:
+            trn.setdefault(tag, text)
+
+def read_qif(f, date_format=None, decimal=None):
+    decimal = decimal or "."
+    parse_date = DateParser(date_format)
+    record = {}
+    line_no = 0
+    for raw in f:
+        line = raw.strip()
+        if not line or line.startswith("!"):
+            continue
+        code, value = line[0], line[1:].strip()
+        if code == "^":
+            if 'D' in record:
+                try:
+                    # Quicken writes 1/ 5'24 for 01/05/2024
+                    day = parse_date(record['D'].replace("'", "/").replace(" ", "0"))
+                    amount = parse_amount(record.get('T') or record.get('U'), decimal)
+                except ValueError as e:
+                    raise ValueError(f"Transaction {line_no + 1}: {e}")
+                line_no += 1
+                yield line_no, day, amount, record.get('P') or record.get('M') or "", record.get('N')
+            record = {}
+        elif code in "DTUPMN":
+            record.setdefault(code, value) # Split lines (S, E, $) are the categories, not the bank line
+
+READERS = {'csv': read_csv, 'ofx': read_ofx, 'qif': read_qif}
+
+def read_statement(path, fmt=None, date_format=None, decimal=None):
+    """
+    Statement lines of a file, as a generator: the file is read as the lines are consumed.
+    decimal: "." or "," (see DECIMALS); CSV and QIF default to ".", OFX reads either.
+    """
+    fmt = fmt or format_for(path)
+    encoding = "utf-8-sig" if fmt == "csv" else "utf-8"
+    with open(path, newline="" if fmt == "csv" else None, encoding=encoding, errors="replace") as f:
+        yield from READERS[fmt](f, date_format, decimal)
+
+# --- PIPELINE ---
+
+def _reporting(lines, every, progress):
+    """Passes lines through, telling progress how many have been read every `every` lines."""
+    progress("Reading the statement")
+    for count, line in enumerate(lines, 1):
+        yield line
+        if count % every == 0:
+            progress(f"Reading the statement: {count:,} lines")
+
+def import_statement(db, path, account_name, fmt=None, date_format=None, post=False, chunk_size=5000,
+                     categorize=True, decimal=None, progress=None):
+    """
+    Stages a statement file into a batch for account_name (resuming an interrupted import
+    of the same file), flags the lines already in the book, with categorize assigns the
+    other account of each line (utils.categorize), and with post=True approves and posts
+    every line not flagged. Flagged lines wait for review (set_staged_status). decimal: the
+    file's decimal separator, see read_statement. progress(text), when given, hears what
+    the import is doing (for a progress display; called on the importing thread).
+    Returns stats: batch, resumed_after (lines an earlier run had staged), staged, lines,
+    duplicates, categorized, skipped_rules (see categorize_batch), posted, seconds and
+    lines_per_sec.
+    """
+    started = time.perf_counter()
+    report = progress or (lambda text: None)
+    fmt = fmt or format_for(path)
+    batch = db.start_import(account_name, os.path.abspath(path), file_hash(path), fmt)
+    done = batch['lines']
+    if batch['status'] == 'staging':
+        lines = (line for line in read_statement(path, fmt, date_format, decimal) if line[0] > done)
+        if progress:
+            lines = _reporting(lines, chunk_size, progress)
+        staged = db.stage_lines(batch['id'], lines, chunk_size)['lines']
+    else:
+        staged = 0 # Fully staged before: just re-check and carry on
+    report("Looking for lines already in the book")
+    stats = {'batch': batch['id'], 'resumed_after': done, 'staged': staged,
+             'duplicates': db.flag_duplicates(batch['id'], chunk_size), 'categorized': 0, 'skipped_rules': [],
+             'posted': 0}
+    if categorize:
+        report("Categorizing")
+        from utils.categorize import categorize_batch # It imports this module
+        result = categorize_batch(db, batch['id'])
+        stats['categorized'] = result['by_rule'] + result['learned']
+        stats['skipped_rules'] = result['skipped_rules']
+    if post:
+        report("Posting")
+        db.set_staged_status(batch['id'], 'approved', only=('pending',))
+        stats['posted'] = db.post_staged_lines(batch['id'], chunk_size)['transactions']
+    stats['lines'] = db.get_import_batch(batch['id'])['lines']
+    stats['seconds'] = time.perf_counter() - started
+    stats['lines_per_sec'] = stats['lines'] / stats['seconds'] if stats['seconds'] > 0 else float('inf')
+    return stats
@@ -0,0 +1,252 @@
+import re
+import time
+from collections import Counter, deque
+
+from utils.bank_import import normalize_description
+
+# Auto-categorization of imported statement lines: which account is the other side of each
+# line. Rules (DatabaseHandler.get_rules) come first, in their order, then what the journal
+# has paired with the bank account before ("learned"), else the line stays uncategorized.
+#
+# Substring rules look at the normalized description (utils.bank_import.normalize_description:
+# lowercase words, no digits or punctuation), so "Starbucks" matches "POS 4411 STARBUCKS #0231";
+# their matches are cached per normalized description. Regex rules look at the description
+# as the bank wrote it, case-insensitively, so they can pin down store numbers and
+# references; their matches are cached per description. Substring rules are compiled into
+# one Aho-Corasick automaton. Regex rules are prefiltered by another, built from a literal
+# each of them needs (see required_literal), so a description costs one pass over its text
+# plus a search by just the regex rules whose literal it holds, whatever the number of
+# rules. Amount bounds are checked afterwards, per line.
+
+def check_rule(kind, pattern):
+    """What a rule's pattern compiles to (normalized text, a regex or None); ValueError if it cannot match."""
+    if kind == 'substring':
+        text = normalize_description(pattern)
+        if not text:
+            raise ValueError(f"{pattern!r} has no words left once normalized (digits and punctuation are dropped)")
+        return text
+    if kind == 'regex':
+        try:
+            return re.compile(pattern, re.IGNORECASE)
+        except re.error as e:
+            raise ValueError(f"Bad regex {pattern!r}: {e}")
+    return None
+
+_INLINE_FLAGS = re.compile(r"\(\?[aiLmsux-]+[:)]")
+
+def required_literal(pattern):
+    """
+    The longest run of plain ASCII characters every match of pattern contains, lowercased,
+    or None (an alternation at the top level, inline flags, no run of 3 or more).
+    Conservative: anything it does not understand ends the run.
+    """
+    if _INLINE_FLAGS.search(pattern):
+        return None # (?x) and friends change what the characters mean
+    runs = [[]]
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        literal = None
+        if ch == "\\" and i + 1 < len(pattern):
+            i += 1
+            if not pattern[i].isalnum():
+                literal = pattern[i] # \. \* \#: the character itself
+        elif ch == "[":
+            i += 2 if pattern[i + 1:i + 2] == "^" else 1
+            if pattern[i:i + 1] == "]":
+                i += 1 # A "]" first is part of the class
+            while i < len(pattern) and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "|" and depth == 0:
+            return None
+        elif depth == 0 and ch not in ".^$?*+{}":
+            literal = ch
+        i += 1
+        quantifier = pattern[i] if i < len(pattern) else ""
+        if literal is not None and depth == 0 and literal.isascii() and quantifier not in ("?", "*", "{"):
+            runs[-1].append(literal.lower())
+            if quantifier != "+":
+                continue
+        if runs[-1]:
+            runs.append([])
+    best = max(("".join(run) for run in runs), key=len)
+    return best if len(best) >= 3 else None
+
+class _Automaton:
+    """Aho-Corasick: every pattern found in a text in one pass over it."""
+
+    def __init__(self, patterns):
+        """patterns: (text, value) pairs; search() returns the values of those found."""
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [()]
+        for text, value in patterns:
+            node = 0
+            for ch in text:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(())
+                node = nxt
+            self.out[node] += (value,)
+
+        # Failure links, breadth first: the longest proper suffix that is also a prefix
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                queue.append(child)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[child] = self.goto[f].get(ch, 0)
+                self.out[child] += self.out[self.fail[child]]
+
+    def search(self, text):
+        goto, fail, out = self.goto, self.fail, self.out
+        found = set()
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+class Categorizer:
+    """
+    rules: get_rules() rows. learned: normalized description -> (account, type), see learn().
+    classify(description, amount) -> (account, account_type, source) or None, where source
+    is "rule <id>" or "learned". A stored rule whose pattern cannot be used (saved by an
+    older version, or edited in the file) is left out and listed in skipped as
+    (rule_id, reason), so one bad rule does not stop every import.
+    """
+    CACHE_SIZE = 100000
+
+    def __init__(self, rules=(), learned=None):
+        self.rules = list(rules)
+        self.learned = learned or {}
+        substrings = []
+        regexes = []
+        self.always = [] # Amount-only rules: candidates for every description
+        self.skipped = []
+        for index, (rule_id, _, kind, pattern, *_rest) in enumerate(self.rules):
+            try:
+                compiled = check_rule(kind, pattern)
+            except ValueError as e:
+                self.skipped.append((rule_id, str(e)))
+                continue
+            if kind == 'substring':
+                substrings.append((compiled, index))
+            elif kind == 'regex':
+                regexes.append((compiled, index))
+            else:
+                self.always.append(index)
+        self.automaton = _Automaton(substrings) if substrings else None
+
+        # Regex rules: those with a required literal only run when the casefolded description
+        # holds it (IGNORECASE folds no ASCII letter to anything casefold() does not)
+        self.regexes = dict((index, compiled) for compiled, index in regexes)
+        literals = [(required_literal(compiled.pattern), index) for compiled, index in regexes]
+        self.prefilter = _Automaton([(text, index) for text, index in literals if text]) if regexes else None
+        self.unfiltered = [index for text, index in literals if not text]
+        self.cache = {}       # normalized description -> substring and amount rule indexes
+        self.regex_cache = {} # description -> regex rule indexes
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_db(cls, db, bank_account=None):
+        """The book's rules, plus what it has learned for bank_account when one is given."""
+        return cls(db.get_rules(), learn(db, bank_account) if bank_account else None)
+
+    def candidates(self, description, words=None):
+        """Indexes of the rules whose pattern matches a description, in rule order."""
+        words = normalize_description(description) if words is None else words
+        found = self._lookup(self.cache, words, self._word_rules)
+        if not self.regexes:
+            return found
+        by_regex = self._lookup(self.regex_cache, description, self._regex_rules)
+        return sorted(set(found).union(by_regex)) if by_regex else found
+
+    def _lookup(self, cache, key, compute):
+        found = cache.get(key)
+        if found is not None:
+            self.hits += 1
+            return found
+        self.misses += 1
+        found = compute(key)
+        if len(cache) >= self.CACHE_SIZE:
+            cache.clear()
+        cache[key] = found
+        return found
+
+    def _word_rules(self, words):
+        hits = set(self.always)
+        if self.automaton is not None:
+            hits |= self.automaton.search(words)
+        return sorted(hits)
+
+    def _regex_rules(self, description):
+        maybe = self.prefilter.search(description.casefold())
+        maybe.update(self.unfiltered)
+        return sorted(index for index in maybe if self.regexes[index].search(description))
+
+    def classify(self, description, amount):
+        description = description or ""
+        words = normalize_description(description)
+        for index in self.candidates(description, words):
+            rule_id, _, _, _, account, acc_type, low, high = self.rules[index]
+            if (low is None or amount >= low) and (high is None or amount <= high):
+                return account, acc_type, f"rule {rule_id}"
+        learned = self.learned.get(words)
+        if learned is not None:
+            return learned + ('learned',)
+        return None
+
+def learn(db, bank_account):
+    """
+    normalized description -> (account, type) most often on the other side of bank_account
+    in the journal's two-split transactions.
+    """
+    counts = {}
+    for description, account, acc_type, count in db.get_counterparts(bank_account.strip().title()):
+        counts.setdefault(normalize_description(description), Counter())[(account, acc_type)] += count
+    return {words: c.most_common(1)[0][0] for words, c in counts.items() if words}
+
+def categorize_batch(db, batch_id, categorizer=None, overwrite=False):
+    """
+    Assigns an account to each of a batch's lines not posted yet (with overwrite, also to
+    lines that already have one). Returns stats: lines, by_rule, learned, uncategorized,
+    skipped_rules ((rule_id, reason) of rules left out, see Categorizer), cache_hits, seconds.
+    """
+    started = time.perf_counter()
+    batch = db.get_import_batch(batch_id)
+    categorizer = categorizer or Categorizer.from_db(db, batch['account'])
+    stats = {'lines': 0, 'by_rule': 0, 'learned': 0, 'uncategorized': 0}
+    assignments = []
+    for line_id, _, _, amount, description, _, status, _, account, _, _ in db.get_staged_lines(batch_id):
+        if status in ('posted', 'rejected') or (account and not overwrite):
+            continue
+        stats['lines'] += 1
+        result = categorizer.classify(description, amount)
+        if result is None:
+            stats['uncategorized'] += 1
+            continue
+        stats['learned' if result[2] == 'learned' else 'by_rule'] += 1
+        assignments.append((line_id, result[0], result[1]))
+    if assignments:
+        db.assign_staged_accounts(assignments)
+    stats['skipped_rules'] = categorizer.skipped
+    stats['cache_hits'] = categorizer.hits
+    stats['seconds'] = time.perf_counter() - started
+    return stats
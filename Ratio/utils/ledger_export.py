@@ -0,0 +1,287 @@
+import csv
+import json
+import os
+import struct
+import sys
+import time
+import tracemalloc
+import zlib
+from array import array
+from datetime import date, timedelta
+
+from utils.money import MINOR_UNITS
+
+# Streaming exports of the general journal, one account's ledger and the trial balance as
+# CSV, JSON Lines or RCOL (a compressed columnar file, see ColumnarWriter). Journal rows
+# come from DatabaseHandler.iter_journal in fetchmany chunks and each chunk is written
+# before the next one is read, so memory stays flat however big the book is.
+
+FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.rcol': 'rcol'}
+
+# (name, type). Types: str, date (YYYY-MM-DD), int, and cents (integer cents, written to
+# CSV and JSON as decimal strings in currency units, "1234.56")
+JOURNAL_COLUMNS = (('transaction_id', 'str'), ('date', 'date'), ('account', 'str'), ('type', 'str'),
+                   ('description', 'str'), ('debit', 'cents'), ('credit', 'cents'),
+                   ('posted_at', 'str'), ('entry_id', 'int'))
+LEDGER_COLUMNS = JOURNAL_COLUMNS + (('balance', 'cents'),)
+TRIAL_BALANCE_COLUMNS = (('account', 'str'), ('type', 'str'), ('debit', 'cents'), ('credit', 'cents'),
+                         ('balance', 'cents'))
+
+def format_for(path):
+    """The export format implied by a file name (.csv, .jsonl or .rcol)."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in FORMATS:
+        raise ValueError(f"Cannot tell the export format of {path!r}: use {', '.join(FORMATS)}")
+    return FORMATS[ext]
+
+def _decimal(cents):
+    # fmt_money(cents, grouping=False) without the Decimal round trip: this runs per amount
+    sign = "-" if cents < 0 else ""
+    units, minor = divmod(abs(cents), MINOR_UNITS)
+    return f"{sign}{units}.{minor:02d}"
+
+# --- TEXT WRITERS ---
+
+class _TextWriter:
+    def __init__(self, path, columns):
+        self.f = open(path, "w", newline="", encoding="utf-8")
+        self.names = [name for name, _ in columns]
+        self.amounts = [i for i, (_, kind) in enumerate(columns) if kind == 'cents']
+
+    def _text(self, row):
+        row = list(row)
+        for i in self.amounts:
+            row[i] = _decimal(row[i] or 0)
+        return row
+
+    def close(self):
+        self.f.close()
+
+class CSVWriter(_TextWriter):
+    def __init__(self, path, columns):
+        super().__init__(path, columns)
+        self.writer = csv.writer(self.f, lineterminator="\n")
+        self.writer.writerow(self.names)
+
+    def write(self, rows):
+        self.writer.writerows(map(self._text, rows))
+
+class JSONLinesWriter(_TextWriter):
+    def write(self, rows):
+        names = self.names
+        self.f.write("".join(json.dumps(dict(zip(names, self._text(row))), ensure_ascii=False) + "\n"
+                             for row in rows))
+
+# --- COLUMNAR ---
+
+MAGIC = b"RCOL1"
+
+def _pack(typecode, values):
+    packed = array(typecode, values)
+    if sys.byteorder == "big":
+        packed.byteswap() # Always little-endian on disk
+    return packed.tobytes()
+
+def _unpack(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+def _pack_strings(values):
+    encoded = [v.encode("utf-8") for v in values]
+    return _pack('i', [len(v) for v in encoded]) + b"".join(encoded)
+
+def _unpack_strings(data, count):
+    lengths = _unpack('i', data[:4 * count])
+    values = []
+    pos = 4 * count
+    for n in lengths:
+        values.append(data[pos:pos + n].decode("utf-8"))
+        pos += n
+    return values, pos
+
+def _encode(kind, values):
+    """(encoding, bytes, block metadata) for one column of one row group."""
+    if kind in ('int', 'cents'):
+        values = [v or 0 for v in values]
+        return 'plain', _pack('q', values), {'min': min(values), 'max': max(values)}
+    if kind == 'date':
+        # Day numbers, each stored as the step from the previous one: mostly 0s and 1s
+        days = {}
+        ordinals = [days.get(v) or days.setdefault(v, date.fromisoformat(v).toordinal()) for v in values]
+        deltas = [ordinals[0]] + [b - a for a, b in zip(ordinals, ordinals[1:])]
+        return 'delta', _pack('i', deltas), {'min': min(values), 'max': max(values)}
+    values = ["" if v is None else str(v) for v in values]
+    distinct = dict.fromkeys(values)
+    if len(distinct) <= len(values) // 2:
+        codes = {v: i for i, v in enumerate(distinct)}
+        return 'dictionary', _pack_strings(list(distinct)) + _pack('i', [codes[v] for v in values]), \
+               {'dictionary': len(distinct)}
+    return 'plain', _pack_strings(values), {}
+
+def _decode(kind, block, data, count):
+    encoding = block['encoding']
+    if encoding == 'plain' and kind in ('int', 'cents'):
+        return list(_unpack('q', data))
+    if encoding == 'delta':
+        values = []
+        day = 0
+        for step in _unpack('i', data):
+            day += step
+            values.append(day)
+        return [date.fromordinal(d).isoformat() for d in values]
+    if encoding == 'dictionary':
+        dictionary, end = _unpack_strings(data, block['dictionary'])
+        return [dictionary[i] for i in _unpack('i', data[end:])]
+    return _unpack_strings(data, count)[0]
+
+class ColumnarWriter:
+    """
+    RCOL, Parquet's layout without the dependency. Each chunk of rows becomes a row group
+    holding one zlib-compressed block per column. Integers and amounts are little-endian
+    int64, dates delta-encoded day numbers, strings plain (int32 lengths + UTF-8) or
+    dictionary-encoded when a block repeats them (account names, types). The file ends
+    with a JSON footer (columns, row groups, block offsets, min/max), its length as a
+    uint32 and the magic again. None strings are written as "". See read_columnar.
+    """
+
+    def __init__(self, path, columns, level=6):
+        self.f = open(path, "wb")
+        self.f.write(MAGIC)
+        self.columns = columns
+        self.level = level
+        self.row_groups = []
+        self.rows = 0
+
+    def write(self, rows):
+        if not rows:
+            return
+        group = {'rows': len(rows), 'columns': []}
+        for (name, kind), values in zip(self.columns, zip(*rows)):
+            encoding, data, meta = _encode(kind, values)
+            block = zlib.compress(data, self.level)
+            group['columns'].append({'offset': self.f.tell(), 'length': len(block), 'encoding': encoding, **meta})
+            self.f.write(block)
+        self.row_groups.append(group)
+        self.rows += len(rows)
+
+    def close(self):
+        footer = json.dumps({'version': 1, 'rows': self.rows,
+                             'columns': [{'name': name, 'type': kind} for name, kind in self.columns],
+                             'row_groups': self.row_groups}).encode("utf-8")
+        self.f.write(footer)
+        self.f.write(struct.pack("<I", len(footer)))
+        self.f.write(MAGIC)
+        self.f.close()
+
+def columnar_footer(path):
+    """The footer of an RCOL file: {'version', 'rows', 'columns', 'row_groups'}."""
+    with open(path, "rb") as f:
+        return _read_footer(f)
+
+def _read_footer(f):
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f"{f.name} is not an RCOL file")
+    f.seek(-(4 + len(MAGIC)), os.SEEK_END)
+    length = struct.unpack("<I", f.read(4))[0]
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f"{f.name} is truncated")
+    f.seek(-(4 + len(MAGIC) + length), os.SEEK_END)
+    return json.loads(f.read(length))
+
+def read_columnar(path, columns=None):
+    """
+    Yields an RCOL file one row group at a time as {column: [values]} (amounts in cents).
+    columns: names to read; the other blocks are skipped, not decompressed.
+    """
+    with open(path, "rb") as f:
+        footer = _read_footer(f)
+        wanted = [(i, col) for i, col in enumerate(footer['columns']) if columns is None or col['name'] in columns]
+        for group in footer['row_groups']:
+            out = {}
+            for i, col in wanted:
+                block = group['columns'][i]
+                f.seek(block['offset'])
+                data = zlib.decompress(f.read(block['length']))
+                out[col['name']] = _decode(col['type'], block, data, group['rows'])
+            yield out
+
+WRITERS = {'csv': CSVWriter, 'jsonl': JSONLinesWriter, 'rcol': ColumnarWriter}
+
+# --- EXPORTS ---
+
+def write_chunks(chunks, path, columns, fmt=None, trace_memory=False):
+    """
+    Writes an iterable of row chunks to path. Returns throughput stats: rows, chunks,
+    largest_chunk, bytes, seconds, rows_per_sec and mb_per_sec, plus peak_kb (Python heap
+    high-water mark while exporting) with trace_memory, which slows the export down.
+    A failed export leaves no partial file behind.
+    """
+    fmt = fmt or format_for(path)
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown export format {fmt!r}: use {', '.join(WRITERS)}")
+    stats = {'format': fmt, 'path': path, 'rows': 0, 'chunks': 0, 'largest_chunk': 0}
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    writer = WRITERS[fmt](path, columns)
+    try:
+        for rows in chunks:
+            writer.write(rows)
+            stats['rows'] += len(rows)
+            stats['chunks'] += 1
+            stats['largest_chunk'] = max(stats['largest_chunk'], len(rows))
+        writer.close()
+    except Exception as e:
+        writer.f.close()
+        os.remove(path)
+        raise e
+    finally:
+        if trace_memory:
+            stats['peak_kb'] = tracemalloc.get_traced_memory()[1] / 1024
+            tracemalloc.stop()
+    stats['seconds'] = time.perf_counter() - started
+    stats['bytes'] = os.path.getsize(path)
+    stats['rows_per_sec'] = stats['rows'] / stats['seconds'] if stats['seconds'] > 0 else float('inf')
+    stats['mb_per_sec'] = stats['bytes'] / 1e6 / stats['seconds'] if stats['seconds'] > 0 else float('inf')
+    return stats
+
+def export_journal(db, path, fmt=None, start_date=None, end_date=None, chunk_size=5000, trace_memory=False):
+    """Every split (JOURNAL_COLUMNS), oldest first. Returns write_chunks' stats."""
+    chunks = db.iter_journal(None, start_date, end_date, chunk_size)
+    return write_chunks(chunks, path, JOURNAL_COLUMNS, fmt, trace_memory)
+
+def export_ledger(db, account_name, path, fmt=None, start_date=None, end_date=None, chunk_size=5000,
+                  trace_memory=False):
+    """
+    One account's splits oldest first with its running balance (LEDGER_COLUMNS). The
+    balance opens at the account's balance the day before start_date.
+    """
+    if account_name not in db.get_balances_snapshot():
+        raise ValueError(f"No account named {account_name!r}")
+    balance = 0
+    if start_date:
+        day_before = (date.fromisoformat(start_date) - timedelta(days=1)).isoformat()
+        balance = db.get_balances_snapshot(day_before).get(account_name, {}).get('net_balance', 0)
+
+    def with_balance(chunks, balance):
+        signed = db.signed_amount
+        for rows in chunks:
+            out = []
+            for row in rows:
+                balance += signed(row[3], row[5], row[6])
+                out.append(row + (balance,))
+            yield out
+
+    chunks = db.iter_journal(account_name, start_date, end_date, chunk_size)
+    return write_chunks(with_balance(chunks, balance), path, LEDGER_COLUMNS, fmt, trace_memory)
+
+def export_trial_balance(db, path, fmt=None, as_of=None, chunk_size=5000, trace_memory=False):
+    """Per account debit and credit totals and net balance (TRIAL_BALANCE_COLUMNS), by name. No total row."""
+    balances = db.get_balances_snapshot(as_of)
+    rows = [(name, info['type'], info['debit_total'], info['credit_total'], info['net_balance'])
+            for name, info in sorted(balances.items())]
+    chunks = (rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size))
+    return write_chunks(chunks, path, TRIAL_BALANCE_COLUMNS, fmt, trace_memory)
@@ -0,0 +1,33 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+# Amounts are stored and summed as integer minor units (cents). Only user input
+# and the display layer deal in currency units.
+MINOR_UNITS = 100
+
+def to_cents(value):
+    """Parses user input or a number in currency units ("1,234.56", 12.5) into integer cents."""
+    try:
+        amount = Decimal(str(value).replace(",", "").strip())
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {value!r}")
+    if not amount.is_finite():
+        raise ValueError(f"Invalid amount: {value!r}")
+    return int((amount * MINOR_UNITS).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def from_cents(cents):
+    """Currency units as a float. For charts and other plotting only, never for sums."""
+    return (cents or 0) / MINOR_UNITS
+
+def fmt_money(cents, parens=False, decimals=2, grouping=True):
+    """
+    Formats integer cents for display: 123456 -> "1,234.56".
+    parens: accounting style negatives, (1,234.56).
+    """
+    cents = cents or 0
+    negative = cents < 0
+    # Rounded like to_cents (half up), not by the format spec's half-even: 250 -> "3", not "2"
+    units = (Decimal(abs(cents)) / MINOR_UNITS).quantize(Decimal(1).scaleb(-decimals), rounding=ROUND_HALF_UP)
+    text = f"{units:{',' if grouping else ''}.{decimals}f}"
+    if negative:
+        return f"({text})" if parens else f"-{text}"
+    return text
@@ -4,6 +4,7 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_RIGHT
 from datetime import datetime
+from utils.money import fmt_money
 
 class PDFExporter:
     def __init__(self, db):
@@ -40,22 +41,17 @@ class PDFExporter:
             raise e
 
     def _fmt(self, value):
-        """Formats numbers: standard accounting format (negatives in parens)."""
-        try:
-            val = float(value)
-        except:
+        """Formats integer cents: standard accounting format (negatives in parens)."""
+        if not isinstance(value, int):
             return str(value)
-            
-        if val < 0:
-            return f"({abs(val):,.2f})" # Returns (1,000.00) for negative
-        return f"{val:,.2f}"
+        return fmt_money(value, parens=True) # Returns (1,000.00) for negative
 
     def _build_income_statement(self, start, end):
         accounts = self.db.get_balances_period(start, end)
         data = [['Account', 'Amount']]
         
-        rev = 0.0
-        exp = 0.0
+        rev = 0
+        exp = 0
         
         # REVENUE
         data.append(['REVENUE', ''])
@@ -96,9 +92,9 @@ class PDFExporter:
         
         data = [['Account', 'Amount']]
         
-        asset = 0.0
-        liab = 0.0
-        equity = 0.0
+        asset = 0
+        liab = 0
+        equity = 0
         
         data.append(['ASSETS', ''])
         for name, info in accounts.items():
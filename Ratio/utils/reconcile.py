@@ -0,0 +1,149 @@
+import time
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+
+from utils.bank_import import normalize_description
+
+# Bank reconciliation: statement lines (a staged import batch) matched to the open splits of
+# a bank account. Splits are indexed by amount, each amount's splits sorted by day, so a line
+# finds its candidates with one dict lookup and a bisect into a date window instead of a
+# scan over every split: O((n + m) log m) for n lines and m splits.
+#
+#   own     the line was posted by the import: its own split, found by transaction id
+#   exact   one split with the line's amount, dated within the tolerance (nearest first,
+#           then the one whose normalized description matches)
+#   group   2..max_group splits of the same sign within the tolerance that add up to the
+#           line (a deposit of several cheques, a card settlement of several purchases)
+
+class _Split:
+    __slots__ = ("entry_id", "tid", "day", "amount", "words", "used")
+
+    def __init__(self, entry_id, tid, day, amount, description):
+        self.entry_id = entry_id
+        self.tid = tid
+        self.day = day
+        self.amount = amount
+        self.words = normalize_description(description)
+        self.used = False
+
+_days = {} # YYYY-MM-DD -> day number
+
+def _day(text):
+    day = _days.get(text)
+    if day is None:
+        day = _days[text] = date.fromisoformat(text).toordinal()
+    return day
+
+def match_lines(lines, splits, tolerance_days=3, max_group=4, group_window=20):
+    """
+    lines: (line_id, date, amount, description, transaction_id) statement lines.
+    splits: (entry_id, tid, date, amount, description) open splits, amount as the bank sees it.
+    Returns (matches, unmatched): matches are (line_id, [entry_id, ...], kind) with kind
+    'own', 'exact' or 'group'; unmatched the line ids left over. Every split is used once.
+    group_window: how many of the nearest candidate splits a group is searched among.
+    """
+    splits = [_Split(entry_id, tid, _day(d), amount, descr) for entry_id, tid, d, amount, descr in splits]
+    by_amount = {} # amount -> splits sorted by day (the sorted amount index)
+    for s in sorted(splits, key=lambda s: (s.day, s.entry_id)):
+        by_amount.setdefault(s.amount, []).append(s)
+    by_tid = {s.tid: s for s in splits}
+
+    matches = []
+    rest = []
+    for line in lines:
+        own = by_tid.get(line[4]) if line[4] else None
+        if own is not None and not own.used and own.amount == line[2]:
+            own.used = True
+            matches.append((line[0], [own.entry_id], 'own'))
+        else:
+            rest.append(line)
+
+    unmatched = []
+    # In date order: when two lines compete for one split the earlier one wins
+    for line_id, d, amount, description, _ in sorted(rest, key=lambda l: l[1]):
+        day = _day(d)
+        run = by_amount.get(amount, ())
+        lo = bisect_left(run, day - tolerance_days, key=lambda s: s.day)
+        hi = bisect_right(run, day + tolerance_days, key=lambda s: s.day)
+        words = normalize_description(description)
+        best = min((s for s in run[lo:hi] if not s.used),
+                   key=lambda s: (abs(s.day - day), s.words != words), default=None)
+        if best is not None:
+            best.used = True
+            matches.append((line_id, [best.entry_id], 'exact'))
+        else:
+            unmatched.append((line_id, day, amount))
+
+    if max_group < 2 or not unmatched:
+        return matches, [line_id for line_id, _, _ in unmatched]
+
+    # Many-to-one, among what is left: a small subset-sum over the splits near each line
+    remaining = sorted((s for s in splits if not s.used), key=lambda s: s.day)
+    days = [s.day for s in remaining]
+    still_open = []
+    for line_id, day, amount in unmatched:
+        lo = bisect_left(days, day - tolerance_days)
+        hi = bisect_right(days, day + tolerance_days)
+        window = [s for s in remaining[lo:hi]
+                  if not s.used and s.amount and (s.amount > 0) == (amount > 0) and abs(s.amount) < abs(amount)]
+        window.sort(key=lambda s: abs(s.day - day))
+        group = _subset_sum(window[:group_window], amount, max_group) if amount else None
+        if group:
+            for s in group:
+                s.used = True
+            matches.append((line_id, [s.entry_id for s in group], 'group'))
+        else:
+            still_open.append(line_id)
+    return matches, still_open
+
+def _subset_sum(window, target, max_size):
+    """2..max_size splits of window adding up to target (all one sign), largest amounts first."""
+    window = sorted(window, key=lambda s: -abs(s.amount))
+    target = abs(target)
+    amounts = [abs(s.amount) for s in window]
+
+    def search(start, left, size, picked):
+        if left == 0:
+            return picked if len(picked) >= 2 else None
+        if size == 0:
+            return None
+        for i in range(start, len(amounts)):
+            # Descending amounts: once `size` of the biggest left cannot reach, nothing later can
+            if amounts[i] * size < left:
+                return None
+            if amounts[i] <= left:
+                found = search(i + 1, left - amounts[i], size - 1, picked + [window[i]])
+                if found:
+                    return found
+        return None
+
+    return search(0, target, max_size, [])
+
+def reconcile_statement(db, batch_id, account_name=None, tolerance_days=3, max_group=4, apply=True):
+    """
+    Matches a batch's open lines to the open splits of account_name (the batch's account by
+    default) dated within tolerance_days of them, and with apply marks the matches
+    reconciled, so the next run only sees what is still open. Returns stats plus 'matches'.
+    """
+    started = time.perf_counter()
+    batch = db.get_import_batch(batch_id)
+    account = (account_name or batch['account']).strip().title()
+    lines = db.get_open_lines(batch_id)
+    splits = []
+    if lines:
+        first = min(l[1] for l in lines)
+        last = max(l[1] for l in lines)
+        pad = timedelta(days=tolerance_days)
+        splits = db.get_open_splits(account, (date.fromisoformat(first) - pad).isoformat(),
+                                    (date.fromisoformat(last) + pad).isoformat())
+    matches, unmatched = match_lines(lines, splits, tolerance_days, max_group)
+    if apply and matches:
+        db.mark_reconciled([(line_id, entry_ids) for line_id, entry_ids, _ in matches])
+    kinds = [kind for _, _, kind in matches]
+    return {
+        'batch': batch_id, 'account': account, 'lines': len(lines), 'candidates': len(splits),
+        'matched': len(matches), 'own': kinds.count('own'), 'exact': kinds.count('exact'),
+        'group': kinds.count('group'), 'unmatched': unmatched,
+        'splits_reconciled': sum(len(entry_ids) for _, entry_ids, _ in matches) if apply else 0,
+        'seconds': time.perf_counter() - started, 'matches': matches,
+    }
@@ -0,0 +1,52 @@
+import datetime
+import re
+from utils.money import to_cents
+
+ACCOUNT_TYPES = {'asset': 'Asset', 'liability': 'Liability', 'equity': 'Equity',
+                 'revenue': 'Revenue', 'expense': 'Expense'}
+
+_AMOUNT = re.compile(r"^(>=|<=|>|<|=)([\d,]*\.?\d+)$")
+_RANGE = re.compile(r"^([\d,]*\.?\d+)\.\.([\d,]*\.?\d+)$")
+
+def _date(value):
+    try:
+        return datetime.date.fromisoformat(value).isoformat()
+    except ValueError:
+        return None
+
+def parse_search(text):
+    """
+    Search bar text -> criteria for DatabaseHandler.search_entries / get_ledger_page.
+        coffee shop        words in the description or account name (prefix match)
+        >20  <=100.50      amount bounds (amount = the split's debit or credit)
+        20..100  =42.50    amount range / exact amount
+        type:expense       account type
+        from:2024-01-01  to:2024-03-31
+    Anything that does not parse as a filter is searched as text. Returns {} for blank text.
+    """
+    criteria = {}
+    words = []
+    for token in (text or "").split():
+        key, _, value = token.partition(":")
+        key = key.lower()
+        amount = _AMOUNT.match(token)
+        span = _RANGE.match(token)
+        if amount:
+            op, cents = amount.group(1), to_cents(amount.group(2))
+            if op in (">", ">="):
+                criteria['min_amount'] = cents + (op == ">")
+            elif op in ("<", "<="):
+                criteria['max_amount'] = cents - (op == "<")
+            else:
+                criteria['min_amount'] = criteria['max_amount'] = cents
+        elif span:
+            criteria['min_amount'], criteria['max_amount'] = sorted(map(to_cents, span.groups()))
+        elif key == "type" and value.lower() in ACCOUNT_TYPES:
+            criteria['account_type'] = ACCOUNT_TYPES[value.lower()]
+        elif key in ("from", "to") and _date(value):
+            criteria['start_date' if key == "from" else 'end_date'] = _date(value)
+        else:
+            words.append(token)
+    if words:
+        criteria['text'] = " ".join(words)
+    return criteria
@@ -0,0 +1,29 @@
+import time
+from datetime import datetime
+
+# Import this first in main.py: the clock starts when the module is loaded
+_START = time.perf_counter()
+_marks = []
+
+def mark(name):
+    """Records that a startup phase finished, in seconds since launch."""
+    _marks.append((name, time.perf_counter() - _START))
+
+def elapsed(name):
+    return next((secs for n, secs in _marks if n == name), None)
+
+def report(path="startup.log"):
+    """Prints the phase timings and appends them to the startup log. Returns the lines."""
+    lines = []
+    previous = 0.0
+    for name, secs in _marks:
+        lines.append(f"{name:<28}{secs * 1000:9.1f} ms  (+{(secs - previous) * 1000:.1f})")
+        previous = secs
+    print("Startup timing:\n  " + "\n  ".join(lines))
+    try:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(f"--- {datetime.now():%Y-%m-%d %H:%M:%S} ---\n")
+            f.write("\n".join(lines) + "\n")
+    except OSError as e:
+        print(f"Startup Log Error: {e}")
+    return lines
@@ -0,0 +1,113 @@
+import datetime
+import math
+import random
+
+# Deterministic synthetic books for benchmarks and demos. The same arguments always
+# produce the same transactions, in date order, in the shape add_transactions_bulk takes.
+
+_NAMES = {
+    'Asset': ["Cash", "Bank", "Savings", "Accounts Receivable", "Inventory", "Equipment",
+              "Prepaid Rent", "Petty Cash", "Vehicles", "Deposits"],
+    'Liability': ["Accounts Payable", "Credit Card", "Bank Loan", "Payroll Liabilities",
+                  "Sales Tax Payable", "Accrued Expenses"],
+    'Equity': ["Owner Capital", "Owner Drawings"],
+    'Revenue': ["Sales", "Service Income", "Consulting", "Interest Income", "Subscriptions",
+                "Rental Income"],
+    'Expense': ["Rent", "Salaries", "Utilities", "Office Supplies", "Travel", "Meals",
+                "Advertising", "Software", "Insurance", "Repairs", "Fuel", "Bank Fees",
+                "Telephone", "Postage", "Training"],
+}
+_MERCHANTS = ["Acme", "Globex", "Initech", "Umbrella", "Stark", "Wayne", "Hooli", "Vandelay",
+              "Wonka", "Cyberdyne", "Soylent", "Tyrell", "Gringotts", "Monarch", "Oceanic"]
+_WORDS = {
+    'Revenue': ["invoice", "sale", "payment received", "retainer", "subscription"],
+    'Expense': ["bill", "purchase", "coffee", "fuel", "lunch", "license", "repair", "ticket"],
+    'transfer': ["transfer", "deposit", "withdrawal"],
+    'payroll': ["payroll run", "salary batch"],
+}
+
+def chart_of_accounts(accounts=30):
+    """(name, type) for the given number of accounts, at least one of each type, in a fixed order."""
+    accounts = max(5, accounts)
+    # The first five cover every type; the rest lean towards the busy types
+    first = list(_NAMES)
+    rest = ['Asset', 'Liability', 'Revenue', 'Expense', 'Expense']
+    chart = []
+    for i in range(accounts):
+        acc_type = first[i] if i < len(first) else rest[i % len(rest)]
+        pool = _NAMES[acc_type]
+        n = sum(1 for _, t in chart if t == acc_type)
+        name = pool[n % len(pool)] + (f" {n // len(pool) + 1}" if n >= len(pool) else "")
+        chart.append((name, acc_type))
+    return chart
+
+def splits_per_day_for(target_splits, years):
+    """The splits_per_day that gives about target_splits over the given number of years."""
+    return max(2, math.ceil(target_splits / (years * 365)))
+
+def generate_transactions(seed=42, accounts=30, years=1, splits_per_day=20, start_date="2020-01-01"):
+    """
+    Yields (date, description, lines) for years * 365 days of activity, splits_per_day
+    splits a day. Amounts are integer cents; every transaction balances.
+    """
+    rng = random.Random(seed)
+    chart = chart_of_accounts(accounts)
+    by_type = {t: [name for name, acc_type in chart if acc_type == t] for t in _NAMES}
+    day = datetime.date.fromisoformat(start_date)
+
+    def line(name, acc_type, debit=0, credit=0):
+        return {'account_name': name, 'account_type': acc_type, 'debit': debit, 'credit': credit}
+
+    def pick(acc_type):
+        # Skewed so a few accounts carry most of the activity, like a real book
+        names = by_type[acc_type]
+        return names[min(int(rng.expovariate(1.5)), len(names) - 1)]
+
+    def describe(kind):
+        return f"{rng.choice(_MERCHANTS)} {rng.choice(_WORDS[kind])} #{rng.randint(1, 99999)}"
+
+    for _ in range(years * 365):
+        date = day.isoformat()
+        remaining = max(2, splits_per_day)
+        while remaining > 0:
+            if remaining in (2, 3):
+                size = remaining
+            else:
+                size = 3 if remaining != 4 and rng.random() < 0.1 else 2
+            amount = int(rng.lognormvariate(9, 1.2)) + 100 # Mostly tens to low thousands
+            if size == 3:
+                # Payroll: salary expense against net pay and withholding
+                withheld = amount // 5
+                lines = [line(pick('Expense'), 'Expense', debit=amount),
+                         line(pick('Asset'), 'Asset', credit=amount - withheld),
+                         line(pick('Liability'), 'Liability', credit=withheld)]
+                yield date, describe('payroll'), lines
+            else:
+                kind = rng.random()
+                if kind < 0.35:
+                    lines = [line(pick('Asset'), 'Asset', debit=amount),
+                             line(pick('Revenue'), 'Revenue', credit=amount)]
+                    yield date, describe('Revenue'), lines
+                elif kind < 0.85:
+                    funding = 'Liability' if rng.random() < 0.3 else 'Asset'
+                    lines = [line(pick('Expense'), 'Expense', debit=amount),
+                             line(pick(funding), funding, credit=amount)]
+                    yield date, describe('Expense'), lines
+                elif kind < 0.97 and len(by_type['Asset']) > 1:
+                    to_acc, from_acc = pick('Asset'), pick('Asset')
+                    if to_acc == from_acc:
+                        from_acc = by_type['Asset'][by_type['Asset'].index(to_acc) - 1]
+                    lines = [line(to_acc, 'Asset', debit=amount),
+                             line(from_acc, 'Asset', credit=amount)]
+                    yield date, describe('transfer'), lines
+                else:
+                    lines = [line(pick('Asset'), 'Asset', debit=amount * 10),
+                             line(pick('Equity'), 'Equity', credit=amount * 10)]
+                    yield date, "Owner contribution", lines
+            remaining -= size
+        day += datetime.timedelta(days=1)
+
+def build_book(db, seed=42, accounts=30, years=1, splits_per_day=20, start_date="2020-01-01"):
+    """Loads a synthetic book into a DatabaseHandler. Returns add_transactions_bulk's stats."""
+    return db.add_transactions_bulk(
+        generate_transactions(seed, accounts, years, splits_per_day, start_date))